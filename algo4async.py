@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Asynchronous Download Engine
+
+This module provides an asyncio-based alternative to the download_webpage()
+backend in algo4download.py. Concurrency is bounded by open sockets rather
+than OS threads: a global connection cap, a per-host connection cap and a
+per-host politeness delay between requests to the same host. An optional
+algo4ratelimit.RateLimiter adds adaptive per-host rates and retries.
+"""
+
+import os
+import time
+import asyncio
+from urllib.parse import urlparse
+from typing import Tuple, Dict, List
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from algo4download import (
+    build_request_headers,
+    get_status_description,
+    decode_body,
+    convert_html,
+    save_file,
+    batch_file_names,
+    NetworkError,
+    ContentExtractionError,
+    FileOperationError,
+)
+from algo4ratelimit import RETRY_STATUS_CODES, parse_retry_after
+
+class AsyncFetcher:
+    """
+    Fetch webpages concurrently over a single aiohttp session.
+
+    Use as an async context manager:
+
+        async with AsyncFetcher(max_concurrency=200, per_host_limit=4) as fetcher:
+            html_content, response_info = await fetcher.fetch(url)
+    """
+
+    def __init__(self,
+                 max_concurrency: int = 100,
+                 per_host_limit: int = 8,
+                 politeness_delay: float = 0.0,
+                 timeout: int = 30,
+                 user_agent: str = None,
+                 rate_limiter: "RateLimiter" = None):
+        """
+        Args:
+            max_concurrency: Maximum number of open connections across all hosts
+            per_host_limit: Maximum number of open connections per host
+            politeness_delay: Minimum seconds between request starts to one host
+            timeout: Request timeout in seconds
+            user_agent: Custom user agent string
+            rate_limiter: algo4ratelimit.RateLimiter for adaptive rates and retries
+        """
+        if aiohttp is None:
+            raise ImportError("The async backend requires aiohttp. Run: pip install aiohttp")
+
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.politeness_delay = politeness_delay
+        self.timeout = timeout
+        self.headers = build_request_headers(user_agent)
+        self.rate_limiter = rate_limiter
+        self._session = None
+        self._host_locks = {}
+        self._host_next_start = {}
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency,
+                                         limit_per_host=self.per_host_limit)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self._session.close()
+        self._session = None
+
+    async def _wait_for_host(self, host: str) -> None:
+        """Delay the caller until the politeness delay for host has passed."""
+        if self.politeness_delay <= 0:
+            return
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            start = max(now, self._host_next_start.get(host, now))
+            self._host_next_start[host] = start + self.politeness_delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def fetch(self, url: str) -> Tuple[str, Dict]:
+        """
+        Download HTML content from a URL.
+
+        With a rate limiter, 429, 503 and transient failures are retried
+        with backoff, honouring Retry-After.
+
+        Args:
+            url: URL to download
+
+        Returns:
+            Tuple of (html_content, response_info)
+
+        Raises:
+            NetworkError: If download fails
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            await self._wait_for_host(urlparse(url).netloc)
+            if self.rate_limiter is not None:
+                wait = self.rate_limiter.reserve(url)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            try:
+                return await self._fetch_once(url)
+            except _RetryableError as e:
+                delay = self.rate_limiter.retry_delay(url, attempt, e.status, e.retry_after)
+                if delay is None:
+                    raise e.error from e.error.__cause__
+                # Waits for a Retry-After pause are taken by the next reserve()
+                if e.retry_after is None:
+                    await asyncio.sleep(delay)
+
+    async def _fetch_once(self, url: str) -> Tuple[str, Dict]:
+        """Make a single attempt at fetch(), reporting it to the rate limiter."""
+        limiter = self.rate_limiter
+        start = time.monotonic()
+        try:
+            async with self._session.get(url) as response:
+                retry_after = None
+                if limiter is not None:
+                    if response.status in RETRY_STATUS_CODES:
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    limiter.record(url, response.status, time.monotonic() - start, retry_after)
+                if response.status >= 400:
+                    error = NetworkError(
+                        f"HTTP {response.status} ({get_status_description(response.status)}): "
+                        f"{response.reason} for url: {response.url}"
+                    )
+                    if limiter is not None and response.status in RETRY_STATUS_CODES:
+                        raise _RetryableError(error, response.status, retry_after)
+                    raise error
+                html_content, encoding, encoding_source = decode_body(
+                    await response.read(), response.headers.get("Content-Type", ""))
+                response_info = {
+                    "status_code": response.status,
+                    "status_description": get_status_description(response.status),
+                    "headers": dict(response.headers),
+                    "url": str(response.url),
+                    "encoding": encoding,
+                    "encoding_source": encoding_source
+                }
+                return html_content, response_info
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if isinstance(e, asyncio.TimeoutError):
+                message = f"Failed to download webpage: timed out after {self.timeout}s"
+            else:
+                message = f"Failed to download webpage: {str(e)}"
+            error = NetworkError(message)
+            error.__cause__ = e
+            if limiter is not None:
+                limiter.record(url, None, time.monotonic() - start)
+                raise _RetryableError(error)
+            raise error
+
+class _RetryableError(Exception):
+    """Internal: a failed attempt that the rate limiter may retry."""
+
+    def __init__(self, error: NetworkError, status: int = None, retry_after: float = None):
+        super().__init__(str(error))
+        self.error = error
+        self.status = status
+        self.retry_after = retry_after
+
+async def async_webpages_to_markdown(urls: List[str],
+                                     output_dir: str = ".",
+                                     max_concurrency: int = 100,
+                                     per_host_limit: int = 8,
+                                     politeness_delay: float = 0.0,
+                                     content_selectors: list = None,
+                                     conversion_options: dict = None,
+                                     extraction_options: dict = None,
+                                     save_html: bool = False,
+                                     overwrite: bool = False,
+                                     verbose: bool = True,
+                                     rate_limiter: "RateLimiter" = None,
+                                     max_in_flight: int = None) -> List[Dict]:
+    """
+    Convert a batch of webpages to Markdown using the asyncio fetch engine.
+
+    Downloads are scheduled on the event loop; extraction and conversion run
+    in the loop's default executor so they do not stall in-flight fetches.
+    A fixed number of worker tasks each take a page from fetch to written
+    file before starting the next, so downloaded HTML never piles up in
+    memory while it waits for a conversion thread.
+
+    Args:
+        urls: URLs of the webpages to convert
+        output_dir: Directory to save the output files in
+        max_concurrency: Maximum number of open connections across all hosts
+        per_host_limit: Maximum number of open connections per host
+        politeness_delay: Minimum seconds between request starts to one host
+        content_selectors: List of CSS selectors to try for finding main content
+        conversion_options: Options for HTML to Markdown conversion
+        extraction_options: Extra keyword arguments for extract_main_element()
+        save_html: Whether to also save the downloaded HTML
+        overwrite: Whether to overwrite existing files
+        verbose: Whether to print progress information
+        rate_limiter: algo4ratelimit.RateLimiter for adaptive rates and retries
+        max_in_flight: Maximum number of pages between the start of their
+            download and being written (default: 2 * max_concurrency)
+
+    Returns:
+        List of result dictionaries, in the same order as urls, with the
+        keys "url", "html_file", "markdown_file" and "error" (None on success)
+    """
+    loop = asyncio.get_running_loop()
+    max_in_flight = max(1, max_in_flight or 2 * max_concurrency)
+    targets = batch_file_names(urls)
+
+    def process(index: int, html_content: str) -> Tuple[str, str]:
+        html_file = None
+        if save_html:
+            html_file = os.path.join(output_dir, targets[index] + ".html")
+            save_file(html_content, html_file, overwrite)
+        markdown_content = convert_html(html_content, content_selectors, conversion_options,
+                                        extraction_options)
+        markdown_file = os.path.join(output_dir, targets[index] + ".md")
+        save_file(markdown_content, markdown_file, overwrite)
+        return html_file, markdown_file
+
+    async with AsyncFetcher(max_concurrency=max_concurrency,
+                            per_host_limit=per_host_limit,
+                            politeness_delay=politeness_delay,
+                            rate_limiter=rate_limiter) as fetcher:
+
+        async def convert(index: int) -> Dict:
+            url = urls[index]
+            result = {"url": url, "html_file": None, "markdown_file": None, "error": None}
+            try:
+                html_content, _ = await fetcher.fetch(url)
+                result["html_file"], result["markdown_file"] = await loop.run_in_executor(
+                    None, process, index, html_content)
+                if verbose:
+                    print(f"[ok] {url} -> {result['markdown_file']}")
+            except (NetworkError, ContentExtractionError, FileOperationError) as e:
+                result["error"] = str(e)
+                if verbose:
+                    print(f"[failed] {url}: {str(e)}")
+            return result
+
+        results = [None] * len(urls)
+        indices = iter(range(len(urls)))  # Shared by the workers; all run on this loop
+
+        async def worker() -> None:
+            for index in indices:
+                results[index] = await convert(index)
+
+        await asyncio.gather(*(worker() for _ in range(min(max_in_flight, len(urls)))))
+        return results
+
+def webpages_to_markdown_async(urls: List[str], **kwargs) -> List[Dict]:
+    """
+    Synchronous wrapper around async_webpages_to_markdown().
+
+    Args:
+        urls: URLs of the webpages to convert
+        **kwargs: Keyword arguments passed to async_webpages_to_markdown()
+
+    Returns:
+        List of per-URL result dictionaries
+    """
+    return asyncio.run(async_webpages_to_markdown(urls, **kwargs))
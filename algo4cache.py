@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+HTTP Response Cache
+
+This module provides an on-disk cache of downloaded webpages for use with
+download_webpage() in algo4download.py. Entries keep the response body
+together with its validators (ETag / Last-Modified), so repeated runs can
+revalidate with conditional requests and reuse the cached body on a
+304 Not Modified, or skip the network entirely while Cache-Control
+max-age says the entry is still fresh.
+
+It also provides ResultCache, a content-addressed cache of conversion
+results: mirrors, redirects and query-string variants often serve
+byte-identical HTML, and a hash of that HTML plus the conversion settings
+is enough to reuse the Markdown without extracting and converting again.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
+
+# Eviction frees space down to this fraction of the size limit, so the scan
+# and sort it takes run once per that much turnover rather than on every put
+EVICT_LOW_WATER = 0.9
+
+class ResponseCache:
+    """
+    Size-bounded on-disk cache of HTTP responses keyed by normalized URL.
+
+    Each entry is stored as two files in the cache directory: '<key>.json'
+    with the metadata (header names lower-cased) and '<key>.body' with the
+    response text. When the total size exceeds max_bytes, the least recently
+    used entries are evicted until it is back under EVICT_LOW_WATER of that.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: Directory to store cache entries in
+            max_bytes: Maximum total size of cached bodies and metadata
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> [size, last_access]
+        self._total_bytes = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        for name in os.listdir(cache_dir):
+            if name.endswith(".json"):
+                key = name[:-5]
+                size = self._entry_size(key)
+                atime = os.path.getmtime(os.path.join(cache_dir, name))
+                self._entries[key] = [size, atime]
+                self._total_bytes += size
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        """Return the cache key for a normalized URL."""
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def _entry_size(self, key: str) -> int:
+        size = 0
+        for suffix in (".json", ".body"):
+            try:
+                size += os.path.getsize(self._path(key, suffix))
+            except OSError:
+                pass
+        return size
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Look up a cached entry.
+
+        Args:
+            url: Normalized URL
+
+        Returns:
+            Entry dictionary with the keys "meta" and "body", or None
+        """
+        key = self.key_for(url)
+        try:
+            with open(self._path(key, ".json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(self._path(key, ".body"), "r", encoding="utf-8") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+
+        now = time.time()
+        with self._lock:
+            if key in self._entries:
+                self._entries[key][1] = now
+        try:
+            os.utime(self._path(key, ".json"), (now, now))
+        except OSError:
+            pass
+        return {"meta": meta, "body": body}
+
+    def put(self, url: str, body: str, headers: Dict, status_code: int = 200,
+            encoding: str = None) -> None:
+        """
+        Store a response, unless its Cache-Control forbids it.
+
+        Args:
+            url: Normalized URL
+            body: Response text
+            headers: Response headers
+            status_code: HTTP status code of the response
+            encoding: Encoding used to decode the response
+        """
+        headers = {name.lower(): value for name, value in headers.items()}
+        directives = parse_cache_control(headers.get("cache-control", ""))
+        if "no-store" in directives:
+            return
+
+        meta = {
+            "url": url,
+            "status_code": status_code,
+            "headers": headers,
+            "encoding": encoding,
+            "stored_at": time.time(),
+        }
+        key = self.key_for(url)
+        self._write(key, ".body", body)
+        self._write(key, ".json", json.dumps(meta))
+
+        size = self._entry_size(key)
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous:
+                self._total_bytes -= previous[0]
+            self._entries[key] = [size, time.time()]
+            self._total_bytes += size
+            self._evict()
+
+    def refresh(self, url: str, entry: Dict, headers: Dict) -> None:
+        """
+        Update a cached entry after a 304 Not Modified response.
+
+        Args:
+            url: Normalized URL
+            entry: Entry returned by get()
+            headers: Headers of the 304 response
+        """
+        meta = entry["meta"]
+        meta["headers"].update({name.lower(): value for name, value in headers.items()})
+        meta["stored_at"] = time.time()
+        self._write(self.key_for(url), ".json", json.dumps(meta))
+
+    def _write(self, key: str, suffix: str, content: str) -> None:
+        # Write to a temporary file first so readers never see a partial entry
+        path = self._path(key, suffix)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _evict(self) -> None:
+        """Remove least recently used entries down to the low-water mark. Caller holds the lock."""
+        if self._total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICT_LOW_WATER
+        for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= target:
+                break
+            for suffix in (".json", ".body"):
+                try:
+                    os.remove(self._path(key, suffix))
+                except OSError:
+                    pass
+            del self._entries[key]
+            self._total_bytes -= size
+            self.stats["evictions"] += 1
+
+    def record(self, outcome: str) -> Dict:
+        """
+        Count a cache outcome and return a snapshot for response_info.
+
+        Args:
+            outcome: One of "hit", "revalidated" or "miss"
+
+        Returns:
+            Dictionary with the outcome and the current counters
+        """
+        counter = {"hit": "hits", "miss": "misses"}.get(outcome, outcome)
+        with self._lock:
+            self.stats[counter] += 1
+            return {"status": outcome, **self.stats}
+
+class ResultCache:
+    """
+    Content-addressed cache of Markdown, in memory and on disk.
+
+    Keys are SHA-256 hashes of the raw HTML and the settings that affect
+    the output (see key_for()), so an entry never goes stale: different
+    input gives a different key. Recently used results are kept in an
+    in-memory LRU of at most memory_bytes; every result is also stored on
+    disk as '<key>.md', and when the directory grows beyond max_bytes the
+    least recently used files are evicted until it is back under
+    EVICT_LOW_WATER of that.
+
+    The instance is thread-safe, and several processes may share one
+    directory: files are written atomically with os.replace(), reads
+    refresh the file's modification time, which serves as the LRU order,
+    and eviction rescans the directory so it accounts for entries written
+    by other processes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024,
+                 memory_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: Directory to store results in
+            max_bytes: Maximum total size of the results on disk
+            memory_bytes: Maximum total size of the results kept in memory
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> Markdown, least recently used first
+        self._memory_total = 0
+        self._disk_total = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._disk_total = sum(size for _, size, _ in self._scan())
+
+    @staticmethod
+    def key_for(html_content: str, *settings) -> str:
+        """
+        Return the cache key for an HTML document and conversion settings.
+
+        Args:
+            html_content: Raw HTML of the page
+            *settings: JSON-serializable values that affect the output, e.g.
+                the tool version, content selectors and conversion options
+
+        Returns:
+            Hex digest of the settings and the HTML
+        """
+        digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(html_content.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".md")
+
+    def _scan(self) -> list:
+        """Return (key, size, mtime) for every result on disk."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".md"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue  # Evicted by another process meanwhile
+            entries.append((name[:-3], stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, key: str) -> Tuple[Optional[str], str]:
+        """
+        Look up a result.
+
+        Args:
+            key: Key returned by key_for()
+
+        Returns:
+            Tuple of (Markdown or None, where it was found: "memory", "disk"
+            or "miss")
+        """
+        with self._lock:
+            markdown = self._memory.get(key)
+            if markdown is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return markdown, "memory"
+
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                markdown = f.read()
+            now = time.time()
+            os.utime(self._path(key), (now, now))
+        except OSError:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None, "miss"
+
+        with self._lock:
+            self.stats["disk_hits"] += 1
+            self._remember(key, markdown)
+        return markdown, "disk"
+
+    def put(self, key: str, markdown: str) -> None:
+        """
+        Store a result.
+
+        Args:
+            key: Key returned by key_for()
+            markdown: Markdown produced for that key
+        """
+        path = self._path(key)
+        size = 0
+        if not os.path.exists(path):
+            size = len(markdown.encode("utf-8"))
+            # Write to a temporary file first so readers never see a partial result
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(markdown)
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            self._remember(key, markdown)
+            self._disk_total += size
+            if self._disk_total > self.max_bytes:
+                self._evict()
+
+    def _remember(self, key: str, markdown: str) -> None:
+        """Add a result to the in-memory LRU. Caller holds the lock."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        size = len(markdown)
+        if size > self.memory_bytes:
+            return
+        self._memory[key] = markdown
+        self._memory_total += size
+        while self._memory_total > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_total -= len(evicted)
+
+    def _evict(self) -> None:
+        """Remove least recently used files down to the low-water mark. Caller holds the lock."""
+        entries = self._scan()
+        self._disk_total = sum(size for _, size, _ in entries)
+        if self._disk_total <= self.max_bytes:
+            return  # Other processes evicted meanwhile
+        target = self.max_bytes * EVICT_LOW_WATER
+        for key, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if self._disk_total <= target:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                continue  # Already evicted by another process
+            self._disk_total -= size
+            self.stats["evictions"] += 1
+
+def parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    """
+    Parse a Cache-Control header into a dictionary of directives.
+
+    Args:
+        value: Cache-Control header value
+
+    Returns:
+        Dictionary mapping lower-case directive names to their values (or None)
+    """
+    directives = {}
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, arg = part.partition("=")
+        directives[name.strip().lower()] = arg.strip().strip('"') or None
+    return directives
+
+def is_fresh(entry: Dict) -> bool:
+    """
+    Check whether a cached entry may be used without contacting the server.
+
+    Args:
+        entry: Entry returned by ResponseCache.get()
+
+    Returns:
+        True if the entry is within its Cache-Control max-age
+    """
+    meta = entry["meta"]
+    directives = parse_cache_control(meta["headers"].get("cache-control", ""))
+    if "no-cache" in directives or not directives.get("max-age"):
+        return False
+    if not re.fullmatch(r"\d+", directives["max-age"]):
+        return False
+    age = time.time() - meta["stored_at"]
+    initial_age = meta["headers"].get("age", "0")
+    if initial_age.isdigit():
+        age += int(initial_age)
+    return age < int(directives["max-age"])
+
+def conditional_headers(entry: Dict) -> Dict[str, str]:
+    """
+    Build the conditional request headers for revalidating a cached entry.
+
+    Args:
+        entry: Entry returned by ResponseCache.get()
+
+    Returns:
+        Dictionary with If-None-Match and/or If-Modified-Since
+    """
+    headers = {}
+    cached_headers = entry["meta"]["headers"]
+    if cached_headers.get("etag"):
+        headers["If-None-Match"] = cached_headers["etag"]
+    if cached_headers.get("last-modified"):
+        headers["If-Modified-Since"] = cached_headers["last-modified"]
+    return headers
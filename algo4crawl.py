@@ -0,0 +1,693 @@
+#!/usr/bin/env python3
+"""
+Same-Site Crawler
+
+This module crawls a documentation site from a start URL and/or its
+sitemap.xml and runs every page through the existing extract/convert
+stages of algo4download.py. The crawl frontier normalizes and
+de-duplicates URLs with a compact seen-set, is scoped by depth and URL
+prefix, honours robots.txt, and keeps its state on disk so an interrupted
+crawl can be resumed.
+"""
+
+import os
+import sys
+import gzip
+import json
+import array
+import bisect
+import hashlib
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+from xml.etree import ElementTree
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from bs4 import BeautifulSoup
+
+from algo4download import (
+    create_session,
+    download_webpage,
+    normalize_url,
+    unique_file_name,
+    resolve_parser,
+    find_main_element,
+    convert_element,
+    save_file,
+    NetworkError,
+    ContentExtractionError,
+    FileOperationError,
+)
+
+# Links to files with these extensions are never queued
+SKIP_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".pdf", ".zip",
+    ".gz", ".tar", ".tgz", ".mp3", ".mp4", ".webm", ".avi", ".mov", ".css",
+    ".js", ".json", ".woff", ".woff2", ".ttf", ".eot", ".exe", ".dmg",
+}
+
+SITEMAP_NAMESPACE = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+class SeenSet:
+    """
+    Compact set of URL fingerprints.
+
+    Each URL is stored as a 64-bit hash: recent additions go into a small
+    Python set, which is periodically merged into a sorted array of
+    unsigned 64-bit integers. A million URLs take about 8 MB.
+    """
+
+    MERGE_THRESHOLD = 65536
+
+    def __init__(self):
+        self._sorted = array.array("Q")
+        self._recent = set()
+
+    @staticmethod
+    def fingerprint(url: str) -> int:
+        """Return the 64-bit fingerprint of a normalized URL."""
+        return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._recent)
+
+    def __contains__(self, url: str) -> bool:
+        return self._contains(self.fingerprint(url))
+
+    def _contains(self, value: int) -> bool:
+        if value in self._recent:
+            return True
+        index = bisect.bisect_left(self._sorted, value)
+        return index < len(self._sorted) and self._sorted[index] == value
+
+    def add(self, url: str) -> bool:
+        """
+        Add a URL.
+
+        Args:
+            url: Normalized URL
+
+        Returns:
+            True if the URL was not seen before
+        """
+        value = self.fingerprint(url)
+        if self._contains(value):
+            return False
+        self._recent.add(value)
+        if len(self._recent) >= self.MERGE_THRESHOLD:
+            self._merge()
+        return True
+
+    def _merge(self) -> None:
+        merged = array.array("Q", sorted(list(self._sorted) + list(self._recent)))
+        self._sorted = merged
+        self._recent = set()
+
+    def save(self, file_path: str) -> None:
+        """Write the fingerprints to a binary file."""
+        self._merge()
+        with open(file_path, "wb") as f:
+            self._sorted.tofile(f)
+
+    def load(self, file_path: str) -> None:
+        """Read fingerprints written by save()."""
+        values = array.array("Q")
+        with open(file_path, "rb") as f:
+            values.frombytes(f.read())
+        self._sorted = values
+        self._recent = set()
+
+class CrawlState:
+    """
+    Crawl frontier and seen-set, persisted in a state directory.
+
+    What a crawl adds is appended to logs, so a checkpoint only flushes
+    them and rewrites the small 'state.json' (settings, counters, how many
+    frontier log entries have been taken and the pages in flight):
+
+    - the frontier log, 'frontier.jsonl' or 'frontier.<n>.jsonl', holds
+      every queued URL with its depth, in queue order;
+    - 'seen.jsonl' holds URLs seen without being queued (redirect targets);
+    - 'names.jsonl' holds the output file name of each URL, appended as
+      names are assigned so it survives a crash between checkpoints.
+
+    'seen.bin' holds the SeenSet fingerprints as of the last compaction.
+    Once most of the frontier log has been taken, a checkpoint compacts
+    the state: seen.bin is rewritten with every fingerprint, seen.jsonl is
+    dropped and the queued entries move to a new frontier log, which
+    state.json then names.
+    """
+
+    # Compact once this many frontier log entries, and at least half of
+    # them, have been taken
+    COMPACT_MIN_ENTRIES = 10000
+
+    def __init__(self, state_dir: str = None):
+        """
+        Args:
+            state_dir: Directory to persist the crawl state in (optional)
+        """
+        self.state_dir = state_dir
+        self.frontier = deque()
+        self.retry = deque()  # Pages in flight at the last save, taken first
+        self.seen = SeenSet()
+        self.info = {"pages_done": 0, "pages_failed": 0}
+        self.names = {}  # URL -> base file name
+        self._used_names = set()
+        self._names_lock = threading.Lock()
+        self._generation = 0  # Of the frontier log
+        self._frontier_entries = 0
+        self._frontier_taken = 0
+        self._logs = {}  # File name -> open append handle
+
+    def file_name(self, url: str) -> Tuple[str, bool]:
+        """
+        Return the base file name of a URL, assigning a unique one if needed.
+
+        Thread-safe.
+
+        Args:
+            url: Normalized URL as queued
+
+        Returns:
+            Tuple of (base file name, whether it was assigned before, i.e. a
+            resumed crawl may already have written the file)
+        """
+        with self._names_lock:
+            name = self.names.get(url)
+            if name is not None:
+                return name, True
+            name = self.names[url] = unique_file_name(url, self._used_names)
+            if self.state_dir:
+                os.makedirs(self.state_dir, exist_ok=True)
+                with open(os.path.join(self.state_dir, "names.jsonl"), "a", encoding="utf-8") as f:
+                    f.write(json.dumps([url, name]) + "\n")
+            return name, False
+
+    def enqueue(self, url: str, depth: int) -> bool:
+        """Queue a normalized URL unless it was seen before."""
+        if self.seen.add(url):
+            self.frontier.append((url, depth))
+            self._frontier_entries += 1
+            self._append(self._frontier_name(), [url, depth])
+            return True
+        return False
+
+    def mark_seen(self, url: str) -> None:
+        """Record a normalized URL that must not be queued later."""
+        if self.seen.add(url):
+            self._append("seen.jsonl", url)
+
+    def pop(self) -> Tuple[str, int]:
+        """Take the next (url, depth) to crawl."""
+        if self.retry:
+            return self.retry.popleft()
+        self._frontier_taken += 1
+        return self.frontier.popleft()
+
+    def queued(self) -> int:
+        """Return the number of pages waiting to be crawled."""
+        return len(self.retry) + len(self.frontier)
+
+    def exists(self) -> bool:
+        return bool(self.state_dir) and os.path.exists(os.path.join(self.state_dir, "state.json"))
+
+    def save(self, in_flight: Iterable[Tuple[str, int]] = ()) -> None:
+        """
+        Checkpoint the state: flush the logs and replace state.json.
+
+        Args:
+            in_flight: Pages taken but not finished; a resumed crawl
+                takes them first
+        """
+        if not self.state_dir:
+            return
+        os.makedirs(self.state_dir, exist_ok=True)
+        obsolete = None
+        if (self._frontier_taken >= self.COMPACT_MIN_ENTRIES
+                and 2 * self._frontier_taken >= self._frontier_entries):
+            obsolete = self._compact()
+        for f in self._logs.values():
+            f.flush()
+        info = dict(self.info,
+                    frontier_generation=self._generation,
+                    frontier_taken=self._frontier_taken,
+                    retry=[list(item) for item in in_flight] + [list(item) for item in self.retry])
+        with open(self._tmp("state.json"), "w", encoding="utf-8") as f:
+            json.dump(info, f, indent=2)
+        os.replace(self._tmp("state.json"), os.path.join(self.state_dir, "state.json"))
+        if obsolete:
+            os.remove(os.path.join(self.state_dir, obsolete))
+
+    def _compact(self) -> str:
+        """
+        Rewrite seen.bin and start a new frontier log; state.json commits it.
+
+        Returns:
+            File name of the frontier log that the commit makes obsolete
+        """
+        # A superset of what any state.json refers to, so it can go first
+        self.seen.save(self._tmp("seen.bin"))
+        os.replace(self._tmp("seen.bin"), os.path.join(self.state_dir, "seen.bin"))
+        for name in ("seen.jsonl", self._frontier_name()):
+            f = self._logs.pop(name, None)
+            if f is not None:
+                f.close()
+        try:
+            os.remove(os.path.join(self.state_dir, "seen.jsonl"))
+        except FileNotFoundError:
+            pass
+
+        obsolete = self._frontier_name()
+        self._generation += 1
+        with open(os.path.join(self.state_dir, self._frontier_name()), "w", encoding="utf-8") as f:
+            for url, depth in self.frontier:
+                f.write(json.dumps([url, depth]) + "\n")
+        self._frontier_entries = len(self.frontier)
+        self._frontier_taken = 0
+        return obsolete
+
+    def load(self) -> None:
+        """Read the state written by save() and the assigned file names."""
+        with open(os.path.join(self.state_dir, "state.json"), "r", encoding="utf-8") as f:
+            info = json.load(f)
+        self._generation = info.pop("frontier_generation", 0)
+        self._frontier_taken = info.pop("frontier_taken", 0)
+        self.retry = deque((url, depth) for url, depth in info.pop("retry", []))
+        self.info = info
+        try:
+            self.seen.load(os.path.join(self.state_dir, "seen.bin"))
+        except FileNotFoundError:
+            self.seen = SeenSet()  # Not compacted yet
+        self.frontier = deque()
+        self._frontier_entries = 0
+        for url, depth in self._read_log(self._frontier_name()):
+            self.seen.add(url)
+            if self._frontier_entries >= self._frontier_taken:
+                self.frontier.append((url, depth))
+            self._frontier_entries += 1
+        for url in self._read_log("seen.jsonl"):
+            self.seen.add(url)
+        self.names = {}
+        for url, name in self._read_log("names.jsonl"):
+            self.names[url] = name
+        self._used_names = set(self.names.values())
+
+    def reset(self) -> None:
+        """Remove the files of an earlier crawl from the state directory."""
+        if not self.state_dir or not os.path.isdir(self.state_dir):
+            return
+        for name in os.listdir(self.state_dir):
+            if name in ("names.jsonl", "seen.jsonl", "seen.bin") or (
+                    name.startswith("frontier.") and name.endswith(".jsonl")):
+                os.remove(os.path.join(self.state_dir, name))
+
+    def close(self) -> None:
+        """Close the logs."""
+        for f in self._logs.values():
+            f.close()
+        self._logs = {}
+
+    def _frontier_name(self) -> str:
+        return f"frontier.{self._generation}.jsonl" if self._generation else "frontier.jsonl"
+
+    def _append(self, name: str, entry) -> None:
+        if not self.state_dir:
+            return
+        f = self._logs.get(name)
+        if f is None:
+            os.makedirs(self.state_dir, exist_ok=True)
+            f = self._logs[name] = open(os.path.join(self.state_dir, name), "a", encoding="utf-8")
+        f.write(json.dumps(entry) + "\n")
+
+    def _read_log(self, name: str) -> Iterator:
+        """Yield the entries of a log, cutting off a line left unfinished by a crash."""
+        try:
+            f = open(os.path.join(self.state_dir, name), "rb+")
+        except FileNotFoundError:
+            return
+        with f:
+            end = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                end += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                yield entry
+            # Appending after a partial line would corrupt the next entry
+            f.truncate(end)
+
+    def _tmp(self, name: str) -> str:
+        return os.path.join(self.state_dir, name + ".tmp")
+
+class RobotsCache:
+    """Per-host robots.txt rules, fetched once per host through the shared session."""
+
+    def __init__(self, session: "requests.Session", user_agent: str = "*"):
+        self.session = session
+        self.user_agent = user_agent
+        self._parsers = {}
+        self._lock = threading.Lock()
+
+    def _parser(self, url: str) -> RobotFileParser:
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        with self._lock:
+            parser = self._parsers.get(origin)
+        if parser is not None:
+            return parser
+
+        parser = RobotFileParser(origin + "/robots.txt")
+        try:
+            response = self.session.get(origin + "/robots.txt", timeout=30)
+            if response.status_code in (401, 403):
+                parser.disallow_all = True
+            elif response.status_code >= 400:
+                parser.allow_all = True
+            else:
+                parser.parse(response.text.splitlines())
+        except Exception:
+            parser.allow_all = True
+        with self._lock:
+            self._parsers[origin] = parser
+        return parser
+
+    def allowed(self, url: str) -> bool:
+        """Check whether robots.txt allows fetching url."""
+        return self._parser(url).can_fetch(self.user_agent, url)
+
+def in_scope(url: str, prefix: str) -> bool:
+    """
+    Check whether a normalized URL is inside the crawl scope.
+
+    Args:
+        url: Normalized URL
+        prefix: Normalized URL prefix that every crawled page must start with
+
+    Returns:
+        True if the URL should be crawled
+    """
+    if not url.startswith(prefix):
+        return False
+    path = urlparse(url).path.lower()
+    return os.path.splitext(path)[1] not in SKIP_EXTENSIONS
+
+def extract_links(soup: BeautifulSoup, page_url: str) -> List[str]:
+    """
+    Collect the normalized http(s) links of a parsed page.
+
+    Args:
+        soup: Parsed document
+        page_url: URL the page was fetched from
+
+    Returns:
+        List of normalized absolute URLs
+    """
+    base = soup.find("base", href=True)
+    base_url = urljoin(page_url, base["href"]) if base else page_url
+    links = []
+    for anchor in soup.find_all("a", href=True):
+        href = anchor["href"].strip()
+        if not href or href.startswith(("#", "mailto:", "javascript:", "tel:")):
+            continue
+        url = urljoin(base_url, href)
+        if urlparse(url).scheme in ("http", "https"):
+            links.append(normalize_url(url))
+    return links
+
+def fetch_sitemap(url: str, session: "requests.Session", max_sitemaps: int = 1000) -> List[str]:
+    """
+    Read the page URLs listed in a sitemap, following sitemap indexes.
+
+    Args:
+        url: URL of sitemap.xml (or a sitemap index, optionally gzipped)
+        session: requests session to use
+        max_sitemaps: Maximum number of sitemap files to read
+
+    Returns:
+        List of normalized page URLs
+    """
+    pages = []
+    pending = [url]
+    visited = set()
+    while pending and len(visited) < max_sitemaps:
+        sitemap_url = pending.pop()
+        if sitemap_url in visited:
+            continue
+        visited.add(sitemap_url)
+        try:
+            response = session.get(sitemap_url, timeout=30)
+            response.raise_for_status()
+            content = response.content
+            if content[:2] == b"\x1f\x8b":
+                content = gzip.decompress(content)
+            root = ElementTree.fromstring(content)
+        except Exception:
+            continue
+        for loc in root.iter(SITEMAP_NAMESPACE + "loc"):
+            location = (loc.text or "").strip()
+            if not location:
+                continue
+            if root.tag == SITEMAP_NAMESPACE + "sitemapindex":
+                pending.append(location)
+            else:
+                pages.append(normalize_url(location))
+    return pages
+
+def crawl_site(start_url: str = None,
+               sitemap_url: str = None,
+               output_dir: str = ".",
+               prefix: str = None,
+               max_depth: int = 5,
+               max_pages: int = None,
+               workers: int = 8,
+               state_dir: str = None,
+               respect_robots: bool = True,
+               content_selectors: list = None,
+               conversion_options: dict = None,
+               extraction_options: dict = None,
+               overwrite: bool = False,
+               verbose: bool = True,
+               checkpoint_every: int = 100,
+               session: "requests.Session" = None,
+               download_options: dict = None,
+               on_page: Callable[[Dict], None] = None) -> Dict:
+    """
+    Crawl a site and convert every in-scope page to Markdown.
+
+    Up to `workers` pages are in flight at a time, and the next page is
+    started as soon as one finishes; links found on a page are queued at
+    depth + 1. When state_dir holds a previous crawl, it is resumed from
+    its saved frontier and seen-set, retrying the pages that were in flight.
+
+    Args:
+        start_url: URL to start crawling from (optional if sitemap_url is given)
+        sitemap_url: URL of a sitemap.xml whose pages seed the crawl (optional)
+        output_dir: Directory to save the Markdown files in
+        prefix: Only crawl URLs starting with this prefix
+            (default: the scheme and host of the first seed)
+        max_depth: Maximum link depth from the seeds
+        max_pages: Stop after this many pages have been processed (optional)
+        workers: Number of concurrent downloads
+        state_dir: Directory to keep resumable crawl state in (optional)
+        respect_robots: Whether to honour robots.txt
+        content_selectors: List of CSS selectors to try for finding main content
+        conversion_options: Options for HTML to Markdown conversion
+        extraction_options: Extra keyword arguments for extract_main_element();
+            only "parser" applies here
+        overwrite: Whether to overwrite existing files
+        verbose: Whether to print progress information
+        checkpoint_every: Save the state after this many pages
+        session: Shared requests session (one is created if not provided)
+        download_options: Extra keyword arguments for download_webpage()
+        on_page: Called with the result of each page as it finishes, a
+            dictionary with "url", "final_url", "depth", "markdown_file"
+            and "error" (optional)
+
+    Returns:
+        Summary dictionary with the counters
+
+    Raises:
+        ValueError: If neither start_url nor sitemap_url is given
+    """
+    if not start_url and not sitemap_url:
+        raise ValueError("A start URL or a sitemap URL is required")
+
+    workers = max(1, workers)
+    if session is None:
+        session = create_session(pool_maxsize=workers)
+    parser = resolve_parser((extraction_options or {}).get("parser"))
+    robots = RobotsCache(session) if respect_robots else None
+
+    state = CrawlState(state_dir)
+    if state.exists():
+        state.load()
+        prefix = state.info["prefix"]
+        max_depth = state.info["max_depth"]
+        if verbose:
+            print(f"Resuming crawl: {state.queued()} queued, {len(state.seen)} seen")
+    else:
+        seeds = []
+        if start_url:
+            seeds.append(normalize_url(start_url))
+        if sitemap_url:
+            seeds.extend(fetch_sitemap(sitemap_url, session))
+        if not seeds:
+            raise ValueError("No pages found to crawl")
+        if prefix is None:
+            parsed = urlparse(seeds[0])
+            prefix = f"{parsed.scheme}://{parsed.netloc}/"
+        else:
+            prefix = normalize_url(prefix)
+        state.info.update({"prefix": prefix, "max_depth": max_depth})
+        state.reset()
+        for url in seeds:
+            if in_scope(url, prefix):
+                state.enqueue(url, 0)
+
+    def process(item: Tuple[str, int]) -> Dict:
+        url, depth = item
+        result = {"url": url, "final_url": url, "depth": depth, "markdown_file": None,
+                  "links": [], "error": None}
+        try:
+            if robots is not None and not robots.allowed(url):
+                result["error"] = "Disallowed by robots.txt"
+                return result
+            html_content, response_info = download_webpage(url, session=session,
+                                                           **(download_options or {}))
+            # Relative links are relative to where a redirect ended up
+            final_url = result["final_url"] = normalize_url(response_info.get("url") or url)
+            soup = BeautifulSoup(html_content, parser)
+            del html_content
+            if depth < max_depth and in_scope(final_url, prefix):
+                result["links"] = extract_links(soup, final_url)
+            markdown_content = convert_element(find_main_element(soup, content_selectors),
+                                               conversion_options)
+            name, assigned_before = state.file_name(url)
+            markdown_file = os.path.join(output_dir, name + ".md")
+            # A file named in an earlier run of this crawl is this page's own output
+            save_file(markdown_content, markdown_file, overwrite or assigned_before)
+            result["markdown_file"] = markdown_file
+        except (NetworkError, ContentExtractionError, FileOperationError) as e:
+            result["error"] = str(e)
+        return result
+
+    in_flight = {}  # Future -> (url, depth)
+    since_checkpoint = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                while state.queued() and len(in_flight) < workers:
+                    if max_pages is not None and (state.info["pages_done"] + state.info["pages_failed"]
+                                                  + len(in_flight)) >= max_pages:
+                        break
+                    item = state.pop()
+                    in_flight[executor.submit(process, item)] = item
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    del in_flight[future]
+                    if result["error"]:
+                        state.info["pages_failed"] += 1
+                    else:
+                        state.info["pages_done"] += 1
+                    if result["final_url"] != result["url"]:
+                        state.mark_seen(result["final_url"])  # Do not fetch it again via a link
+                    for link in result.pop("links"):
+                        if in_scope(link, prefix):
+                            state.enqueue(link, result["depth"] + 1)
+                    if on_page is not None:
+                        on_page(result)
+                    if verbose:
+                        if result["error"]:
+                            print(f"[failed] {result['url']}: {result['error']}")
+                        else:
+                            print(f"[ok] {result['url']} -> {result['markdown_file']}")
+                    since_checkpoint += 1
+                if since_checkpoint >= checkpoint_every:
+                    state.save(in_flight.values())
+                    since_checkpoint = 0
+    finally:
+        # A resumed crawl retries the pages that were still in flight
+        state.save(in_flight.values())
+        state.close()
+
+    return {
+        "pages_done": state.info["pages_done"],
+        "pages_failed": state.info["pages_failed"],
+        "queued": state.queued(),
+        "seen": len(state.seen),
+    }
+
+def main():
+    """Command line interface for the same-site crawler."""
+    parser = argparse.ArgumentParser(
+        description="Crawl a website and convert its pages to Markdown",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s https://docs.example.com/ --output-dir docs
+  %(prog)s --sitemap https://docs.example.com/sitemap.xml --max-depth 0
+  %(prog)s https://example.com/docs/ --prefix https://example.com/docs/ --state-dir .crawl
+        """
+    )
+
+    parser.add_argument("url", nargs="?", help="URL to start crawling from")
+    parser.add_argument("--sitemap", help="URL of a sitemap.xml to seed the crawl with")
+    parser.add_argument("--output-dir", default=".",
+                       help="Directory for the Markdown files (default: current directory)")
+    parser.add_argument("--prefix", help="Only crawl URLs starting with this prefix")
+    parser.add_argument("--max-depth", type=int, default=5,
+                       help="Maximum link depth from the seeds (default: 5)")
+    parser.add_argument("--max-pages", type=int, help="Stop after this many pages")
+    parser.add_argument("--workers", type=int, default=8,
+                       help="Number of concurrent downloads (default: 8)")
+    parser.add_argument("--state-dir", help="Directory for resumable crawl state")
+    parser.add_argument("--ignore-robots", action="store_true", help="Do not honour robots.txt")
+    parser.add_argument("--content-selectors", nargs="+",
+                       help="CSS selectors to try for finding main content")
+    parser.add_argument("--overwrite", action="store_true", help="Overwrite existing files")
+    parser.add_argument("--quiet", action="store_true", help="Suppress progress information")
+
+    args = parser.parse_args()
+
+    if not args.url and not args.sitemap:
+        parser.error("either a URL or --sitemap is required")
+
+    try:
+        summary = crawl_site(
+            start_url=args.url,
+            sitemap_url=args.sitemap,
+            output_dir=args.output_dir,
+            prefix=args.prefix,
+            max_depth=args.max_depth,
+            max_pages=args.max_pages,
+            workers=args.workers,
+            state_dir=args.state_dir,
+            respect_robots=not args.ignore_robots,
+            content_selectors=args.content_selectors,
+            overwrite=args.overwrite,
+            verbose=not args.quiet
+        )
+    except (ValueError, FileOperationError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\nCrawl interrupted; state saved" if args.state_dir else "\nCrawl interrupted",
+              file=sys.stderr)
+        sys.exit(130)
+
+    if not args.quiet:
+        print(f"Converted {summary['pages_done']} pages, {summary['pages_failed']} failed, "
+              f"{summary['queued']} still queued")
+
+if __name__ == "__main__":
+    main()
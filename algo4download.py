@@ -9,16 +9,76 @@ extracting the main content, and converting it to Markdown format.
 import os
 import re
 import sys
-import argparse
-from typing import Optional, Tuple, Dict
-try:
-    import requests
-    from bs4 import BeautifulSoup
-    import html2text
-except ImportError as e:
-    print(f"Error: Required package not found. Please install: {e}")
-    print("Run: pip install requests beautifulsoup4 html2text")
-    sys.exit(1)
+import time
+import codecs
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from typing import Callable, Optional, Tuple, Dict, List
+
+# Version of the extraction and conversion algorithm, used to fingerprint outputs
+__version__ = "0.2.2"
+
+class MissingDependencyError(ImportError):
+    """Exception raised when a required package is not installed."""
+    pass
+
+# Heavy dependencies, imported on first use so that importing this module
+# (and starting web2md.py or a CLI) stays cheap
+requests = None
+TimedHTTPAdapter = reset_connection_timings = take_connection_timings = None
+BeautifulSoup = SoupStrainer = Tag = NavigableString = None
+html2text = None
+
+def _missing_dependency(e: ImportError) -> MissingDependencyError:
+    return MissingDependencyError(f"Required package not found: {e}. "
+                                  "Run: pip install requests beautifulsoup4 html2text")
+
+def _import_requests() -> None:
+    """Import requests and the timed connection adapter on first use."""
+    global requests, TimedHTTPAdapter, reset_connection_timings, take_connection_timings
+    if requests is not None:
+        return
+    try:
+        import requests as requests_module
+        from algo4metrics import TimedHTTPAdapter, reset_connection_timings, take_connection_timings
+    except ImportError as e:
+        raise _missing_dependency(e) from e
+    requests = requests_module
+
+def _import_bs4() -> None:
+    """Import BeautifulSoup on first use."""
+    global BeautifulSoup, SoupStrainer, Tag, NavigableString
+    if Tag is not None:
+        return
+    try:
+        from bs4 import BeautifulSoup, SoupStrainer, NavigableString
+        from bs4 import Tag as tag_class
+    except ImportError as e:
+        raise _missing_dependency(e) from e
+    Tag = tag_class
+
+def _import_html2text() -> None:
+    """Import html2text on first use."""
+    global html2text
+    if html2text is not None:
+        return
+    try:
+        import html2text as html2text_module
+    except ImportError as e:
+        raise _missing_dependency(e) from e
+    html2text = html2text_module
+
+def import_dependencies() -> None:
+    """
+    Import all required packages now instead of on first use.
+    
+    Raises:
+        MissingDependencyError: If a required package is not installed
+    """
+    _import_requests()
+    _import_bs4()
+    _import_html2text()
 
 # HTTP status code descriptions
 HTTP_STATUS_CODES = {
@@ -99,46 +159,286 @@ def get_status_description(status_code: int) -> str:
     """
     return HTTP_STATUS_CODES.get(status_code, f"Unknown Status Code: {status_code}")
 
-def download_webpage(url: str, timeout: int = 30, user_agent: str = None) -> Tuple[str, Dict]:
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+# Streaming download limits
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "application/xml", "text/xml")
+
+# Charset resolution: <meta> is looked for in the first META_SNIFF_BYTES,
+# statistical detection only ever sees the first DETECT_BYTES
+META_SNIFF_BYTES = 4096
+DETECT_BYTES = 64 * 1024
+BYTE_ORDER_MARKS = ((b"\xef\xbb\xbf", "utf-8-sig"), (b"\xff\xfe", "utf-16"), (b"\xfe\xff", "utf-16"))
+HEADER_CHARSET = re.compile(r"charset\s*=\s*[\"']?\s*([\w.:-]+)", re.I)
+META_CHARSET = re.compile(rb"<meta\b[^>]*?charset\s*=\s*[\"']?\s*([\w.:-]+)", re.I)
+
+def normalize_encoding(name: str) -> Optional[str]:
+    """
+    Map a charset label to a Python codec name.
+    
+    Like browsers, labels for ISO-8859-1 and US-ASCII are read as
+    windows-1252, a superset of both.
+    
+    Args:
+        name: Charset label, e.g. from a header or <meta> tag
+        
+    Returns:
+        Codec name, or None if the label is unknown
+    """
+    try:
+        codec = codecs.lookup(name.strip()).name
+    except LookupError:
+        return None
+    if codec in ("iso8859-1", "ascii"):
+        return "cp1252"
+    return codec
+
+def resolve_encoding(prefix: bytes, content_type: str = "") -> Tuple[str, str]:
+    """
+    Decide how to decode an HTML body.
+    
+    The sources are tried in order: a byte order mark, the charset in the
+    Content-Type header, a <meta charset> or http-equiv declaration in the
+    first META_SNIFF_BYTES, and finally detection on the prefix only: valid
+    UTF-8 is taken as UTF-8, anything else goes to the charset detector that
+    ships with requests.
+    
+    Args:
+        prefix: First bytes of the body (up to DETECT_BYTES are used)
+        content_type: Value of the Content-Type header
+        
+    Returns:
+        Tuple of (codec name, source), where source is "bom", "http-header",
+        "meta", "detected" or "default"
+    """
+    for mark, encoding in BYTE_ORDER_MARKS:
+        if prefix.startswith(mark):
+            return encoding, "bom"
+    
+    match = HEADER_CHARSET.search(content_type or "")
+    if match:
+        encoding = normalize_encoding(match.group(1))
+        if encoding:
+            return encoding, "http-header"
+    
+    match = META_CHARSET.search(prefix[:META_SNIFF_BYTES])
+    if match:
+        encoding = normalize_encoding(match.group(1).decode("ascii"))
+        if encoding:
+            # A document that can declare itself in ASCII is not UTF-16
+            return ("utf-8" if encoding.startswith("utf-16") else encoding), "meta"
+    
+    prefix = prefix[:DETECT_BYTES]
+    try:
+        # Not final: the prefix may end inside a multi-byte sequence
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        return "utf-8", "detected"
+    except UnicodeDecodeError:
+        pass
+    try:
+        from requests.compat import chardet
+        encoding = chardet.detect(prefix).get("encoding") if chardet else None
+    except ImportError:
+        encoding = None
+    encoding = normalize_encoding(encoding) if encoding else None
+    if encoding:
+        return encoding, "detected"
+    return "cp1252", "default"
+
+def decode_body(body: bytes, content_type: str = "") -> Tuple[str, str, str]:
+    """
+    Decode an HTML body with resolve_encoding().
+    
+    Args:
+        body: Raw (decompressed) body
+        content_type: Value of the Content-Type header
+        
+    Returns:
+        Tuple of (text, codec name, source); undecodable bytes are replaced
+    """
+    encoding, source = resolve_encoding(body[:DETECT_BYTES], content_type)
+    return body.decode(encoding, errors="replace"), encoding, source
+
+def build_request_headers(user_agent: str = None) -> Dict[str, str]:
+    """
+    Build the default request headers used for every download.
+    
+    Args:
+        user_agent: Custom user agent string
+        
+    Returns:
+        Dictionary of HTTP request headers
+    """
+    return {
+        "User-Agent": user_agent or DEFAULT_USER_AGENT,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+    }
+
+def create_session(pool_connections: int = 10,
+                   pool_maxsize: int = 10,
+                   user_agent: str = None) -> "requests.Session":
+    """
+    Create a requests session with a tuned connection pool.
+    
+    A shared session keeps connections alive between downloads, so repeated
+    requests to the same host reuse the existing TCP/TLS connection. New
+    connections record their DNS and connect times for download_webpage().
+    
+    Args:
+        pool_connections: Number of per-host connection pools to keep
+        pool_maxsize: Maximum number of connections kept alive per host
+        user_agent: Custom user agent string
+        
+    Returns:
+        Configured requests.Session
+    """
+    _import_requests()
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(pool_connections=pool_connections,
+                          pool_maxsize=pool_maxsize,
+                          pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(build_request_headers(user_agent))
+    return session
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so that equivalent spellings compare equal.
+    
+    Lower-cases the scheme and host, drops default ports and the fragment,
+    and sorts the query parameters.
+    
+    Args:
+        url: URL to normalize
+        
+    Returns:
+        Normalized URL
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    if parsed.port and not (scheme, parsed.port) in (("http", 80), ("https", 443)):
+        host = f"{host}:{parsed.port}"
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, host, parsed.path or "/", parsed.params, query, ""))
+
+def download_webpage(url: str, timeout: int = 30, user_agent: str = None,
+                     session: "requests.Session" = None,
+                     cache: "ResponseCache" = None,
+                     stream: bool = False,
+                     max_bytes: int = DEFAULT_MAX_BYTES,
+                     rate_limiter: "RateLimiter" = None) -> Tuple[str, Dict]:
     """
     Download HTML content from a URL.
     
+    When a response cache is given, a fresh cached copy is returned without
+    contacting the server, and a stale one is revalidated with a conditional
+    request. response_info["cache"] then reports the outcome and counters.
+    
+    In streaming mode the Content-Type and Content-Length headers are checked
+    before the body is read, and the body is read and decoded in chunks up
+    to max_bytes.
+    
+    The body is decoded with resolve_encoding(); response_info["encoding"]
+    holds the codec used and response_info["encoding_source"] how it was
+    chosen ("bom", "http-header", "meta", "detected" or "default").
+    
+    response_info["timings"] holds "dns_ms" and "connect_ms" (None when a
+    kept-alive connection was reused or no create_session() session was
+    given), "ttfb_ms", "body_ms" and "total_ms"; response_info["transfer"]
+    holds "wire_bytes" (as received, possibly compressed) and
+    "decoded_bytes".
+    
+    With a rate limiter, the request waits for its host's turn, and 429,
+    503 and other transient failures are retried with backoff, honouring
+    Retry-After; only the last attempt's error is raised.
+    
     Args:
         url: URL to download
         timeout: Request timeout in seconds
         user_agent: Custom user agent string
+        session: Shared requests session to reuse pooled connections (optional)
+        cache: algo4cache.ResponseCache for conditional requests (optional)
+        stream: Whether to stream the body with early rejection
+        max_bytes: Maximum body size in streaming mode
+        rate_limiter: algo4ratelimit.RateLimiter shared by all workers (optional)
         
     Returns:
         Tuple of (html_content, response_info)
         
     Raises:
+        ResponseRejectedError: If a streamed response is not HTML or too large
         NetworkError: If download fails
     """
-    if user_agent is None:
-        user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+    _import_requests()
+    headers = build_request_headers(user_agent)
+    http = session if session is not None else requests
+    start = time.perf_counter()
     
-    headers = {
-        "User-Agent": user_agent,
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-        "Accept-Encoding": "gzip, deflate",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-    }
+    entry = None
+    if cache is not None:
+        from algo4cache import is_fresh, conditional_headers
+        cache_key = normalize_url(url)
+        entry = cache.get(cache_key)
+        if entry is not None:
+            if is_fresh(entry):
+                response_info = cached_response_info(entry, 200, cache.record("hit"))
+                response_info["timings"] = request_timings(start, None, {})
+                response_info["transfer"] = {"wire_bytes": 0, "decoded_bytes": 0}
+                return entry["body"], response_info
+            headers.update(conditional_headers(entry))
     
     try:
-        response = requests.get(url, headers=headers, timeout=timeout)
+        reset_connection_timings()
+        if rate_limiter is not None:
+            response = rate_limiter.get(http, url, headers=headers, timeout=timeout, stream=stream)
+        else:
+            response = http.get(url, headers=headers, timeout=timeout, stream=stream)
+        connection_timings = take_connection_timings()
+        
+        if response.status_code == 304 and entry is not None:
+            response.close()
+            cache.refresh(cache_key, entry, response.headers)
+            response_info = cached_response_info(entry, 304, cache.record("revalidated"))
+            response_info["timings"] = request_timings(start, response, connection_timings)
+            response_info["transfer"] = {"wire_bytes": 0, "decoded_bytes": 0}
+            return entry["body"], response_info
+        
         response.raise_for_status()
         
+        if stream:
+            transfer = {}
+            html_content, encoding, encoding_source = read_streamed_body(response, max_bytes, transfer)
+        else:
+            body = response.content
+            html_content, encoding, encoding_source = decode_body(
+                body, response.headers.get("Content-Type", ""))
+            transfer = {"decoded_bytes": len(body)}
+        
         response_info = {
             "status_code": response.status_code,
             "status_description": get_status_description(response.status_code),
             "headers": dict(response.headers),
             "url": response.url,
-            "encoding": response.encoding
+            "encoding": encoding,
+            "encoding_source": encoding_source
         }
+        transfer["wire_bytes"] = response.raw.tell() if hasattr(response.raw, "tell") else None
+        response_info["transfer"] = transfer
+        response_info["timings"] = request_timings(start, response, connection_timings)
+        if cache is not None:
+            cache.put(cache_key, html_content, response.headers,
+                      response.status_code, encoding)
+            response_info["cache"] = cache.record("miss")
         
-        return response.text, response_info
+        return html_content, response_info
         
     except requests.exceptions.RequestException as e:
         error_msg = f"Failed to download webpage: {str(e)}"
@@ -147,66 +447,557 @@ def download_webpage(url: str, timeout: int = 30, user_agent: str = None) -> Tup
             error_msg = f"HTTP {status_code} ({get_status_description(status_code)}): {str(e)}"
         raise NetworkError(error_msg) from e
 
-def extract_main_content(html_content: str, content_selectors: list = None) -> str:
+def read_streamed_body(response: "requests.Response", max_bytes: int,
+                       transfer: Dict = None) -> Tuple[str, str, str]:
+    """
+    Read and decode a streamed response body in chunks.
+    
+    The response is rejected from its headers alone when the Content-Type is
+    not HTML or the Content-Length exceeds max_bytes, and while reading as
+    soon as the body grows past max_bytes. The connection is always released.
+    The charset is resolved from the first DETECT_BYTES, see resolve_encoding().
+    
+    Args:
+        response: Response requested with stream=True
+        max_bytes: Maximum number of (decompressed) body bytes to accept
+        transfer: Dictionary that receives "decoded_bytes" (optional)
+        
+    Returns:
+        Tuple of (decoded body text, codec name, encoding source)
+        
+    Raises:
+        ResponseRejectedError: If the response is not HTML or too large
+    """
+    try:
+        content_type = response.headers.get("Content-Type", "")
+        media_type = content_type.split(";")[0].strip().lower()
+        if media_type and media_type not in HTML_CONTENT_TYPES:
+            raise ResponseRejectedError(f"Unsupported content type: {media_type} ({response.url})")
+        
+        content_length = response.headers.get("Content-Length", "")
+        if content_length.isdigit() and int(content_length) > max_bytes:
+            raise ResponseRejectedError(
+                f"Response too large: {content_length} bytes exceeds the "
+                f"limit of {max_bytes} bytes ({response.url})")
+        
+        # Hold back the first chunks until there is enough to resolve the charset
+        decoder = None
+        pending = []
+        parts = []
+        received = 0
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            received += len(chunk)
+            if received > max_bytes:
+                raise ResponseRejectedError(
+                    f"Response too large: body exceeds the limit of {max_bytes} bytes ({response.url})")
+            if decoder is not None:
+                parts.append(decoder.decode(chunk))
+                continue
+            pending.append(chunk)
+            if received >= DETECT_BYTES:
+                decoder, encoding, source = _streaming_decoder(b"".join(pending), content_type)
+                parts.append(decoder.decode(b"".join(pending)))
+                pending = None
+        if decoder is None:
+            decoder, encoding, source = _streaming_decoder(b"".join(pending), content_type)
+            parts.append(decoder.decode(b"".join(pending)))
+        parts.append(decoder.decode(b"", final=True))
+        if transfer is not None:
+            transfer["decoded_bytes"] = received
+        return "".join(parts), encoding, source
+    finally:
+        response.close()
+
+def _streaming_decoder(prefix: bytes, content_type: str) -> Tuple["codecs.IncrementalDecoder", str, str]:
+    encoding, source = resolve_encoding(prefix, content_type)
+    return codecs.getincrementaldecoder(encoding)(errors="replace"), encoding, source
+
+def request_timings(start: float, response: Optional["requests.Response"],
+                    connection_timings: Dict) -> Dict:
+    """
+    Split the time spent on a request into its phases.
+    
+    Args:
+        start: time.perf_counter() value taken before the request
+        response: Response whose body has been read, or None for a cache hit
+        connection_timings: Result of take_connection_timings() for the request
+        
+    Returns:
+        Dictionary with "dns_ms", "connect_ms", "ttfb_ms", "body_ms" and "total_ms"
+    """
+    total_ms = (time.perf_counter() - start) * 1000
+    dns_ms = connection_timings.get("dns_ms")
+    connect_ms = connection_timings.get("connect_ms")
+    if response is None:
+        return {"dns_ms": None, "connect_ms": None, "ttfb_ms": None,
+                "body_ms": None, "total_ms": total_ms}
+    # requests measures elapsed up to the response headers, including any
+    # connection setup
+    headers_ms = response.elapsed.total_seconds() * 1000
+    ttfb_ms = headers_ms - (dns_ms or 0) - (connect_ms or 0)
+    return {"dns_ms": dns_ms, "connect_ms": connect_ms, "ttfb_ms": max(0.0, ttfb_ms),
+            "body_ms": max(0.0, total_ms - headers_ms), "total_ms": total_ms}
+
+def cached_response_info(entry: Dict, status_code: int, cache_stats: Dict) -> Dict:
+    """
+    Build response_info for a page served from the response cache.
+    
+    Args:
+        entry: Entry returned by ResponseCache.get()
+        status_code: 200 for a fresh hit, 304 for a revalidated entry
+        cache_stats: Cache outcome and counters from ResponseCache.record()
+        
+    Returns:
+        response_info dictionary
+    """
+    meta = entry["meta"]
+    return {
+        "status_code": status_code,
+        "status_description": get_status_description(status_code),
+        "headers": meta["headers"],
+        "url": meta["url"],
+        "encoding": meta["encoding"],
+        "encoding_source": "cache",
+        "cache": cache_stats
+    }
+
+# Default selectors for common content areas, in priority order
+DEFAULT_CONTENT_SELECTORS = [
+    "article.nextra-content",  # Nextra documentation (used in our example)
+    "article.content",
+    "main[role='main']",
+    ".content",
+    "#content",
+    "article",
+    "main",
+    ".main-content",
+    "#main-content"
+]
+
+DEFAULT_PARSER = "html.parser"
+
+# Elements removed from the document before the largest-text-block fallback
+FALLBACK_REMOVED_TAGS = ['script', 'style', 'nav', 'header', 'footer', 'aside']
+
+# Simple compound selectors: optional tag name followed by .class, #id and [attr='value'] parts
+SIMPLE_SELECTOR = re.compile(r"^([a-zA-Z][\w-]*)?((?:\.[\w-]+|#[\w-]+|\[[\w-]+(?:=['\"]?[^'\"\]]*['\"]?)?\])*)$")
+SIMPLE_SELECTOR_PART = re.compile(r"\.([\w-]+)|#([\w-]+)|\[([\w-]+)(=['\"]?([^'\"\]]*)['\"]?)?\]")
+
+# Attributes BeautifulSoup splits into lists of values (its cdata-list
+# attributes); [attr=value] on them is not a plain string comparison, so
+# such selectors are left to soupsieve
+MULTI_VALUED_ATTRIBUTES = {"class", "accesskey", "dropzone", "rel", "rev", "headers",
+                           "accept-charset", "archive", "sizes", "sandbox", "for"}
+
+def resolve_parser(parser: str = None) -> str:
+    """
+    Resolve a parser backend name for BeautifulSoup.
+    
+    Args:
+        parser: "html.parser", "lxml", or "auto" to use lxml when it is
+            installed and html.parser otherwise (default: DEFAULT_PARSER)
+        
+    Returns:
+        Parser name to pass to BeautifulSoup
+    """
+    if parser is None:
+        return DEFAULT_PARSER
+    if parser == "auto":
+        try:
+            import lxml  # noqa: F401
+            return "lxml"
+        except ImportError:
+            return "html.parser"
+    return parser
+
+class SelectorSet:
+    """
+    A compiled, prioritized set of CSS selectors matched in one traversal.
+    
+    match() walks the document once and returns the element that
+    soup.select(selector)[0] would give for the first selector in the list
+    that matches anything. Simple selectors (tag, .class, #id, [attr=value])
+    are checked directly; anything else goes through soupsieve.
+    """
+    
+    def __init__(self, selectors: list):
+        """
+        Args:
+            selectors: CSS selectors in priority order
+        """
+        self.selectors = list(selectors)
+        self._matchers = [self._compile(selector) for selector in self.selectors]
+    
+    @staticmethod
+    def parse_simple(selector: str) -> Optional[Tuple[Optional[str], Dict]]:
+        """
+        Parse a simple compound selector.
+        
+        Args:
+            selector: CSS selector
+            
+        Returns:
+            Tuple of (tag name or None, {"class": [...], "id": ..., attr: value or True}),
+            or None if the selector is not simple. Attribute selectors on
+            MULTI_VALUED_ATTRIBUTES, or naming one attribute twice, are not
+            simple.
+        """
+        match = SIMPLE_SELECTOR.match(selector.strip())
+        if not match or not selector.strip():
+            return None
+        attrs = {"class": []}
+        for class_name, id_name, attr, equals, value in SIMPLE_SELECTOR_PART.findall(match.group(2)):
+            if class_name:
+                attrs["class"].append(class_name)
+                continue
+            attr = "id" if id_name else attr.lower()
+            if attr in attrs or attr in MULTI_VALUED_ATTRIBUTES:
+                return None
+            if id_name:
+                attrs["id"] = id_name
+            else:
+                # [attr] tests presence; [attr=''] an empty value
+                attrs[attr] = value if equals else True
+        return (match.group(1).lower() if match.group(1) else None), attrs
+    
+    def _compile(self, selector: str):
+        simple = self.parse_simple(selector)
+        if simple is None:
+            import soupsieve
+            return soupsieve.compile(selector).match
+        
+        name, attrs = simple
+        classes = attrs.pop("class")
+        
+        def match(element: "Tag") -> bool:
+            if name is not None and element.name != name:
+                return False
+            if classes:
+                element_classes = element.get("class") or []
+                if any(class_name not in element_classes for class_name in classes):
+                    return False
+            for attr, value in attrs.items():
+                element_value = element.get(attr)
+                if element_value is None or (value is not True and element_value != value):
+                    return False
+            return True
+        
+        return match
+    
+    def match(self, soup: "BeautifulSoup") -> Optional["Tag"]:
+        """
+        Find the highest-priority match in a single traversal.
+        
+        Args:
+            soup: Parsed document
+            
+        Returns:
+            Matched element, or None
+        """
+        return self.match_with_selector(soup)[0]
+    
+    def match_with_selector(self, soup: "BeautifulSoup") -> Tuple[Optional["Tag"], Optional[str]]:
+        """
+        Same as match(), but also report which selector matched.
+        
+        Args:
+            soup: Parsed document
+            
+        Returns:
+            Tuple of (matched element, selector), or (None, None)
+        """
+        _import_bs4()
+        matchers = self._matchers
+        best_index = len(matchers)
+        best_element = None
+        for element in soup.descendants:
+            if not isinstance(element, Tag):
+                continue
+            # Only selectors with a higher priority than the current best can improve it
+            for index in range(best_index):
+                if matchers[index](element):
+                    best_index = index
+                    best_element = element
+                    break
+            if best_index == 0:
+                break
+        if best_element is None:
+            return None, None
+        return best_element, self.selectors[best_index]
+    
+    def strainer(self, selector: str) -> Optional["SoupStrainer"]:
+        """
+        Build a SoupStrainer that parses only elements that may match selector.
+        
+        Args:
+            selector: CSS selector
+            
+        Returns:
+            SoupStrainer, or None if the selector is not simple enough
+        """
+        simple = self.parse_simple(selector)
+        if simple is None:
+            return None
+        _import_bs4()
+        name, attrs = simple
+        classes = attrs.pop("class")
+        if classes:
+            attrs["class"] = classes[0]
+        if name is None and not attrs:
+            return None
+        return SoupStrainer(name, attrs=attrs)
+
+# Compiled selector lists kept by compile_selectors(), least recently used first
+MAX_SELECTOR_SETS = 256
+_selector_sets = OrderedDict()
+_selector_sets_lock = threading.Lock()
+
+def compile_selectors(selectors: list) -> SelectorSet:
+    """
+    Return a cached SelectorSet for a list of selectors.
+    
+    The cache holds the MAX_SELECTOR_SETS most recently used lists, so
+    selectors supplied per request (e.g. by algo4serve.py) cannot grow it
+    without bound.
+    
+    Args:
+        selectors: CSS selectors in priority order
+        
+    Returns:
+        Compiled SelectorSet
+        
+    Raises:
+        soupsieve.SelectorSyntaxError: If a selector is invalid
+    """
+    key = tuple(selectors)
+    with _selector_sets_lock:
+        selector_set = _selector_sets.get(key)
+        if selector_set is not None:
+            _selector_sets.move_to_end(key)
+            return selector_set
+    selector_set = SelectorSet(selectors)
+    with _selector_sets_lock:
+        _selector_sets[key] = selector_set
+        while len(_selector_sets) > MAX_SELECTOR_SETS:
+            _selector_sets.popitem(last=False)
+    return selector_set
+
+def extract_main_content(html_content: str, content_selectors: list = None,
+                         parser: str = None, hint_selector: str = None) -> str:
     """
     Extract the main content from HTML.
     
     Args:
         html_content: HTML content to parse
         content_selectors: List of CSS selectors to try for finding main content
+        parser: Parser backend, see resolve_parser()
+        hint_selector: Selector expected to match, used for partial parsing
         
     Returns:
         Extracted main content as HTML string
         
+    Raises:
+        ContentExtractionError: If main content cannot be found
+    """
+    return str(extract_main_element(html_content, content_selectors, parser, hint_selector))
+
+def extract_main_element(html_content: str, content_selectors: list = None,
+                         parser: str = None, hint_selector: str = None,
+                         metrics: Dict = None) -> "Tag":
+    """
+    Extract the main content element from HTML.
+    
+    Same as extract_main_content(), but returns the parsed element itself so
+    it can be converted without serializing and re-parsing it.
+    
+    When hint_selector is given and simple enough, the document is first
+    parsed with a SoupStrainer that keeps only candidate elements for it.
+    If that finds a match, the full parse is skipped; otherwise extraction
+    falls back to the full document.
+    
+    Args:
+        html_content: HTML content to parse
+        content_selectors: List of CSS selectors to try for finding main content
+        parser: Parser backend, see resolve_parser()
+        hint_selector: Selector expected to match, used for partial parsing
+        metrics: Dictionary that receives "parse_ms", "extract_ms",
+            "selector", "fallback" and "hint" ("hit" or "miss" when the
+            hint selector was tried, else None) (optional)
+        
+    Returns:
+        BeautifulSoup element holding the main content
+        
     Raises:
         ContentExtractionError: If main content cannot be found
     """
     if content_selectors is None:
-        # Default selectors for common content areas
-        content_selectors = [
-            "article.nextra-content",  # Nextra documentation (used in our example)
-            "article.content",
-            "main[role='main']",
-            ".content",
-            "#content",
-            "article",
-            "main",
-            ".main-content",
-            "#main-content"
-        ]
-    
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Try each selector until we find content
-    for selector in content_selectors:
-        elements = soup.select(selector)
-        if elements:
-            return str(elements[0])
+        content_selectors = DEFAULT_CONTENT_SELECTORS
+    
+    _import_bs4()
+    parser = resolve_parser(parser)
+    if metrics is None:
+        metrics = {}
+    metrics["parse_ms"] = metrics["extract_ms"] = 0.0
+    metrics["hint"] = None
+    
+    if hint_selector:
+        hint_set = compile_selectors([hint_selector])
+        strainer = hint_set.strainer(hint_selector)
+        if strainer is not None:
+            start = time.perf_counter()
+            soup = BeautifulSoup(html_content, parser, parse_only=strainer)
+            parsed = time.perf_counter()
+            element = hint_set.match(soup)
+            metrics["parse_ms"] += (parsed - start) * 1000
+            metrics["extract_ms"] += (time.perf_counter() - parsed) * 1000
+            if element is not None:
+                metrics["selector"] = hint_selector
+                metrics["fallback"] = False
+                metrics["hint"] = "hit"
+                return element
+            metrics["hint"] = "miss"
+    
+    start = time.perf_counter()
+    soup = BeautifulSoup(html_content, parser)
+    parsed = time.perf_counter()
+    try:
+        return find_main_element(soup, content_selectors, metrics)
+    finally:
+        metrics["parse_ms"] += (parsed - start) * 1000
+        metrics["extract_ms"] += (time.perf_counter() - parsed) * 1000
+
+def find_main_element(soup: "BeautifulSoup", content_selectors: list = None,
+                      metrics: Dict = None) -> "Tag":
+    """
+    Find the main content element in an already-parsed document.
+    
+    Note that the largest-text-block fallback removes script, style, nav,
+    header, footer and aside elements from the document.
+    
+    Args:
+        soup: Parsed document
+        content_selectors: List of CSS selectors to try for finding main content
+        metrics: Dictionary that receives "selector" (the selector that
+            matched, or None) and "fallback" (optional)
+        
+    Returns:
+        BeautifulSoup element holding the main content
+        
+    Raises:
+        ContentExtractionError: If main content cannot be found
+    """
+    if content_selectors is None:
+        content_selectors = DEFAULT_CONTENT_SELECTORS
+    if metrics is None:
+        metrics = {}
+    
+    # Match all selectors in one traversal and keep the highest-priority hit
+    element, selector = compile_selectors(content_selectors).match_with_selector(soup)
+    metrics["selector"] = selector
+    metrics["fallback"] = element is None
+    if element is not None:
+        return element
     
     # If no selector works, try to find the largest text block
     # Remove script, style, nav, header, footer elements
-    for tag in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
+    for tag in soup(FALLBACK_REMOVED_TAGS):
         tag.decompose()
     
-    # Find the element with the most text content
-    max_text = 0
-    best_element = None
-    
-    for element in soup.find_all(['div', 'section', 'article']):
-        text_length = len(element.get_text(strip=True))
-        if text_length > max_text:
-            max_text = text_length
-            best_element = element
+    # Find the block with the best content score
+    best_element = find_content_block(soup)
     
     if best_element:
-        return str(best_element)
+        return best_element
     
     raise ContentExtractionError("Could not extract main content from webpage")
 
+# Fallback content detection weights
+CANDIDATE_TAGS = {"div": 0, "section": 5, "article": 30, "main": 30}
+POSITIVE_HINTS = re.compile(r"article|content|main|post|entry|body|text|doc", re.I)
+NEGATIVE_HINTS = re.compile(r"comment|sidebar|footer|nav|menu|share|related|promo|banner|ad-", re.I)
+CHILD_SCORE_DECAY = 0.5
+
+def find_content_block(soup: "BeautifulSoup") -> Optional["Tag"]:
+    """
+    Find the block element most likely to hold the main content.
+    
+    A single bottom-up pass visits every node once. For each candidate block
+    (div, section, article, main) it combines the length of the text that
+    belongs directly to it, that text's link density, tag and class/id hints,
+    and a decayed share of the scores of nested candidate blocks. A wrapper
+    therefore only wins over its children when it holds content of its own
+    or several good children, instead of always winning on raw text length.
+    
+    Args:
+        soup: Parsed document
+        
+    Returns:
+        Best scoring element, or None if no candidate holds any text
+    """
+    _import_bs4()
+    
+    # id(element) -> (own text length, own link text length, candidate score)
+    # For non-candidate elements the score is the sum passed up from nested blocks
+    stats = {}
+    best_element = None
+    best_score = 0.0
+    
+    # Reverse document order visits children before their parents
+    for element in reversed(list(soup.descendants)):
+        if not isinstance(element, Tag):
+            continue
+        
+        text_length = 0
+        link_length = 0
+        child_scores = 0.0
+        for child in element.children:
+            if isinstance(child, Tag):
+                child_text, child_links, child_score = stats.pop(id(child), (0, 0, 0.0))
+                child_scores += child_score
+                if child.name not in CANDIDATE_TAGS:
+                    text_length += child_text
+                    link_length += child_links
+            elif type(child) is NavigableString:
+                text_length += len(child.strip())
+        if element.name == "a":
+            link_length = text_length
+        
+        if element.name not in CANDIDATE_TAGS:
+            stats[id(element)] = (text_length, link_length, child_scores)
+            continue
+        
+        link_density = link_length / text_length if text_length else 0.0
+        score = text_length * (1.0 - link_density) + CHILD_SCORE_DECAY * child_scores
+        if score > 0:
+            score += CANDIDATE_TAGS[element.name]
+            hints = " ".join(element.get("class", [])) + " " + (element.get("id") or "")
+            if POSITIVE_HINTS.search(hints):
+                score += 25
+            if NEGATIVE_HINTS.search(hints):
+                score -= 25
+        stats[id(element)] = (0, 0, score)
+        
+        if score > best_score:
+            best_score = score
+            best_element = element
+    
+    return best_element
+
+# MathML is passed through to the Markdown as raw markup, where the
+# mathml2latex post-processor (algo4process.py) turns it into LaTeX; both
+# converters would otherwise keep only its text
+MATHML_BLOCK = re.compile(r"<(?:\w+:)?math\b[^>]*>.*?</(?:\w+:)?math\s*>", re.S | re.I)
+MATH_PLACEHOLDER = re.compile(r"W2MMATH(\d+)X")
+RE_MATH_WHITESPACE = re.compile(r"\s+")
+
 def html_to_markdown(html_content: str, options: dict = None) -> str:
     """
     Convert HTML content to Markdown.
     
+    The "converter" option selects the engine: "html2text" (default) or
+    "dom", which converts the parsed tree directly (see algo4markdown.py).
+    MathML elements are kept as raw markup on one line.
+    
     Args:
         html_content: HTML content to convert
         options: Conversion options
@@ -214,6 +1005,41 @@ def html_to_markdown(html_content: str, options: dict = None) -> str:
     Returns:
         Markdown content
     """
+    if options is not None and options.get("converter") == "dom":
+        _import_bs4()
+        return element_to_markdown(BeautifulSoup(html_content, 'html.parser'), options)
+    
+    # html2text leaves an alphanumeric placeholder alone
+    math_blocks = []
+    def protect(match: "re.Match") -> str:
+        math_blocks.append(RE_MATH_WHITESPACE.sub(" ", match.group(0)))
+        return f"W2MMATH{len(math_blocks) - 1}X"
+    if "math" in html_content:
+        html_content = MATHML_BLOCK.sub(protect, html_content)
+    
+    h = html2text_converter(options)
+    markdown_content = h.handle(html_content)
+    
+    if math_blocks:
+        markdown_content = MATH_PLACEHOLDER.sub(
+            lambda match: math_blocks[int(match.group(1))], markdown_content)
+    return clean_markdown(markdown_content)
+
+def html2text_converter(options: dict = None,
+                        out: Callable[[str], None] = None) -> "html2text.HTML2Text":
+    """
+    Create an html2text converter configured from conversion options.
+    
+    Args:
+        options: Conversion options (default: the settings html_to_markdown() uses)
+        out: Callable receiving the raw output piece by piece instead of
+            html2text collecting it (optional)
+        
+    Returns:
+        Configured html2text.HTML2Text instance
+    """
+    _import_html2text()
+    
     if options is None:
         options = {
             "ignore_links": False,
@@ -227,7 +1053,7 @@ def html_to_markdown(html_content: str, options: dict = None) -> str:
             "pad_tables": True,
         }
     
-    h = html2text.HTML2Text()
+    h = html2text.HTML2Text(out=out)
     
     # Configure html2text based on options
     h.ignore_links = options.get("ignore_links", False)
@@ -240,9 +1066,32 @@ def html_to_markdown(html_content: str, options: dict = None) -> str:
     h.inline_links = options.get("inline_links", True)
     h.pad_tables = options.get("pad_tables", True)
     
-    markdown_content = h.handle(html_content)
+    return h
+
+def element_to_markdown(element: "Tag", options: dict = None) -> str:
+    """
+    Convert an already-parsed HTML element to Markdown in a single tree walk.
     
-    # Clean up the markdown
+    Args:
+        element: BeautifulSoup element, e.g. from extract_main_element()
+        options: Conversion options
+        
+    Returns:
+        Markdown content
+    """
+    import algo4markdown
+    return clean_markdown(algo4markdown.element_to_markdown(element, options))
+
+def clean_markdown(markdown_content: str) -> str:
+    """
+    Apply the final clean-up shared by all conversion engines.
+    
+    Args:
+        markdown_content: Raw converter output
+        
+    Returns:
+        Cleaned Markdown content
+    """
     # Remove excessive newlines
     markdown_content = re.sub(r'\n{3,}', '\n\n', markdown_content)
     
@@ -251,6 +1100,44 @@ def html_to_markdown(html_content: str, options: dict = None) -> str:
     
     return markdown_content
 
+def convert_html(html_content: str,
+                 content_selectors: list = None,
+                 conversion_options: dict = None,
+                 extraction_options: dict = None) -> str:
+    """
+    Extract the main content from HTML and convert it to Markdown.
+    
+    Args:
+        html_content: Full HTML of the webpage
+        content_selectors: List of CSS selectors to try for finding main content
+        conversion_options: Options for HTML to Markdown conversion
+        extraction_options: Extra keyword arguments for extract_main_element(),
+            e.g. {"parser": "lxml"}
+        
+    Returns:
+        Markdown content
+        
+    Raises:
+        ContentExtractionError: If main content cannot be found
+    """
+    element = extract_main_element(html_content, content_selectors, **(extraction_options or {}))
+    return convert_element(element, conversion_options)
+
+def convert_element(element: "Tag", conversion_options: dict = None) -> str:
+    """
+    Convert an extracted content element to Markdown with the selected engine.
+    
+    Args:
+        element: BeautifulSoup element holding the main content
+        conversion_options: Options for HTML to Markdown conversion
+        
+    Returns:
+        Markdown content
+    """
+    if conversion_options and conversion_options.get("converter") == "dom":
+        return element_to_markdown(element, conversion_options)
+    return html_to_markdown(str(element), conversion_options)
+
 def save_file(content: str, file_path: str, overwrite: bool = False) -> None:
     """
     Save content to a file.
@@ -279,6 +1166,10 @@ class NetworkError(Exception):
     """Exception raised for network-related errors."""
     pass
 
+class ResponseRejectedError(NetworkError):
+    """Exception raised when a streamed response is rejected as non-HTML or too large."""
+    pass
+
 class ContentExtractionError(Exception):
     """Exception raised when content extraction fails."""
     pass
@@ -293,18 +1184,42 @@ def webpage_to_markdown(url: str,
                        content_selectors: list = None,
                        conversion_options: dict = None,
                        overwrite: bool = False,
-                       verbose: bool = True) -> Tuple[str, str]:
+                       verbose: bool = True,
+                       session: "requests.Session" = None,
+                       cache: "ResponseCache" = None,
+                       download_options: dict = None,
+                       extraction_options: dict = None,
+                       metrics_hook: Callable[[Dict], None] = None,
+                       result_cache: "ResultCache" = None,
+                       sink: "SQLiteSink" = None) -> Tuple[str, str]:
     """
-    Convert a webpage to Markdown.
+    Convert a webpage to Markdown and save the results to files.
+    
+    Same as convert_webpage(), but returns the paths of the files written
+    instead of the content. See convert_webpage() for metrics_hook.
     
     Args:
         url: URL of the webpage to convert
         html_file: Path to save the HTML file (optional)
         markdown_file: Path to save the Markdown file (optional)
         content_selectors: List of CSS selectors to try for finding main content
-        conversion_options: Options for HTML to Markdown conversion
+        conversion_options: Options for HTML to Markdown conversion; set
+            "converter" to "dom" to convert the parsed tree directly, or
+            "streaming" to True to write the Markdown file as it is produced
+            (bounded memory for very large pages, see algo4stream.py)
         overwrite: Whether to overwrite existing files
         verbose: Whether to print progress information
+        session: Shared requests session to reuse pooled connections (optional)
+        cache: algo4cache.ResponseCache for conditional requests (optional)
+        download_options: Extra keyword arguments for download_webpage(),
+            e.g. {"stream": True, "max_bytes": 5000000}
+        extraction_options: Extra keyword arguments for extract_main_element(),
+            e.g. {"parser": "lxml"}
+        metrics_hook: Callable receiving the per-stage metrics record (optional)
+        result_cache: algo4cache.ResultCache to reuse the Markdown of
+            identical HTML (optional)
+        sink: Output sink from algo4sinks.py that also receives the page
+            record (optional)
         
     Returns:
         Tuple of (html_file_path, markdown_file_path)
@@ -314,46 +1229,455 @@ def webpage_to_markdown(url: str,
         ContentExtractionError: If content extraction fails
         FileOperationError: If file operations fail
     """
+    result = _instrumented_conversion(
+        url, metrics_hook, content_selectors=content_selectors,
+        conversion_options=conversion_options, session=session, cache=cache,
+        download_options=download_options, extraction_options=extraction_options,
+        html_file=html_file, markdown_file=markdown_file, overwrite=overwrite,
+        verbose=verbose, keep_content_html=False, result_cache=result_cache,
+        sink=sink)
+    return result["html_file"], result["markdown_file"]
+
+def convert_webpage(url: str,
+                    content_selectors: list = None,
+                    conversion_options: dict = None,
+                    session: "requests.Session" = None,
+                    cache: "ResponseCache" = None,
+                    download_options: dict = None,
+                    extraction_options: dict = None,
+                    html_file: str = None,
+                    markdown_file: str = None,
+                    overwrite: bool = False,
+                    as_bytes: bool = False,
+                    verbose: bool = False,
+                    metrics_hook: Callable[[Dict], None] = None,
+                    result_cache: "ResultCache" = None,
+                    sink: "SQLiteSink" = None) -> Dict:
+    """
+    Convert a webpage to Markdown in memory.
+    
+    Nothing is written to disk unless html_file or markdown_file is given.
+    With as_bytes, the content is returned as memoryviews over UTF-8 bytes,
+    encoded once, so callers can slice and write them without further copies.
+    
+    When metrics_hook is given, it is called once per page, also on failure,
+    with a record of where the time went: "url", "status_code", "cache",
+    "dns_ms", "connect_ms", "ttfb_ms", "body_ms", "download_ms",
+    "wire_bytes", "decoded_bytes", "parse_ms", "extract_ms", "convert_ms",
+    "write_ms", "selector" (the content selector that matched, or None),
+    "fallback" (whether the largest-text-block fallback ran), "hint"
+    ("hit" or "miss" for a learned selector, see algo4hints.py),
+    "result_cache" ("memory", "disk" or "miss" with a result_cache),
+    "markdown_bytes" and "error" (None on success).
+    
+    With conversion_options["streaming"] and a markdown_file, the Markdown
+    is written to the file as it is produced (see algo4stream.py), and
+    "content_html" and "markdown" are None in the result. The result_cache
+    and the sink are not used in that mode. When the Markdown comes from the
+    result_cache, nothing is extracted and "content_html" is None.
+    
+    Args:
+        url: URL of the webpage to convert
+        content_selectors: List of CSS selectors to try for finding main content
+        conversion_options: Options for HTML to Markdown conversion
+        session: Shared requests session to reuse pooled connections (optional)
+        cache: algo4cache.ResponseCache for conditional requests (optional)
+        download_options: Extra keyword arguments for download_webpage()
+        extraction_options: Extra keyword arguments for extract_main_element();
+            the key "selector_cache" takes an algo4hints.SelectorCache whose
+            learned selector is tried first
+        html_file: Also save the HTML to this path (optional)
+        markdown_file: Also save the Markdown to this path (optional)
+        overwrite: Whether to overwrite existing files
+        as_bytes: Return the content as memoryviews over UTF-8 bytes
+        verbose: Whether to print progress information
+        metrics_hook: Callable receiving the per-stage metrics record (optional)
+        result_cache: algo4cache.ResultCache to reuse the Markdown of
+            identical HTML (optional)
+        sink: Output sink from algo4sinks.py that also receives the page
+            record (optional)
+        
+    Returns:
+        Dictionary with the keys "url", "html" (the full page),
+        "content_html" (the extracted main content), "markdown",
+        "response_info", "html_file" and "markdown_file" (None unless saved)
+        
+    Raises:
+        NetworkError: If download fails
+        ContentExtractionError: If content extraction fails
+        FileOperationError: If file operations fail
+    """
+    result = _instrumented_conversion(
+        url, metrics_hook, content_selectors=content_selectors,
+        conversion_options=conversion_options, session=session, cache=cache,
+        download_options=download_options, extraction_options=extraction_options,
+        html_file=html_file, markdown_file=markdown_file, overwrite=overwrite,
+        verbose=verbose, keep_content_html=True, result_cache=result_cache,
+        sink=sink)
+    if as_bytes:
+        for key in ("html", "content_html", "markdown"):
+            if result[key] is not None:
+                result[key] = memoryview(result[key].encode("utf-8"))
+    return result
+
+def _instrumented_conversion(url: str, metrics_hook: Callable[[Dict], None], **kwargs) -> Dict:
+    """Run _convert_webpage() and hand its metrics record to the hook."""
+    metrics = {"url": url, "status_code": None, "cache": None,
+               "dns_ms": None, "connect_ms": None, "ttfb_ms": None, "body_ms": None,
+               "download_ms": None, "wire_bytes": None, "decoded_bytes": None,
+               "parse_ms": None, "extract_ms": None, "convert_ms": None, "write_ms": None,
+               "selector": None, "fallback": None, "hint": None, "result_cache": None,
+               "markdown_bytes": None, "error": None}
+    try:
+        return _convert_webpage(url, metrics=metrics, **kwargs)
+    except (NetworkError, ContentExtractionError, FileOperationError) as e:
+        metrics["error"] = str(e)
+        raise
+    finally:
+        if metrics_hook is not None:
+            for key, value in metrics.items():
+                if key.endswith("_ms") and value is not None:
+                    metrics[key] = round(value, 3)
+            metrics_hook(metrics)
+
+def _convert_webpage(url: str,
+                     content_selectors: list,
+                     conversion_options: dict,
+                     session: "requests.Session",
+                     cache: "ResponseCache",
+                     download_options: dict,
+                     extraction_options: dict,
+                     html_file: str,
+                     markdown_file: str,
+                     overwrite: bool,
+                     verbose: bool,
+                     keep_content_html: bool,
+                     metrics: Dict,
+                     result_cache: "ResultCache" = None,
+                     sink: "SQLiteSink" = None) -> Dict:
+    """Download, extract, convert and optionally save one page, filling in metrics."""
     if verbose:
         print(f"Downloading webpage: {url}")
     
     # Download the webpage
-    html_content, response_info = download_webpage(url)
+    html_content, response_info = download_webpage(url, session=session, cache=cache,
+                                                   **(download_options or {}))
+    timings = response_info["timings"]
+    metrics.update({
+        "status_code": response_info["status_code"],
+        "cache": response_info["cache"]["status"] if "cache" in response_info else None,
+        "dns_ms": timings["dns_ms"],
+        "connect_ms": timings["connect_ms"],
+        "ttfb_ms": timings["ttfb_ms"],
+        "body_ms": timings["body_ms"],
+        "download_ms": timings["total_ms"],
+        **response_info["transfer"],
+    })
     
     if verbose:
         print(f"Download successful: {response_info['status_description']}")
+        if "cache" in response_info:
+            print(f"Cache: {response_info['cache']['status']}")
         print(f"Content length: {len(html_content)} characters")
     
     # Save HTML file if requested
-    html_path = html_file
-    if html_path:
-        save_file(html_content, html_path, overwrite)
+    write_ms = 0.0
+    if html_file:
+        start = time.perf_counter()
+        save_file(html_content, html_file, overwrite)
+        write_ms += (time.perf_counter() - start) * 1000
         if verbose:
-            print(f"HTML saved to: {html_path}")
+            print(f"HTML saved to: {html_file}")
     
-    # Extract main content
-    if verbose:
-        print("Extracting main content...")
+    # A learned content selector (see algo4hints.py) is tried first
+    extraction_options = dict(extraction_options or {})
+    selector_cache = extraction_options.pop("selector_cache", None)
     
-    main_content = extract_main_content(html_content, content_selectors)
+    if markdown_file and conversion_options and conversion_options.get("streaming"):
+        from algo4stream import stream_html_to_file
+        if verbose:
+            print("Converting to Markdown as a stream...")
+        hint = selector_cache.lookup(url) if selector_cache is not None else None
+        # A selector learned from the fallback needs the fallback's clean-up,
+        # which the raw stream cannot do
+        if hint is not None and not hint["fallback"] and not extraction_options.get("hint_selector"):
+            extraction_options["hint_selector"] = hint["selector"]
+        metrics["markdown_bytes"] = stream_html_to_file(
+            html_content, markdown_file, content_selectors, conversion_options,
+            extraction_options, overwrite, metrics)
+        if selector_cache is not None:
+            selector_cache.record(url, hint, metrics)
+        metrics["write_ms"] = write_ms  # Markdown writes are part of convert_ms
+        if verbose:
+            print(f"Markdown saved to: {markdown_file}")
+        return {
+            "url": url,
+            "html": html_content,
+            "content_html": None,
+            "markdown": None,
+            "response_info": response_info,
+            "html_file": html_file,
+            "markdown_file": markdown_file,
+        }
     
-    # Convert to Markdown
-    if verbose:
-        print("Converting to Markdown...")
+    # Identical HTML with identical settings gives identical Markdown
+    markdown_content = content_html = result_key = None
+    if result_cache is not None:
+        result_key = result_cache.key_for(
+            html_content, __version__, content_selectors or DEFAULT_CONTENT_SELECTORS,
+            conversion_options or {}, extraction_options)
+        markdown_content, metrics["result_cache"] = result_cache.get(result_key)
     
-    markdown_content = html_to_markdown(main_content, conversion_options)
+    if markdown_content is not None:
+        if verbose:
+            print("Markdown found in the result cache")
+    else:
+        # Extract main content
+        if verbose:
+            print("Extracting main content...")
+        
+        use_dom = bool(conversion_options) and conversion_options.get("converter") == "dom"
+        if selector_cache is not None:
+            main_element = selector_cache.extract(url, html_content, content_selectors,
+                                                  metrics=metrics, **extraction_options)
+        else:
+            main_element = extract_main_element(html_content, content_selectors,
+                                                metrics=metrics, **extraction_options)
+        # The DOM converter does not need the serialized content
+        content_html = str(main_element) if keep_content_html or not use_dom else None
+        
+        # Convert to Markdown
+        if verbose:
+            print("Converting to Markdown...")
+        
+        start = time.perf_counter()
+        if use_dom:
+            markdown_content = element_to_markdown(main_element, conversion_options)
+        else:
+            markdown_content = html_to_markdown(content_html, conversion_options)
+        metrics["convert_ms"] = (time.perf_counter() - start) * 1000
+        if result_cache is not None:
+            result_cache.put(result_key, markdown_content)
+    metrics["markdown_bytes"] = len(markdown_content.encode("utf-8"))
     
     # Save Markdown file if requested
-    md_path = markdown_file
-    if md_path:
-        save_file(markdown_content, md_path, overwrite)
+    if markdown_file:
+        start = time.perf_counter()
+        save_file(markdown_content, markdown_file, overwrite)
+        write_ms += (time.perf_counter() - start) * 1000
         if verbose:
-            print(f"Markdown saved to: {md_path}")
+            print(f"Markdown saved to: {markdown_file}")
+    if sink is not None:
+        from algo4sinks import page_record
+        start = time.perf_counter()
+        sink.write(page_record(url, markdown_content, html_content, response_info))
+        write_ms += (time.perf_counter() - start) * 1000
+    metrics["write_ms"] = write_ms
+    
+    return {
+        "url": url,
+        "html": html_content,
+        "content_html": content_html,
+        "markdown": markdown_content,
+        "response_info": response_info,
+        "html_file": html_file,
+        "markdown_file": markdown_file,
+    }
+
+def url_to_filename(url: str, extension: str) -> str:
+    """
+    Derive a filesystem-safe file name from a URL.
+    
+    Args:
+        url: URL of the webpage
+        extension: File extension, including the leading dot
+        
+    Returns:
+        File name built from the URL host and path
+    """
+    parsed = urlparse(url)
+    name = f"{parsed.netloc}{parsed.path}".rstrip("/")
+    name = re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip("_") or "index"
+    return f"{name[:150]}{extension}"
+
+def read_urls_file(file_path: str) -> List[str]:
+    """
+    Read a list of URLs from a text file.
+    
+    Blank lines and lines starting with '#' are ignored.
+    
+    Args:
+        file_path: Path to the file containing one URL per line
+        
+    Returns:
+        List of URLs
+        
+    Raises:
+        FileOperationError: If the file cannot be read
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return [line.strip() for line in f
+                    if line.strip() and not line.lstrip().startswith('#')]
+    except IOError as e:
+        raise FileOperationError(f"Failed to read URLs file: {str(e)}") from e
+
+def batch_file_names(urls: List[str]) -> List[str]:
+    """
+    Assign a unique base file name (without extension) to each URL in a batch.
+    
+    Args:
+        urls: URLs of the webpages in the batch
+        
+    Returns:
+        List of base file names, in the same order as urls
+    """
+    used_names = set()
+    return [unique_file_name(url, used_names) for url in urls]
+
+def unique_file_name(url: str, used_names: set) -> str:
+    """
+    Assign a base file name (without extension) not yet in used_names.
     
-    return html_path, md_path
+    Args:
+        url: URL of the webpage
+        used_names: Names assigned so far; the new name is added to it
+        
+    Returns:
+        Base file name for the URL
+    """
+    base = url_to_filename(url, "")
+    name = base
+    counter = 2
+    while name in used_names:
+        name = f"{base}-{counter}"
+        counter += 1
+    used_names.add(name)
+    return name
+
+def webpages_to_markdown(urls: List[str],
+                         output_dir: str = ".",
+                         workers: int = 8,
+                         content_selectors: list = None,
+                         conversion_options: dict = None,
+                         save_html: bool = False,
+                         overwrite: bool = False,
+                         verbose: bool = True,
+                         session: "requests.Session" = None,
+                         cache: "ResponseCache" = None,
+                         download_options: dict = None,
+                         extraction_options: dict = None,
+                         metrics_hook: Callable[[Dict], None] = None,
+                         result_cache: "ResultCache" = None,
+                         sink: "SQLiteSink" = None) -> List[Dict]:
+    """
+    Convert a batch of webpages to Markdown concurrently.
+    
+    Downloads run on a bounded thread pool over one shared, pooled
+    requests session. A failure for one URL is recorded in its result
+    and does not stop the rest of the batch.
+    
+    Args:
+        urls: URLs of the webpages to convert
+        output_dir: Directory to save the output files in
+        workers: Maximum number of concurrent downloads
+        content_selectors: List of CSS selectors to try for finding main content
+        conversion_options: Options for HTML to Markdown conversion
+        save_html: Whether to also save the downloaded HTML
+        overwrite: Whether to overwrite existing files
+        verbose: Whether to print progress information
+        session: Shared requests session (one is created if not provided)
+        cache: algo4cache.ResponseCache shared by all workers (optional)
+        download_options: Extra keyword arguments for download_webpage()
+        extraction_options: Extra keyword arguments for extract_main_element()
+        metrics_hook: Callable receiving each page's metrics record, see
+            webpage_to_markdown(); called from the worker threads
+        result_cache: algo4cache.ResultCache shared by all workers (optional)
+        sink: Output sink from algo4sinks.py to write the pages to instead
+            of one Markdown file each (optional)
+        
+    Returns:
+        List of result dictionaries, in the same order as urls, with the
+        keys "url", "html_file", "markdown_file" and "error" (None on success)
+    """
+    workers = max(1, workers)
+    if session is None:
+        hosts = {urlparse(url).netloc for url in urls}
+        session = create_session(pool_connections=max(10, len(hosts)),
+                                 pool_maxsize=workers)
+    
+    # Assign unique output file names up front so workers never collide
+    targets = batch_file_names(urls)
+    
+    def convert(index: int) -> Dict:
+        url = urls[index]
+        html_file = os.path.join(output_dir, targets[index] + ".html") if save_html else None
+        markdown_file = os.path.join(output_dir, targets[index] + ".md") if sink is None else None
+        result = {"url": url, "html_file": None, "markdown_file": None, "error": None}
+        try:
+            result["html_file"], result["markdown_file"] = webpage_to_markdown(
+                url=url,
+                html_file=html_file,
+                markdown_file=markdown_file,
+                content_selectors=content_selectors,
+                conversion_options=conversion_options,
+                overwrite=overwrite,
+                verbose=False,
+                session=session,
+                cache=cache,
+                download_options=download_options,
+                extraction_options=extraction_options,
+                metrics_hook=metrics_hook,
+                result_cache=result_cache,
+                sink=sink
+            )
+            if verbose:
+                print(f"[ok] {url} -> {markdown_file or sink.path}")
+        except (NetworkError, ContentExtractionError, FileOperationError) as e:
+            result["error"] = str(e)
+            if verbose:
+                print(f"[failed] {url}: {str(e)}")
+        return result
+    
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(convert, range(len(urls))))
+
+def close_selector_cache(selector_cache: "SelectorCache", quiet: bool) -> None:
+    """Save the learned selectors and report the hit rate."""
+    try:
+        selector_cache.close()
+    except IOError as e:
+        print(f"Warning: Failed to save selector cache: {str(e)}", file=sys.stderr)
+    if not quiet:
+        stats = selector_cache.stats()
+        print(f"Selector cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['cold']} cold, {stats['invalidated']} invalidated "
+              f"(hit rate {stats['hit_rate']})")
+
+def close_sink(sink: "SQLiteSink", quiet: bool) -> None:
+    """Flush and close an output sink, exiting on failure."""
+    try:
+        sink.close()
+    except FileOperationError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    if not quiet:
+        print(f"Wrote {sink.count} pages to {sink.path}")
 
 def main():
     """Command line interface for the webpage to Markdown converter."""
+    import argparse
+    
+    if sys.argv[1:2] == ["serve"]:
+        from algo4serve import main as serve_main
+        serve_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["offline"]:
+        from algo4sources import main as offline_main
+        offline_main(sys.argv[2:])
+        return
+    
     parser = argparse.ArgumentParser(
         description="Convert webpages to Markdown format",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -362,14 +1686,85 @@ Examples:
   %(prog)s https://example.com
   %(prog)s https://example.com --html-file example.html --md-file example.md
   %(prog)s https://example.com --content-selectors ".content article" --overwrite
+  %(prog)s --urls-file urls.txt --output-dir pages --workers 16
+  %(prog)s --urls-file urls.txt --rate-limit 2 --max-retries 6
+  %(prog)s --urls-file urls.txt --selector-cache selectors.json
+  %(prog)s --urls-file urls.txt --sink pages.db --sink-fts
+  %(prog)s serve --port 8080 --workers 16
+  %(prog)s offline crawl.warc.gz --output-dir pages
         """
     )
     
-    parser.add_argument("url", help="URL of the webpage to convert")
+    parser.add_argument("url", nargs="?", help="URL of the webpage to convert")
+    parser.add_argument("--urls-file",
+                       help="File with one URL per line to convert as a batch")
+    parser.add_argument("--output-dir", default=".",
+                       help="Directory for batch output files (default: current directory)")
+    parser.add_argument("--workers", type=int, default=8,
+                       help="Number of concurrent downloads in batch mode (default: 8)")
+    parser.add_argument("--backend", choices=["threads", "async", "pipeline"], default="threads",
+                       help="Batch backend: threads, async downloads, or a pipeline with "
+                            "conversion in a process pool (default: threads)")
+    parser.add_argument("--cpu-workers", type=int,
+                       help="Number of conversion processes with the pipeline backend "
+                            "(default: CPU count)")
+    parser.add_argument("--per-host", type=int, default=8,
+                       help="Maximum connections per host with the async backend (default: 8)")
+    parser.add_argument("--politeness-delay", type=float, default=0.0,
+                       help="Seconds between requests to one host with the async backend")
+    parser.add_argument("--cache-dir",
+                       help="Directory for the HTTP response cache (enables conditional requests)")
+    parser.add_argument("--cache-max-mb", type=int, default=512,
+                       help="Maximum size of the response cache in MB (default: 512)")
+    parser.add_argument("--result-cache",
+                       help="Directory for the conversion result cache (reuses the Markdown "
+                            "of byte-identical HTML)")
+    parser.add_argument("--result-cache-mb", type=int, default=512,
+                       help="Maximum size of the result cache in MB (default: 512)")
+    parser.add_argument("--stream", action="store_true",
+                       help="Stream downloads, rejecting non-HTML or oversize responses early")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                       help="Maximum response size in MB when streaming (default: 20)")
+    parser.add_argument("--rate-limit", type=float, metavar="RPS",
+                       help="Start each host at this many requests per second and adapt the "
+                            "rate to 429/503 responses and latency")
+    parser.add_argument("--max-retries", type=int, default=4,
+                       help="With --rate-limit, retries per URL on 429, 503 and transient "
+                            "errors (default: 4)")
+    parser.add_argument("--manifest",
+                       help="Re-sync the URLs incrementally against this manifest file")
+    parser.add_argument("--prune", action="store_true",
+                       help="With --manifest, delete the output of pages no longer listed")
+    parser.add_argument("--save-html", action="store_true",
+                       help="Also save the downloaded HTML in batch mode")
     parser.add_argument("--html-file", help="Path to save the HTML file")
     parser.add_argument("--md-file", help="Path to save the Markdown file")
     parser.add_argument("--content-selectors", nargs="+", 
                        help="CSS selectors to try for finding main content")
+    parser.add_argument("--parser", choices=["html.parser", "lxml", "auto"], default=DEFAULT_PARSER,
+                       help="HTML parser backend; 'auto' uses lxml when installed (default: html.parser)")
+    parser.add_argument("--converter", choices=["html2text", "dom"], default="html2text",
+                       help="Markdown conversion engine (default: html2text)")
+    parser.add_argument("--stream-markdown", action="store_true",
+                       help="Convert incrementally and write the Markdown file as it is "
+                            "produced, keeping memory bounded for very large pages")
+    parser.add_argument("--selector-cache", metavar="FILE",
+                       help="Learn the content selector that matches per host in this JSON file "
+                            "and try it first on later pages")
+    parser.add_argument("--selector-prefix-depth", type=int, default=0, metavar="N",
+                       help="With --selector-cache, also learn per first N path segments "
+                            "(default: 0, per host only)")
+    parser.add_argument("--sink", metavar="PATH",
+                       help="Write the pages to an SQLite database (*.db, *.sqlite) or to "
+                            "gzip-compressed JSON Lines files in a directory instead of "
+                            "one Markdown file each")
+    parser.add_argument("--sink-fts", action="store_true",
+                       help="With an SQLite --sink, also build a full-text index")
+    parser.add_argument("--sink-rotate-mb", type=int, default=256,
+                       help="With a JSON Lines --sink, start a new file at this size in MB "
+                            "(default: 256)")
+    parser.add_argument("--metrics-jsonl",
+                       help="Append a per-page timing record to this JSON Lines file")
     parser.add_argument("--overwrite", action="store_true",
                        help="Overwrite existing files")
     parser.add_argument("--quiet", action="store_true",
@@ -377,18 +1772,215 @@ Examples:
     
     args = parser.parse_args()
     
+    if not args.url and not args.urls_file:
+        parser.error("either a URL or --urls-file is required")
+    
+    if args.cache_dir and args.backend == "async":
+        parser.error("--cache-dir is only supported with the threads backend")
+    
+    if args.metrics_jsonl and args.urls_file and (args.manifest or args.backend != "threads"):
+        parser.error("--metrics-jsonl is only supported with the threads backend")
+    
+    if args.selector_cache and args.urls_file and (args.manifest or args.backend != "threads"):
+        parser.error("--selector-cache is only supported with the threads backend")
+    
+    if args.result_cache and args.urls_file and (args.manifest or args.backend != "threads"):
+        parser.error("--result-cache is only supported with the threads backend")
+    
+    if args.sink and args.urls_file and (args.manifest or args.backend != "threads"):
+        parser.error("--sink is only supported with the threads backend")
+    
+    if args.sink and args.stream_markdown:
+        parser.error("--sink cannot be combined with --stream-markdown")
+    
+    try:
+        import_dependencies()
+    except MissingDependencyError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    
+    conversion_options = None
+    if args.converter == "dom":
+        conversion_options = {"converter": "dom"}
+    if args.stream_markdown:
+        conversion_options = dict(conversion_options or {}, streaming=True)
+    
+    extraction_options = {"parser": args.parser}
+    
+    selector_cache = None
+    if args.selector_cache:
+        from algo4hints import SelectorCache
+        selector_cache = SelectorCache(args.selector_cache, prefix_depth=args.selector_prefix_depth)
+        extraction_options["selector_cache"] = selector_cache
+    
+    download_options = None
+    if args.stream:
+        download_options = {"stream": True, "max_bytes": int(args.max_mb * 1024 * 1024)}
+    
+    rate_limiter = None
+    if args.rate_limit:
+        from algo4ratelimit import RateLimiter
+        rate_limiter = RateLimiter(initial_rate=args.rate_limit, max_retries=args.max_retries)
+        download_options = dict(download_options or {}, rate_limiter=rate_limiter)
+    
+    cache = None
+    if args.cache_dir:
+        from algo4cache import ResponseCache
+        cache = ResponseCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+    
+    result_cache = None
+    if args.result_cache:
+        from algo4cache import ResultCache
+        result_cache = ResultCache(args.result_cache,
+                                   max_bytes=args.result_cache_mb * 1024 * 1024)
+    
+    sink = None
+    if args.sink:
+        from algo4sinks import open_sink
+        try:
+            sink = open_sink(args.sink, fts=args.sink_fts,
+                             rotate_bytes=args.sink_rotate_mb * 1024 * 1024)
+        except FileOperationError as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+    
+    metrics_hook = None
+    if args.metrics_jsonl:
+        from algo4metrics import MetricsWriter
+        try:
+            metrics_hook = MetricsWriter(args.metrics_jsonl)
+        except IOError as e:
+            print(f"Error: Failed to open metrics file: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+    
+    if args.urls_file:
+        try:
+            urls = read_urls_file(args.urls_file)
+        except FileOperationError as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+        if args.url:
+            urls.insert(0, args.url)
+        if args.manifest:
+            from algo4manifest import sync_webpages
+            try:
+                summary = sync_webpages(
+                    urls,
+                    manifest_path=args.manifest,
+                    output_dir=args.output_dir,
+                    workers=args.workers,
+                    content_selectors=args.content_selectors,
+                    conversion_options=conversion_options,
+                    extraction_options=extraction_options,
+                    prune=args.prune,
+                    overwrite=args.overwrite,
+                    verbose=not args.quiet,
+                    cache=cache,
+                    download_options=download_options
+                )
+            except FileOperationError as e:
+                print(f"Error: {str(e)}", file=sys.stderr)
+                sys.exit(1)
+            if not args.quiet:
+                print(", ".join(f"{len(summary[key])} {key}" for key in
+                                ("added", "changed", "unchanged", "removed", "failed")))
+            if summary["failed"]:
+                sys.exit(1)
+            return
+        if args.backend == "async":
+            from algo4async import webpages_to_markdown_async
+            results = webpages_to_markdown_async(
+                urls,
+                output_dir=args.output_dir,
+                max_concurrency=args.workers,
+                per_host_limit=args.per_host,
+                politeness_delay=args.politeness_delay,
+                content_selectors=args.content_selectors,
+                conversion_options=conversion_options,
+                save_html=args.save_html,
+                overwrite=args.overwrite,
+                verbose=not args.quiet,
+                extraction_options=extraction_options,
+                rate_limiter=rate_limiter
+            )
+        elif args.backend == "pipeline":
+            from concurrent.futures.process import BrokenProcessPool
+            from algo4pipeline import pipeline_webpages_to_markdown
+            try:
+                results = pipeline_webpages_to_markdown(
+                    urls,
+                    output_dir=args.output_dir,
+                    fetch_workers=args.workers,
+                    cpu_workers=args.cpu_workers,
+                    content_selectors=args.content_selectors,
+                    conversion_options=conversion_options,
+                    extraction_options=extraction_options,
+                    save_html=args.save_html,
+                    overwrite=args.overwrite,
+                    verbose=not args.quiet,
+                    download_options=download_options
+                )
+            except BrokenProcessPool as e:
+                print(f"Error: {str(e)}", file=sys.stderr)
+                sys.exit(1)
+        else:
+            results = webpages_to_markdown(
+                urls,
+                output_dir=args.output_dir,
+                workers=args.workers,
+                content_selectors=args.content_selectors,
+                conversion_options=conversion_options,
+                save_html=args.save_html,
+                overwrite=args.overwrite,
+                verbose=not args.quiet,
+                cache=cache,
+                download_options=download_options,
+                extraction_options=extraction_options,
+                metrics_hook=metrics_hook,
+                result_cache=result_cache,
+                sink=sink
+            )
+        if sink is not None:
+            close_sink(sink, args.quiet)
+        failed = [r for r in results if r["error"]]
+        if selector_cache is not None:
+            close_selector_cache(selector_cache, args.quiet)
+        if not args.quiet:
+            if result_cache is not None:
+                stats = result_cache.stats
+                print(f"Result cache: {stats['memory_hits']} memory hits, "
+                      f"{stats['disk_hits']} disk hits, {stats['misses']} misses, "
+                      f"{stats['evictions']} evictions")
+            print(f"Converted {len(results) - len(failed)} of {len(results)} webpages")
+        if failed:
+            sys.exit(1)
+        return
+    
     try:
         webpage_to_markdown(
             url=args.url,
+            session=create_session(pool_connections=1, pool_maxsize=1),
             html_file=args.html_file,
             markdown_file=args.md_file,
             content_selectors=args.content_selectors,
+            conversion_options=conversion_options,
             overwrite=args.overwrite,
-            verbose=not args.quiet
+            verbose=not args.quiet,
+            cache=cache,
+            download_options=download_options,
+            extraction_options=extraction_options,
+            metrics_hook=metrics_hook,
+            result_cache=result_cache,
+            sink=sink
         )
     except (NetworkError, ContentExtractionError, FileOperationError) as e:
         print(f"Error: {str(e)}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if selector_cache is not None:
+            close_selector_cache(selector_cache, args.quiet)
+        if sink is not None:
+            close_sink(sink, args.quiet)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
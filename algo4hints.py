@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Learned Content Selector Cache
+
+Pages from one site nearly always match the same content selector, yet
+extract_main_element() checks the whole content_selectors list on every
+page and often ends in the largest-text-block fallback. This module
+remembers, per host (and optionally per path prefix), the selector that
+found the content last time, and passes it to extract_main_element() as
+hint_selector. A hinted page is parsed with a SoupStrainer that keeps only
+the candidate elements, which skips the full parse, the selector probes and
+the fallback.
+
+When the fallback found the content, a selector for the element it chose
+(tag.class or tag#id, if that picks the same element) is learned instead.
+Only simple selectors are learned, since only they can be strained.
+
+A hint that stops matching is invalidated: the page is extracted the usual
+way and the selector that won there replaces the entry. Note that a hinted
+page takes the learned selector even where a higher-priority selector in
+content_selectors would also match.
+
+The cache is a JSON file, written atomically with os.replace(); each entry
+keeps its hit and miss counts, and stats() reports the hit rate. A failed
+periodic save only prints a warning, so it never fails a page; close()
+raises the error.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from urllib.parse import urlparse
+from typing import Dict, Optional
+
+from algo4download import (
+    SelectorSet,
+    FALLBACK_REMOVED_TAGS,
+    extract_main_element,
+)
+
+CACHE_VERSION = 1
+
+def derive_selector(element: "Tag") -> Optional[str]:
+    """
+    Build a simple selector that finds element first in its document.
+
+    Args:
+        element: Element chosen by the largest-text-block fallback
+
+    Returns:
+        Selector of the form tag.class or tag#id, or None if neither picks
+        out the element
+    """
+    root = element
+    while root.parent is not None:
+        root = root.parent
+
+    # Classes first: they usually repeat across a site's pages, ids less so
+    candidates = [f"{element.name}.{class_name}" for class_name in element.get("class") or []]
+    if element.get("id"):
+        candidates.append(f"{element.name}#{element['id']}")
+    if element.name in ("main", "article", "body"):
+        candidates.append(element.name)
+
+    for selector in candidates:
+        if SelectorSet.parse_simple(selector) is None:
+            continue  # e.g. an id with characters a selector cannot hold
+        if root.select_one(selector) is element:
+            return selector
+    return None
+
+class SelectorCache:
+    """
+    Persistent per-host cache of the content selector that last matched.
+
+    Thread-safe; share one instance between the workers of a batch.
+    """
+
+    def __init__(self, file_path: str, prefix_depth: int = 0, save_every: int = 50):
+        """
+        Args:
+            file_path: Path of the JSON cache file (created on first save)
+            prefix_depth: Number of leading path segments to key entries on
+                in addition to the host (0 keys on the host only)
+            save_every: Save after this many changes (and on close())
+        """
+        self.file_path = file_path
+        self.prefix_depth = prefix_depth
+        self.save_every = save_every
+        self.stats_counters = {"lookups": 0, "hits": 0, "misses": 0, "cold": 0,
+                               "learned": 0, "invalidated": 0}
+        self._entries = {}
+        self._changes = 0  # Changes since the last successful save
+        self._next_save = save_every
+        self._lock = threading.Lock()
+
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self._entries = data.get("entries", {})
+        except (OSError, ValueError):
+            pass
+
+    def keys_for(self, url: str) -> list:
+        """Return the cache keys for a URL, most specific first."""
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+        keys = [host]
+        if self.prefix_depth > 0:
+            segments = [segment for segment in parsed.path.split("/") if segment]
+            if not parsed.path.endswith("/"):
+                segments = segments[:-1]  # Only the directory part is a prefix
+            segments = segments[:self.prefix_depth]
+            if segments:
+                keys.insert(0, host + "/" + "/".join(segments))
+        return keys
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """
+        Find the learned entry for a URL.
+
+        Args:
+            url: URL of the page
+
+        Returns:
+            Copy of the entry with the keys "selector", "fallback" (whether
+            it was learned from the fallback), "hits" and "misses", or None
+        """
+        with self._lock:
+            self.stats_counters["lookups"] += 1
+            for key in self.keys_for(url):
+                entry = self._entries.get(key)
+                if entry is not None:
+                    return dict(entry)
+            self.stats_counters["cold"] += 1
+            return None
+
+    def record(self, url: str, entry: Optional[Dict], metrics: Dict, element: "Tag" = None) -> None:
+        """
+        Learn from the outcome of an extraction.
+
+        Args:
+            url: URL of the page
+            entry: Entry returned by lookup() for the page, or None
+            metrics: Metrics filled in by extract_main_element()
+            element: Extracted element, used to learn a selector after the
+                fallback (optional)
+        """
+        hit = entry is not None and metrics.get("hint") == "hit"
+        if metrics.get("fallback"):
+            selector = derive_selector(element) if element is not None else None
+            from_fallback = True
+        else:
+            selector = metrics.get("selector")
+            from_fallback = False
+        if selector is not None and SelectorSet.parse_simple(selector) is None:
+            selector = None  # Cannot be strained, so not worth a hint
+
+        keys = self.keys_for(url)
+        with self._lock:
+            current = next((key for key in keys if key in self._entries), None)
+            if hit:
+                self.stats_counters["hits"] += 1
+                if current is not None:
+                    self._entries[current]["hits"] += 1
+                    self._entries[current]["used"] = time.time()
+                self._changed()
+                return
+
+            if entry is not None:
+                self.stats_counters["misses"] += 1
+                if current is not None:
+                    self._entries[current]["misses"] += 1
+                if metrics.get("hint") == "miss":
+                    # The learned selector stopped matching: drop it
+                    self.stats_counters["invalidated"] += 1
+                    for key in keys:
+                        stale = self._entries.get(key)
+                        if stale is not None and stale["selector"] == entry["selector"]:
+                            del self._entries[key]
+            if selector is not None:
+                self._entries[keys[0]] = {"selector": selector, "fallback": from_fallback,
+                                          "hits": 0, "misses": 0, "used": time.time()}
+                # Let the host entry cover prefixes not seen yet
+                self._entries.setdefault(keys[-1], dict(self._entries[keys[0]]))
+                self.stats_counters["learned"] += 1
+            self._changed()
+
+    def extract(self, url: str, html_content: str, content_selectors: list = None,
+                metrics: Dict = None, **extraction_options) -> "Tag":
+        """
+        extract_main_element() with the learned selector as hint.
+
+        Args:
+            url: URL of the page
+            html_content: HTML content to parse
+            content_selectors: List of CSS selectors to try for finding main content
+            metrics: Dictionary that receives the extraction metrics (optional)
+            **extraction_options: Other keyword arguments for extract_main_element()
+
+        Returns:
+            BeautifulSoup element holding the main content
+
+        Raises:
+            ContentExtractionError: If main content cannot be found
+        """
+        if metrics is None:
+            metrics = {}
+        entry = self.lookup(url)
+        if entry is not None and not extraction_options.get("hint_selector"):
+            extraction_options["hint_selector"] = entry["selector"]
+        element = extract_main_element(html_content, content_selectors, metrics=metrics,
+                                       **extraction_options)
+        if entry is not None and entry["fallback"] and metrics.get("hint") == "hit":
+            # Clean up the element the way the fallback would have
+            for tag in element(FALLBACK_REMOVED_TAGS):
+                tag.decompose()
+        self.record(url, entry, metrics, element)
+        return element
+
+    def stats(self) -> Dict:
+        """Return the counters, the hit rate and the number of entries."""
+        with self._lock:
+            lookups = self.stats_counters["lookups"]
+            return dict(self.stats_counters, entries=len(self._entries),
+                        hit_rate=round(self.stats_counters["hits"] / lookups, 3) if lookups else None)
+
+    def _changed(self) -> None:
+        """Count a change and save when enough have piled up. Caller holds the lock."""
+        self._changes += 1
+        if self._changes >= self._next_save:
+            try:
+                self._save()
+            except OSError as e:
+                # Called from extraction: a full disk must not fail the page
+                print(f"Warning: Failed to save selector cache: {str(e)}", file=sys.stderr)
+                self._next_save = self._changes + self.save_every
+
+    def save(self) -> None:
+        """
+        Write the cache file.
+
+        Raises:
+            OSError: If the file cannot be written
+        """
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        data = json.dumps({"version": CACHE_VERSION, "entries": self._entries},
+                          indent=1, sort_keys=True)
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        tmp_path = f"{self.file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.file_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._changes = 0
+        self._next_save = self.save_every
+
+    def close(self) -> None:
+        """
+        Save pending changes.
+
+        Raises:
+            OSError: If the file cannot be written
+        """
+        with self._lock:
+            if self._changes:
+                self._save()
+
+    def __enter__(self) -> "SelectorCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
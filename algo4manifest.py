@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Incremental Re-Sync
+
+This module re-mirrors a set of webpages against a manifest of the previous
+run. For every URL the manifest records the raw-HTML hash, the
+extracted-content hash, a fingerprint of the selectors and options used,
+and the output path. A rerun skips extraction when the raw HTML is
+unchanged, skips conversion when only the page chrome changed, and skips
+writing when the Markdown is byte-identical, then reports which pages were
+added, changed, unchanged or removed. A removed page is reported once and
+then marked as such in the manifest; its output path stays reserved in case
+the URL comes back. The manifest is checkpointed during the run, so an
+interrupted sync keeps the pages it has done.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from algo4download import (
+    __version__,
+    DEFAULT_CONTENT_SELECTORS,
+    create_session,
+    download_webpage,
+    extract_main_element,
+    convert_element,
+    save_file,
+    url_to_filename,
+    NetworkError,
+    ContentExtractionError,
+    FileOperationError,
+)
+
+def content_hash(content: str) -> str:
+    """Return the SHA-256 hex digest of a string."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def options_fingerprint(content_selectors: list = None,
+                        conversion_options: dict = None,
+                        extraction_options: dict = None) -> str:
+    """
+    Fingerprint the settings that affect the output for a given HTML input.
+
+    Args:
+        content_selectors: List of CSS selectors to try for finding main content
+        conversion_options: Options for HTML to Markdown conversion
+        extraction_options: Extra keyword arguments for extract_main_element()
+
+    Returns:
+        Hex digest covering the settings and the algorithm version
+    """
+    settings = {
+        "version": __version__,
+        "content_selectors": content_selectors or DEFAULT_CONTENT_SELECTORS,
+        "conversion_options": conversion_options or {},
+        "extraction_options": extraction_options or {},
+    }
+    return content_hash(json.dumps(settings, sort_keys=True))
+
+class Manifest:
+    """
+    URL -> output record for a mirrored set of pages, stored as JSON.
+
+    Each entry holds "html_hash", "content_hash", "fingerprint",
+    "markdown_hash" and "output_path", and "removed" once the URL has been
+    reported as removed.
+    """
+
+    def __init__(self, file_path: str):
+        """
+        Args:
+            file_path: Path of the manifest file (created on save if missing)
+        """
+        self.file_path = file_path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(file_path):
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f).get("pages", {})
+            except (IOError, ValueError) as e:
+                raise FileOperationError(f"Failed to read manifest: {str(e)}") from e
+
+    def get(self, url: str) -> Dict:
+        with self._lock:
+            return self.entries.get(url)
+
+    def update(self, url: str, entry: Dict) -> None:
+        with self._lock:
+            self.entries[url] = entry
+
+    def remove(self, url: str) -> None:
+        with self._lock:
+            self.entries.pop(url, None)
+
+    def save(self) -> None:
+        """Write the manifest atomically; safe while workers update it."""
+        tmp_path = self.file_path + ".tmp"
+        with self._lock:
+            data = json.dumps({"version": __version__, "pages": self.entries},
+                              indent=1, sort_keys=True)
+        try:
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.file_path)
+        except IOError as e:
+            raise FileOperationError(f"Failed to save manifest: {str(e)}") from e
+
+def _file_matches(file_path: str, markdown_content: str) -> bool:
+    """Check whether a file already holds exactly this Markdown."""
+    data = markdown_content.encode("utf-8")
+    try:
+        if os.path.getsize(file_path) != len(data):
+            return False
+        with open(file_path, "rb") as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+def sync_webpages(urls: List[str],
+                  manifest_path: str,
+                  output_dir: str = ".",
+                  workers: int = 8,
+                  content_selectors: list = None,
+                  conversion_options: dict = None,
+                  extraction_options: dict = None,
+                  prune: bool = False,
+                  overwrite: bool = False,
+                  verbose: bool = True,
+                  session: "requests.Session" = None,
+                  cache: "ResponseCache" = None,
+                  download_options: dict = None,
+                  checkpoint_every: int = 100) -> Dict:
+    """
+    Mirror a set of webpages incrementally against a manifest.
+
+    Args:
+        urls: URLs of the webpages in the mirror
+        manifest_path: Path of the manifest from the previous run
+        output_dir: Directory to save new Markdown files in
+        workers: Maximum number of concurrent downloads
+        content_selectors: List of CSS selectors to try for finding main content
+        conversion_options: Options for HTML to Markdown conversion
+        extraction_options: Extra keyword arguments for extract_main_element()
+        prune: Delete the output files of removed pages and drop them from
+            the manifest
+        overwrite: Whether a new page may overwrite an existing file that
+            the manifest does not list; files of listed pages are always
+            updated
+        verbose: Whether to print progress information
+        session: Shared requests session (one is created if not provided)
+        cache: algo4cache.ResponseCache shared by all workers (optional)
+        download_options: Extra keyword arguments for download_webpage()
+        checkpoint_every: Save the manifest after this many pages
+
+    Returns:
+        Run summary with the lists "added", "changed", "unchanged",
+        "removed" and "failed" (the last as {"url", "error"} dictionaries)
+    """
+    manifest = Manifest(manifest_path)
+    fingerprint = options_fingerprint(content_selectors, conversion_options, extraction_options)
+    workers = max(1, workers)
+    if session is None:
+        session = create_session(pool_maxsize=workers)
+
+    # Keep existing output paths stable and give new pages unique ones
+    used_paths = {entry["output_path"] for entry in manifest.entries.values()}
+    output_paths = {}
+    for url in urls:
+        entry = manifest.get(url)
+        if entry:
+            output_paths[url] = entry["output_path"]
+            continue
+        base = os.path.join(output_dir, url_to_filename(url, ""))
+        path = base + ".md"
+        counter = 2
+        while path in used_paths:
+            path = f"{base}-{counter}.md"
+            counter += 1
+        used_paths.add(path)
+        output_paths[url] = path
+
+    def sync(url: str) -> tuple:
+        previous = manifest.get(url)
+        output_path = output_paths[url]
+        # The output file of a listed page belongs to this mirror
+        may_overwrite = overwrite or previous is not None
+        if previous is not None and previous.get("removed"):
+            previous = None  # Listed again: a new page at its old path
+        try:
+            html_content, _ = download_webpage(url, session=session, cache=cache,
+                                               **(download_options or {}))
+            html_hash = content_hash(html_content)
+            reusable = (previous is not None
+                        and previous["fingerprint"] == fingerprint
+                        and os.path.exists(output_path))
+            if reusable and previous["html_hash"] == html_hash:
+                return "unchanged", None
+
+            element = extract_main_element(html_content, content_selectors,
+                                           **(extraction_options or {}))
+            extracted_hash = content_hash(str(element))
+            entry = {
+                "html_hash": html_hash,
+                "content_hash": extracted_hash,
+                "fingerprint": fingerprint,
+                "output_path": output_path,
+            }
+            if reusable and previous["content_hash"] == extracted_hash:
+                # Only the page chrome changed; the Markdown would be the same
+                manifest.update(url, {**entry, "markdown_hash": previous["markdown_hash"]})
+                return "unchanged", None
+
+            markdown_content = convert_element(element, conversion_options)
+            entry["markdown_hash"] = content_hash(markdown_content)
+            if _file_matches(output_path, markdown_content):
+                status = "unchanged" if previous else "added"
+            else:
+                save_file(markdown_content, output_path, may_overwrite)
+                status = "changed" if previous else "added"
+            manifest.update(url, entry)
+            return status, None
+        except (NetworkError, ContentExtractionError, FileOperationError) as e:
+            return "failed", str(e)
+
+    summary = {"added": [], "changed": [], "unchanged": [], "removed": [], "failed": []}
+    since_checkpoint = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for url, (status, error) in zip(urls, executor.map(sync, urls)):
+                if status == "failed":
+                    summary["failed"].append({"url": url, "error": error})
+                else:
+                    summary[status].append(url)
+                if verbose:
+                    print(f"[{status}] {url}" + (f": {error}" if error else ""))
+                since_checkpoint += 1
+                if since_checkpoint >= checkpoint_every:
+                    manifest.save()
+                    since_checkpoint = 0
+
+        current = set(urls)
+        for url in sorted(set(manifest.entries) - current):
+            entry = manifest.get(url)
+            if prune:
+                try:
+                    os.remove(entry["output_path"])
+                except OSError:
+                    pass
+                manifest.remove(url)
+            elif entry.get("removed"):
+                continue  # Reported by an earlier run
+            else:
+                manifest.update(url, {**entry, "removed": True})
+            summary["removed"].append(url)
+            if verbose:
+                print(f"[removed] {url}")
+    finally:
+        manifest.save()
+    return summary
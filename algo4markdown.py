@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Direct DOM to Markdown Converter
+
+This module converts an already-parsed BeautifulSoup subtree to Markdown
+without serializing it back to an HTML string and re-parsing it with
+html2text. The output follows the html2text settings used by
+html_to_markdown() in algo4download.py: inline and protected links,
+skipped internal links, padded tables and no line wrapping. Empty
+emphasis elements, which html2text renders as bare markers, are dropped.
+"""
+
+import re
+import string
+from typing import List, Tuple
+
+from bs4 import NavigableString, Tag, Comment, Doctype, ProcessingInstruction, Declaration, CData
+from html2text.utils import escape_md, escape_md_section, reformat_table
+
+# Elements whose content is never rendered
+SKIP_TAGS = {"script", "style", "head", "title", "template", "noscript", "meta", "link"}
+
+# Elements that start a new block
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "body", "dd", "details", "dialog",
+    "div", "dl", "dt", "fieldset", "figcaption", "figure", "footer", "form",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "hgroup", "hr", "html", "li",
+    "main", "nav", "ol", "p", "pre", "section", "summary", "table", "ul",
+}
+
+HEADING_TAGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+EMPHASIS_TAGS = {"em": "_", "i": "_", "u": "_", "strong": "**", "b": "**",
+                 "del": "~~", "strike": "~~", "s": "~~"}
+NON_TEXT_NODES = (Comment, Doctype, ProcessingInstruction, Declaration, CData)
+
+RE_WHITESPACE = re.compile(r"[ \t\n\r\f\v\xa0]+")
+
+# html2text puts a space before emphasis that follows a letter or digit
+# ("a<em>b</em>" -> "a _b_"), even at the start of a paragraph or line when
+# the text before it was in the previous block. It stands in as this
+# character until the output is complete, so stripping line starts keeps it.
+EMPHASIS_SPACE = "\x00"
+
+# html2text adds a space after closing emphasis unless the next character is one of these
+RE_NO_SPACE_AFTER_EMPHASIS = re.compile(r"[][(){}\s.!?\x00]")
+
+DEFAULT_OPTIONS = {
+    "ignore_links": False,
+    "ignore_images": False,
+    "ignore_emphasis": False,
+    "protect_links": True,
+    "skip_internal_links": True,
+    "inline_links": True,
+    "pad_tables": True,
+}
+
+class _Converter:
+    """Walks a DOM subtree once and renders Markdown blocks."""
+
+    def __init__(self, options: dict, root: Tag):
+        self.options = {**DEFAULT_OPTIONS, **(options or {})}
+        self.references = []
+        # The last text before the converted element, which html2text never sees
+        self._text_before_root = self._previous_text(root)
+
+    # Block rendering -----------------------------------------------------
+
+    def blocks(self, node: Tag) -> List[str]:
+        """Render the children of node as a list of Markdown blocks."""
+        blocks = []
+        inline = []
+        for child in node.children:
+            if isinstance(child, Tag) and child.name in BLOCK_TAGS:
+                self._flush(inline, blocks)
+                blocks.extend(self.block(child))
+            else:
+                inline.append(child)
+        self._flush(inline, blocks)
+        return blocks
+
+    def _flush(self, inline: list, blocks: List[str]) -> None:
+        if inline:
+            text = self.inline_nodes(inline).strip(" ")
+            text = "\n".join(line.lstrip(" ") if i else line
+                             for i, line in enumerate(text.split("\n")))
+            if text.strip():
+                blocks.append(text)
+            inline.clear()
+
+    def block(self, node: Tag) -> List[str]:
+        """Render one block-level element."""
+        name = node.name
+        if name in SKIP_TAGS:
+            return []
+        if name in HEADING_TAGS:
+            text = self.inline_nodes(node.children).strip()
+            return ["#" * HEADING_TAGS[name] + " " + text] if text else []
+        if name == "hr":
+            return ["* * *"]
+        if name == "pre":
+            return [self.preformatted(node)]
+        if name in ("ul", "ol"):
+            return [self.list_block(node)]
+        if name == "blockquote":
+            inner = "\n\n".join(self.blocks(node))
+            last = next((child for child in reversed(node.contents)
+                         if isinstance(child, Tag) or str(child).strip()), None)
+            if isinstance(last, Tag) and last.name in ("ul", "ol"):
+                inner += "\n"  # html2text closes a quoted list with an empty "> " line
+            return ["\n".join("> " + line if line else "> " for line in inner.split("\n"))]
+        if name == "table":
+            return [self.table(node)]
+        if name == "dl":
+            return [self.definition_list(node)]
+        if name == "dd":
+            inner = "\n\n".join(self.blocks(node))
+            return ["\n".join("    " + line for line in inner.split("\n"))]
+        return self.blocks(node)
+
+    def preformatted(self, node: Tag, indent: str = "    ") -> str:
+        text = node.get_text()
+        if text.startswith("\n"):
+            text = text[1:]
+        return "\n".join(indent + line for line in text.rstrip("\n").split("\n"))
+
+    def list_block(self, node: Tag, indent: str = "  ") -> str:
+        """Render a list; a list whose last item ends with a block gets a trailing newline."""
+        text, loose = self.list_items(node, indent)
+        return text + "\n" if loose else text
+
+    def list_items(self, node: Tag, indent: str) -> Tuple[str, bool]:
+        """
+        Render the items of a list, and tell whether the last one ends with a block.
+
+        indent goes before each marker. As in html2text, the content of an
+        item sits two columns further in, three for an ordered list.
+        """
+        ordered = node.name == "ol"
+        number = int(node.get("start", 1)) if str(node.get("start", "1")).isdigit() else 1
+        content_indent = indent + ("   " if ordered else "  ")
+        text = ""
+        loose = False
+        for item in node.find_all("li", recursive=False):
+            marker = f"{number}. " if ordered else "* "
+            number += 1
+            body, item_loose = self.list_item(item, content_indent)
+            if text:
+                # Like html2text, an item ending with a paragraph is followed by a blank line
+                text += "\n\n" if loose else "\n"
+            text += indent + marker + body
+            loose = item_loose
+        return text, loose
+
+    def list_item(self, item: Tag, indent: str) -> Tuple[str, bool]:
+        """
+        Render the content of an <li>.
+
+        Inline content starts on the marker line. Block children are
+        separated by blank lines and, as in html2text, continue at the left
+        margin; nested lists follow inline text on the next line. indent is
+        the column of the item content, where nested lists and code go.
+        """
+        segments = []  # (kind, text, loose) with kind "inline", "block" or "list"
+        inline = []
+
+        def flush():
+            if inline:
+                text = RE_WHITESPACE.sub(" ", self.inline_nodes(inline)).strip()
+                if text:
+                    segments.append(("inline", text, False))
+                inline.clear()
+
+        for child in item.children:
+            if isinstance(child, Tag) and child.name in ("ul", "ol"):
+                flush()
+                text, loose = self.list_items(child, indent)
+                if text:
+                    segments.append(("list", text, loose))
+            elif isinstance(child, Tag) and child.name in BLOCK_TAGS:
+                flush()
+                if child.name == "pre":
+                    text = self.preformatted(child, indent + "    ")
+                else:
+                    text = "\n\n".join(block for block in self.block(child) if block)
+                if text.strip():
+                    segments.append(("block", text, True))
+            else:
+                inline.append(child)
+        flush()
+
+        body = ""
+        previous = None
+        for kind, text, _ in segments:
+            if previous is not None or kind == "list":
+                body += "\n" if kind == "list" and previous in (None, "inline") else "\n\n"
+            body += text
+            previous = kind
+        return body, bool(segments) and segments[-1][2]
+
+    def definition_list(self, node: Tag) -> str:
+        lines = []
+        for child in node.find_all(["dt", "dd"], recursive=False):
+            text = RE_WHITESPACE.sub(" ", " ".join(self.blocks(child))).strip()
+            lines.append(("    " if child.name == "dd" else "") + text)
+        return "\n".join(lines)
+
+    def table(self, node: Tag) -> str:
+        rows = []
+        header_rows = 0
+        for row in node.find_all("tr"):
+            if row.find_parent("table") is not node:
+                continue
+            cells = [self.inline_nodes(cell.children).strip().replace("\n", " ")
+                     for cell in row.find_all(["th", "td"], recursive=False)]
+            if not rows and row.find("th", recursive=False) is not None:
+                header_rows = 1
+            rows.append(cells)
+        if not rows:
+            return ""
+        columns = max(len(row) for row in rows)
+        rows = [row + [""] * (columns - len(row)) for row in rows]
+        if not header_rows:
+            header_rows = 1
+        # Same raw layout as html2text, so padding goes through its reformat_table()
+        lines = ["| ".join(row) for row in rows]
+        lines.insert(header_rows, "|".join(["---"] * columns))
+        if self.options["pad_tables"]:
+            lines = reformat_table(lines, 1)
+        return "\n".join(lines)
+
+    # Inline rendering ----------------------------------------------------
+
+    def inline_nodes(self, nodes) -> str:
+        parts = []
+        after_emphasis = False
+        for node in nodes:
+            text = self.inline(node)
+            if not text:
+                continue
+            if after_emphasis and not RE_NO_SPACE_AFTER_EMPHASIS.match(text[0]):
+                text = " " + text
+            after_emphasis = isinstance(node, Tag) and node.name in EMPHASIS_TAGS
+            parts.append(text)
+        text = "".join(parts)
+        return re.sub(r" +\n", lambda m: "  \n" if m.group(0).startswith("  ") else "\n", text)
+
+    def inline(self, node) -> str:
+        if isinstance(node, NON_TEXT_NODES):
+            return ""
+        if isinstance(node, NavigableString):
+            text = RE_WHITESPACE.sub(" ", str(node))
+            return escape_md_section(text)
+        name = node.name
+        if name in SKIP_TAGS:
+            return ""
+        if name == "br":
+            return "  \n"
+        if name in EMPHASIS_TAGS:
+            text = self.inline_nodes(node.children)
+            if self.options["ignore_emphasis"] or not text.strip():
+                return text
+            marker = EMPHASIS_TAGS[name]
+            return self._emphasis_space(node, marker) + marker + text.strip() + marker
+        if name == "math" or name.endswith(":math"):
+            # Raw markup for the mathml2latex post-processor (algo4process.py)
+            return RE_WHITESPACE.sub(" ", str(node))
+        if name in ("code", "kbd", "samp", "tt"):
+            text = RE_WHITESPACE.sub(" ", node.get_text())
+            return "`" + text + "`" if text else ""
+        if name == "a":
+            return self.link(node)
+        if name == "img":
+            return self.image(node)
+        if name in BLOCK_TAGS:
+            return " ".join(self.block(node))
+        return self.inline_nodes(node.children)
+
+    def link(self, node: Tag) -> str:
+        text = self.inline_nodes(node.children)
+        href = node.get("href")
+        if (self.options["ignore_links"] or not href
+                or (self.options["skip_internal_links"] and href.startswith("#"))):
+            return text
+        title = node.get("title")
+        if self.options["protect_links"]:
+            href = f"<{href}>"
+        if not self.options["inline_links"]:
+            self.references.append((href, title))
+            return f"[{text}][{len(self.references)}]"
+        title = f' "{escape_md(title)}"' if title and title.strip() else ""
+        return f"[{text}]({escape_md(href)}{title})"
+
+    def image(self, node: Tag) -> str:
+        src = node.get("src")
+        if self.options["ignore_images"] or src is None:
+            return ""
+        alt = node.get("alt", "")
+        return f"![{escape_md(alt)}]({escape_md(src)})"
+
+    def _emphasis_space(self, node: Tag, marker: str) -> str:
+        """Return EMPHASIS_SPACE where html2text separates emphasis from the text before it."""
+        previous = self._previous_text(node)
+        last = str(previous)[-1:] if previous is not None and previous is not self._text_before_root else ""
+        if marker == "_":
+            space = bool(last) and last not in string.whitespace and last not in string.punctuation
+        else:
+            space = last == marker[0]
+        return EMPHASIS_SPACE if space else ""
+
+    @staticmethod
+    def _previous_text(node: Tag):
+        return node.find_previous(string=lambda text: not isinstance(text, NON_TEXT_NODES))
+
+def element_to_markdown(element: Tag, options: dict = None) -> str:
+    """
+    Convert a parsed HTML element to Markdown in a single tree walk.
+
+    Args:
+        element: BeautifulSoup element (typically the extracted main content)
+        options: Conversion options, as for html_to_markdown()
+
+    Returns:
+        Markdown content (not yet cleaned up)
+    """
+    converter = _Converter(options, element)
+    if element.name in BLOCK_TAGS or element.name == "[document]":
+        blocks = converter.block(element) if element.name in BLOCK_TAGS else converter.blocks(element)
+    else:
+        blocks = [converter.inline(element)]
+    markdown_content = "\n\n".join(block for block in blocks if block).replace(EMPHASIS_SPACE, " ")
+    if converter.references:
+        markdown_content += "\n\n" + "\n".join(
+            f"   [{i}]: {href}" + (f' "{title}"' if title else "")
+            for i, (href, title) in enumerate(converter.references, 1))
+    return markdown_content
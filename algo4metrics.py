@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Per-Stage Metrics
+
+This module provides the instrumentation used by webpage_to_markdown():
+connection classes that time DNS resolution and TCP connect separately,
+and a thread-safe JSON Lines writer that can be passed as the metrics hook
+so timings from large runs can be aggregated afterwards.
+
+Sessions from algo4download.create_session() mount TimedHTTPAdapter, so
+every new connection records its DNS and connect time in a thread-local
+slot. download_webpage() clears the slot before a request and reads it
+afterwards; a reused keep-alive connection leaves it empty.
+"""
+
+import json
+import time
+import socket
+import threading
+from typing import Dict
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+_connection_timings = threading.local()
+
+def reset_connection_timings() -> None:
+    """Forget the timings of the last connection opened by this thread."""
+    _connection_timings.last = None
+
+def take_connection_timings() -> Dict:
+    """
+    Return and clear the timings of the last connection opened by this thread.
+
+    Returns:
+        Dictionary with "dns_ms" and "connect_ms", or an empty dictionary
+        if no connection was opened since the last reset
+    """
+    timings = getattr(_connection_timings, "last", None)
+    _connection_timings.last = None
+    return timings or {}
+
+class _TimedConnectionMixin:
+    """Resolve the host name separately so DNS and connect are timed apart."""
+
+    def _new_conn(self) -> socket.socket:
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            addresses = [info[4][0] for info in socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)]
+        except socket.gaierror:
+            # Let urllib3 raise its usual NameResolutionError
+            return super()._new_conn()
+        resolved = time.perf_counter()
+
+        # Try the resolved addresses in order, like socket.create_connection()
+        try:
+            for index, address in enumerate(addresses):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except Exception:
+                    if index == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+
+        _connection_timings.last = {
+            "dns_ms": (resolved - start) * 1000,
+            "connect_ms": (time.perf_counter() - resolved) * 1000,
+        }
+        return sock
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections record DNS and connect times."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+class MetricsWriter:
+    """
+    Metrics hook that appends each record to a JSON Lines file.
+
+    Instances are callable, so one can be passed as metrics_hook to
+    webpage_to_markdown() or webpages_to_markdown(); writes from worker
+    threads are serialized.
+    """
+
+    def __init__(self, file_path: str):
+        """
+        Args:
+            file_path: Path of the JSON Lines file (appended to if it exists)
+        """
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._file = open(file_path, "a", encoding="utf-8")
+
+    def __call__(self, record: Dict) -> None:
+        line = json.dumps(record, sort_keys=True) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "MetricsWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Two-Stage Conversion Pipeline
+
+This module splits batch conversion into an I/O stage and a CPU stage.
+Fetch threads download pages and push the raw HTML into a bounded queue;
+a process pool runs extract_main_content()/html_to_markdown() outside the
+GIL. A single writer saves results in input order, even though they
+complete out of order. The number of pages between "fetch started" and
+"written" is capped, so memory stays flat however long the URL list is.
+If the process pool breaks, the batch stops and the error is raised in the
+caller.
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, List
+
+from algo4download import (
+    create_session,
+    download_webpage,
+    convert_html,
+    save_file,
+    batch_file_names,
+    NetworkError,
+    ContentExtractionError,
+    FileOperationError,
+)
+from algo4store import OutputStore, StoreError
+
+def _convert_page(html_content: str,
+                  content_selectors: list,
+                  conversion_options: dict,
+                  extraction_options: dict) -> str:
+    """Process-pool entry point: extract and convert one page."""
+    return convert_html(html_content, content_selectors, conversion_options, extraction_options)
+
+def pipeline_webpages_to_markdown(urls: List[str],
+                                  output_dir: str = ".",
+                                  fetch_workers: int = 8,
+                                  cpu_workers: int = None,
+                                  queue_size: int = None,
+                                  max_in_flight: int = None,
+                                  content_selectors: list = None,
+                                  conversion_options: dict = None,
+                                  extraction_options: dict = None,
+                                  combined_file: str = None,
+                                  save_html: bool = False,
+                                  overwrite: bool = False,
+                                  verbose: bool = True,
+                                  session: "requests.Session" = None,
+                                  download_options: dict = None) -> List[Dict]:
+    """
+    Convert a batch of webpages with fetching and conversion pipelined.
+
+    Args:
+        urls: URLs of the webpages to convert
+        output_dir: Directory to save the output files in
+        fetch_workers: Number of download threads
+        cpu_workers: Number of conversion processes (default: CPU count)
+        queue_size: Maximum number of downloaded pages waiting for a
+            conversion process (default: 2 * cpu_workers)
+        max_in_flight: Maximum number of pages between the start of their
+            download and being written (default: 4 * (fetch_workers + cpu_workers))
+        content_selectors: List of CSS selectors to try for finding main content
+        conversion_options: Options for HTML to Markdown conversion
+        extraction_options: Extra keyword arguments for extract_main_element()
+        combined_file: Also append every page's Markdown to this file, in input
+            order, with an algo4store index alongside it
+        save_html: Whether to also save the downloaded HTML
+        overwrite: Whether to overwrite existing files
+        verbose: Whether to print progress information
+        session: Shared requests session (one is created if not provided)
+        download_options: Extra keyword arguments for download_webpage()
+
+    Returns:
+        List of result dictionaries, in the same order as urls, with the
+        keys "url", "html_file", "markdown_file" and "error" (None on success)
+
+    Raises:
+        concurrent.futures.process.BrokenProcessPool: If a conversion
+            process dies and pages can no longer be submitted; the pages
+            written before are kept
+    """
+    fetch_workers = max(1, fetch_workers)
+    cpu_workers = max(1, cpu_workers or os.cpu_count() or 1)
+    queue_size = queue_size or 2 * cpu_workers
+    max_in_flight = max_in_flight or 4 * (fetch_workers + cpu_workers)
+    if session is None:
+        session = create_session(pool_maxsize=fetch_workers)
+
+    targets = batch_file_names(urls)
+    results = [{"url": url, "html_file": None, "markdown_file": None, "error": None}
+               for url in urls]
+
+    in_flight = threading.BoundedSemaphore(max_in_flight)
+    cpu_slots = threading.BoundedSemaphore(queue_size)
+    html_queue = queue.Queue(maxsize=queue_size)
+    done_queue = queue.Queue()  # (index, markdown_content, error); index None if dispatch failed
+    stopping = threading.Event()
+
+    def fetch(index: int) -> None:
+        if stopping.is_set():
+            return
+        try:
+            html_content, _ = download_webpage(urls[index], session=session,
+                                               **(download_options or {}))
+            if save_html:
+                html_file = os.path.join(output_dir, targets[index] + ".html")
+                save_file(html_content, html_file, overwrite)
+                results[index]["html_file"] = html_file
+            # Blocks while conversion is behind, until the batch is stopped
+            while not stopping.is_set():
+                try:
+                    html_queue.put((index, html_content), timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+        except (NetworkError, FileOperationError) as e:
+            done_queue.put((index, None, str(e)))
+        except Exception as e:
+            done_queue.put((index, None, f"Unexpected error: {str(e)}"))
+
+    def feed(fetch_pool: ThreadPoolExecutor) -> None:
+        for index in range(len(urls)):
+            in_flight.acquire()  # Released once the page is written
+            if stopping.is_set():
+                return
+            try:
+                fetch_pool.submit(fetch, index)
+            except RuntimeError:
+                return  # Shut down after an error
+
+    def dispatch(cpu_pool: ProcessPoolExecutor) -> None:
+        try:
+            for _ in range(len(urls)):
+                item = html_queue.get()
+                if item is None:
+                    return
+                index, html_content = item
+                cpu_slots.acquire()
+                future = cpu_pool.submit(_convert_page, html_content, content_selectors,
+                                         conversion_options, extraction_options)
+                future.add_done_callback(lambda f, index=index: on_converted(index, f))
+        except Exception as e:
+            # e.g. BrokenProcessPool; the writer re-raises it
+            done_queue.put((None, None, e))
+
+    def on_converted(index: int, future) -> None:
+        cpu_slots.release()
+        try:
+            done_queue.put((index, future.result(), None))
+        except ContentExtractionError as e:
+            done_queue.put((index, None, str(e)))
+        except Exception as e:
+            done_queue.put((index, None, f"Unexpected error: {str(e)}"))
+
+    def write(index: int, markdown_content: str, error: str, combined) -> None:
+        result = results[index]
+        if error is None:
+            markdown_file = os.path.join(output_dir, targets[index] + ".md")
+            try:
+                save_file(markdown_content, markdown_file, overwrite)
+                result["markdown_file"] = markdown_file
+                if combined is not None:
+                    combined.append(result["url"], markdown_content)
+            except (FileOperationError, StoreError, IOError) as e:
+                error = str(e)
+        result["error"] = error
+        if verbose:
+            if error is None:
+                print(f"[ok] {result['url']} -> {result['markdown_file']}")
+            else:
+                print(f"[failed] {result['url']}: {error}")
+
+    combined = None
+    if combined_file:
+        try:
+            combined = OutputStore(combined_file)
+        except StoreError as e:
+            raise FileOperationError(f"Failed to open combined file: {str(e)}") from e
+
+    # Pages that completed out of order, waiting for their predecessors
+    pending = {}
+    next_index = 0
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool, \
+            ProcessPoolExecutor(max_workers=cpu_workers) as cpu_pool:
+        feeder = threading.Thread(target=feed, args=(fetch_pool,), daemon=True)
+        dispatcher = threading.Thread(target=dispatch, args=(cpu_pool,), daemon=True)
+        feeder.start()
+        dispatcher.start()
+
+        try:
+            while next_index < len(urls):
+                index, markdown_content, error = done_queue.get()
+                if index is None:
+                    raise error
+                pending[index] = (markdown_content, error)
+                while next_index in pending:
+                    write(next_index, *pending.pop(next_index), combined)
+                    next_index += 1
+                    in_flight.release()
+        except BaseException:
+            # Stop the other stages so that leaving the pools does not wait on them
+            stopping.set()
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+            try:
+                in_flight.release()  # Wake the feeder
+            except ValueError:
+                pass
+            raise
+
+        # Failed downloads never reach the dispatcher; unblock it
+        html_queue.put(None)
+        feeder.join()
+        dispatcher.join()
+
+    return results
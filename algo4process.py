@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Markdown Post-Processing Algorithm
+
+This module post-processes the Markdown produced by algo4download.py before
+it is appended to the output file. Processors are registered by name and
+composed into one streaming pipeline: the document is read once, in
+chunks, and every chunk flows through all processors before the result is
+appended to the output file with a single buffered write.
+
+A processor is a function that takes an iterator of text chunks and yields
+text chunks. Register new passes (e.g. headingconform()) with the
+@register_processor decorator.
+"""
+
+import os
+import re
+import threading
+from xml.etree import ElementTree
+from typing import Callable, Dict, Iterable, Iterator, List
+
+# Size of the chunks read from the source file
+READ_CHUNK_SIZE = 64 * 1024
+
+# Registered processors, in registration order
+PROCESSORS: Dict[str, Callable[[Iterable[str]], Iterator[str]]] = {}
+
+# Processors run by default, in order
+DEFAULT_PROCESSORS = ["mathml2latex"]
+
+# Open algo4store.OutputStore of each indexed output file, by absolute path
+_stores = {}
+_stores_lock = threading.Lock()
+
+class ProcessingError(Exception):
+    """Exception raised when post-processing fails."""
+    pass
+
+def register_processor(name: str) -> Callable:
+    """
+    Register a streaming processor under a name.
+
+    Args:
+        name: Name used to select the processor
+
+    Returns:
+        Decorator that registers the processor function
+    """
+    def decorator(function: Callable[[Iterable[str]], Iterator[str]]) -> Callable:
+        PROCESSORS[name] = function
+        return function
+    return decorator
+
+def run_processors(chunks: Iterable[str], processors: List[str] = None) -> Iterator[str]:
+    """
+    Chain processors into a single streaming pass.
+
+    Args:
+        chunks: Source text chunks
+        processors: Names of the processors to apply, in order
+            (default: DEFAULT_PROCESSORS)
+
+    Returns:
+        Iterator over the processed chunks
+
+    Raises:
+        ProcessingError: If a processor name is not registered
+    """
+    if processors is None:
+        processors = DEFAULT_PROCESSORS
+    stream = iter(chunks)
+    for name in processors:
+        if name not in PROCESSORS:
+            raise ProcessingError(f"Unknown processor: {name}")
+        stream = PROCESSORS[name](stream)
+    return stream
+
+def read_chunks(file_path: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Read a text file in chunks.
+
+    Args:
+        file_path: Path of the file to read
+        chunk_size: Number of characters per chunk
+
+    Returns:
+        Iterator over the file's text chunks
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+# ---------------------------------------------------------------------------
+# MathML to LaTeX
+# ---------------------------------------------------------------------------
+
+# A block's opening and closing tags are searched for separately, so the
+# search for the end of a block split across chunks resumes in the new
+# text; a partial tag at a chunk boundary is held back until the next
+# chunk arrives
+MATHML_OPEN = re.compile(r"<(?:\w+:)?math\b[^>]*>", re.I)
+MATHML_CLOSE = re.compile(r"</(?:\w+:)?math\s*>", re.I)
+MATHML_START = re.compile(r"<(?:\w+:)?math\b", re.I)
+
+LATEX_SYMBOLS = {
+    "α": r"\alpha", "β": r"\beta", "γ": r"\gamma", "δ": r"\delta", "ε": r"\epsilon",
+    "ζ": r"\zeta", "η": r"\eta", "θ": r"\theta", "ι": r"\iota", "κ": r"\kappa",
+    "λ": r"\lambda", "μ": r"\mu", "ν": r"\nu", "ξ": r"\xi", "π": r"\pi", "ρ": r"\rho",
+    "σ": r"\sigma", "τ": r"\tau", "υ": r"\upsilon", "φ": r"\phi", "χ": r"\chi",
+    "ψ": r"\psi", "ω": r"\omega", "Γ": r"\Gamma", "Δ": r"\Delta", "Θ": r"\Theta",
+    "Λ": r"\Lambda", "Ξ": r"\Xi", "Π": r"\Pi", "Σ": r"\Sigma", "Φ": r"\Phi",
+    "Ψ": r"\Psi", "Ω": r"\Omega",
+    "∑": r"\sum", "∏": r"\prod", "∫": r"\int", "∮": r"\oint", "∞": r"\infty",
+    "∂": r"\partial", "∇": r"\nabla", "√": r"\surd", "±": r"\pm", "∓": r"\mp",
+    "×": r"\times", "÷": r"\div", "·": r"\cdot", "⋅": r"\cdot", "∘": r"\circ",
+    "≤": r"\leq", "≥": r"\geq", "≠": r"\neq", "≈": r"\approx", "≡": r"\equiv",
+    "∼": r"\sim", "∝": r"\propto", "∈": r"\in", "∉": r"\notin", "⊂": r"\subset",
+    "⊆": r"\subseteq", "⊃": r"\supset", "⊇": r"\supseteq", "∪": r"\cup",
+    "∩": r"\cap", "∅": r"\emptyset", "∀": r"\forall", "∃": r"\exists", "¬": r"\neg",
+    "∧": r"\wedge", "∨": r"\vee", "→": r"\rightarrow", "←": r"\leftarrow",
+    "↔": r"\leftrightarrow", "⇒": r"\Rightarrow", "⇐": r"\Leftarrow",
+    "⇔": r"\Leftrightarrow", "↦": r"\mapsto", "…": r"\ldots", "⋯": r"\cdots",
+    "′": "'", "″": "''", "−": "-", "⁡": "", "⁢": "", "⁣": "",
+}
+
+LATEX_FUNCTIONS = {"sin", "cos", "tan", "cot", "sec", "csc", "log", "ln", "exp",
+                   "lim", "max", "min", "sup", "inf", "det", "arg", "deg", "gcd"}
+
+LATEX_ACCENTS = {"^": r"\hat", "ˆ": r"\hat", "¯": r"\bar", "‾": r"\overline",
+                 "~": r"\tilde", "˜": r"\tilde", "→": r"\vec", "˙": r"\dot", "¨": r"\ddot"}
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1].rsplit(":", 1)[-1].lower()
+
+def _symbols(text: str) -> str:
+    return "".join(LATEX_SYMBOLS.get(char, char) for char in text)
+
+def _group(latex: str) -> str:
+    # Single characters and single commands (e.g. \alpha) need no braces
+    if len(latex) == 1 or re.fullmatch(r"\\[A-Za-z]+", latex):
+        return latex
+    return "{" + latex + "}"
+
+def _children(element: ElementTree.Element) -> List[str]:
+    return [_to_latex(child) for child in element]
+
+def _to_latex(element: ElementTree.Element) -> str:
+    """Convert one MathML element (and its subtree) to LaTeX."""
+    name = _local_name(element.tag)
+    text = (element.text or "").strip()
+    parts = _children(element)
+
+    if name in ("math", "mrow", "mstyle", "mpadded", "merror", "mphantom", "none"):
+        return " ".join(part for part in parts if part)
+    if name == "semantics":
+        for child in element:
+            if (_local_name(child.tag) == "annotation"
+                    and "tex" in child.get("encoding", "").lower()):
+                return (child.text or "").strip()
+        return parts[0] if parts else ""
+    if name in ("annotation", "annotation-xml", "mspace"):
+        return ""
+    if name == "mi":
+        if text in LATEX_FUNCTIONS:
+            return "\\" + text
+        return _symbols(text)
+    if name == "mn":
+        return text
+    if name == "mo":
+        return {"(": "(", ")": ")", "{": r"\{", "}": r"\}"}.get(text, _symbols(text))
+    if name == "mtext":
+        return r"\text{" + text + "}" if text else ""
+    if name == "ms":
+        return r'\text{"' + text + '"}'
+    if name == "mfrac" and len(parts) == 2:
+        return r"\frac{" + parts[0] + "}{" + parts[1] + "}"
+    if name == "msqrt":
+        return r"\sqrt{" + " ".join(parts) + "}"
+    if name == "mroot" and len(parts) == 2:
+        return r"\sqrt[" + parts[1] + "]{" + parts[0] + "}"
+    if name == "msup" and len(parts) == 2:
+        return _group(parts[0]) + "^" + _group(parts[1])
+    if name == "msub" and len(parts) == 2:
+        return _group(parts[0]) + "_" + _group(parts[1])
+    if name == "msubsup" and len(parts) == 3:
+        return _group(parts[0]) + "_" + _group(parts[1]) + "^" + _group(parts[2])
+    if name == "mover" and len(parts) == 2:
+        accent = LATEX_ACCENTS.get((element[1].text or "").strip())
+        if accent:
+            return accent + "{" + parts[0] + "}"
+        return _group(parts[0]) + "^" + _group(parts[1])
+    if name == "munder" and len(parts) == 2:
+        if (element[1].text or "").strip() in ("_", "‾", "¯"):
+            return r"\underline{" + parts[0] + "}"
+        return _group(parts[0]) + "_" + _group(parts[1])
+    if name == "munderover" and len(parts) == 3:
+        return _group(parts[0]) + "_" + _group(parts[1]) + "^" + _group(parts[2])
+    if name == "mfenced":
+        opening = element.get("open", "(")
+        closing = element.get("close", ")")
+        separator = element.get("separators", ",").strip()[:1] or ","
+        return r"\left" + opening + " " + (separator + " ").join(parts) + r" \right" + closing
+    if name == "mtable":
+        return r"\begin{matrix} " + r" \\ ".join(parts) + r" \end{matrix}"
+    if name in ("mtr", "mlabeledtr"):
+        return " & ".join(parts)
+    if name == "mtd":
+        return " ".join(parts)
+    if name == "menclose":
+        return r"\boxed{" + " ".join(parts) + "}"
+    return " ".join(part for part in [_symbols(text)] + parts if part)
+
+def mathml_to_latex(mathml: str) -> str:
+    """
+    Convert one MathML block to LaTeX wrapped in Markdown math delimiters.
+
+    Args:
+        mathml: MathML markup of a single <math> element
+
+    Returns:
+        "$...$" for inline or "$$...$$" for display math; the original markup
+        if it cannot be parsed
+    """
+    # Strip namespace prefixes and HTML entities that XML does not know
+    source = re.sub(r"<(/?)\w+:", r"<\1", mathml)
+    source = re.sub(r"\s(?:xmlns(?::\w+)?)=\"[^\"]*\"", "", source)
+    source = source.replace("&nbsp;", " ")
+    try:
+        root = ElementTree.fromstring(source)
+    except ElementTree.ParseError:
+        return mathml
+    latex = re.sub(r"\s+", " ", _to_latex(root)).strip()
+    if root.get("display") == "block" or root.get("mode") == "display":
+        return "$$" + latex + "$$"
+    return "$" + latex + "$"
+
+@register_processor("mathml2latex")
+def mathml2latex(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Find MathML blocks and replace them in place with LaTeX.
+
+    Text outside MathML passes straight through; only an unfinished
+    <math> block is buffered across chunk boundaries, and each chunk is
+    scanned once.
+
+    Args:
+        chunks: Source text chunks
+
+    Returns:
+        Iterator over the processed chunks
+    """
+    carry = ""
+    block = None  # Pieces of an unfinished block
+    for chunk in chunks:
+        text = carry + chunk
+        carry = ""
+        position = search_from = 0
+        output = []
+        while True:
+            if block is None:
+                opening = MATHML_OPEN.search(text, position)
+                if opening is None:
+                    # Hold back a '<' that may start a <math> tag
+                    last_open = text.rfind("<", position)
+                    if last_open != -1 and ">" not in text[last_open:] and (
+                            len(text) - last_open < 64 or MATHML_START.match(text, last_open)):
+                        carry = text[last_open:]
+                        text = text[:last_open]
+                    output.append(text[position:])
+                    break
+                output.append(text[position:opening.start()])
+                position = opening.start()
+                search_from = opening.end()
+                block = []
+            closing = MATHML_CLOSE.search(text, search_from)
+            if closing is None:
+                # Hold back a '<' that may start the closing tag
+                last_open = text.rfind("<", search_from)
+                cut = last_open if last_open != -1 and ">" not in text[last_open:] else len(text)
+                block.append(text[position:cut])
+                carry = text[cut:]
+                break
+            block.append(text[position:closing.end()])
+            output.append(mathml_to_latex("".join(block)))
+            block = None
+            position = search_from = closing.end()
+
+        text = "".join(output)
+        if text:
+            yield text
+    if block is not None:
+        carry = "".join(block) + carry
+    if carry:
+        yield carry
+
+# ---------------------------------------------------------------------------
+# Output files
+# ---------------------------------------------------------------------------
+
+def next_output_filename(directory: str = ".", prefix: str = "output", extension: str = ".md") -> str:
+    """
+    Find the first unused numbered output file name and create it empty.
+
+    Args:
+        directory: Directory to create the file in
+        prefix: File name prefix
+        extension: File extension, including the leading dot
+
+    Returns:
+        Path of the new, empty output file (e.g. 'output01.md')
+
+    Raises:
+        ProcessingError: If the file cannot be created
+    """
+    number = 1
+    while True:
+        file_path = os.path.join(directory, f"{prefix}{number:02d}{extension}")
+        try:
+            # Exclusive creation, so two sessions never claim the same file
+            with open(file_path, "x", encoding="utf-8"):
+                return file_path
+        except FileExistsError:
+            number += 1
+        except IOError as e:
+            raise ProcessingError(f"Failed to create output file: {str(e)}") from e
+
+def output_store(output_file: str) -> "OutputStore":
+    """
+    Return the OutputStore of an output file, opened once per session.
+
+    The store reads its index when it is opened, so reusing it keeps
+    appending a page independent of how many pages came before.
+
+    Args:
+        output_file: Path of the output file
+
+    Returns:
+        algo4store.OutputStore for the file
+
+    Raises:
+        StoreError: If the index cannot be read
+    """
+    from algo4store import OutputStore
+
+    key = os.path.abspath(output_file)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = OutputStore(output_file)
+        return store
+
+def process_file(output_file: str,
+                 source_file: str = "download.md",
+                 processors: List[str] = None,
+                 url: str = None) -> str:
+    """
+    Post-process a Markdown file and append the result to the output file.
+
+    The source is read once, in chunks, through all processors; the result
+    is appended to the output file with a single buffered write. When a
+    URL is given, the page is appended through algo4store.OutputStore so
+    it is recorded in the output file's index.
+
+    Args:
+        output_file: Path of the output file to append to
+        source_file: Path of the Markdown file to process
+        processors: Names of the processors to apply (default: DEFAULT_PROCESSORS)
+        url: URL of the page, for the output file's index (optional)
+
+    Returns:
+        "SUCCESS"
+
+    Raises:
+        ProcessingError: If the source cannot be read or the output written
+    """
+    try:
+        processed = "".join(run_processors(read_chunks(source_file), processors))
+    except IOError as e:
+        raise ProcessingError(f"Failed to read {source_file}: {str(e)}") from e
+
+    append_output(output_file, processed, url)
+    return "SUCCESS"
+
+def process_content(output_file: str,
+                    markdown_content: str,
+                    processors: List[str] = None,
+                    url: str = None) -> str:
+    """
+    Post-process Markdown held in memory and append the result to the output file.
+
+    Same as process_file(), without the round trip through a source file.
+
+    Args:
+        output_file: Path of the output file to append to
+        markdown_content: Markdown to process
+        processors: Names of the processors to apply (default: DEFAULT_PROCESSORS)
+        url: URL of the page, for the output file's index (optional)
+
+    Returns:
+        "SUCCESS"
+
+    Raises:
+        ProcessingError: If the output cannot be written
+    """
+    processed = "".join(run_processors([markdown_content], processors))
+    append_output(output_file, processed, url)
+    return "SUCCESS"
+
+def append_output(output_file: str, processed: str, url: str = None) -> None:
+    """
+    Append processed Markdown to the output file with a single write.
+
+    Args:
+        output_file: Path of the output file to append to
+        processed: Processed Markdown
+        url: URL of the page; when given, the page is recorded in the
+            output file's algo4store index
+
+    Raises:
+        ProcessingError: If the output cannot be written
+    """
+    if url is not None:
+        from algo4store import StoreError
+        try:
+            output_store(output_file).append(url, processed)
+        except StoreError as e:
+            raise ProcessingError(str(e)) from e
+        return
+
+    try:
+        with open(output_file, "a", encoding="utf-8") as f:
+            if f.tell() > 0:
+                processed = "\n\n" + processed
+            f.write(processed)
+    except IOError as e:
+        raise ProcessingError(f"Failed to write {output_file}: {str(e)}") from e
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Adaptive Per-Host Rate Limiting and Retries
+
+This module schedules requests per host with token buckets and retries
+throttled or failed requests with exponential backoff and jitter,
+honouring Retry-After.
+
+Each host's request rate tunes itself (additive increase, multiplicative
+decrease): it grows slowly while responses come back fast and cleanly, is
+halved on a 429/503, and is eased back when the response latency climbs
+well above the best latency seen for the host. Only throttled responses to
+requests sent after the last halving halve the rate again, so a burst of
+429s from requests already in flight counts once. A Retry-After
+header pauses the whole host, not just the request that received it.
+
+Pass a RateLimiter to download_webpage() via download_options
+({"rate_limiter": limiter}) or to algo4async.AsyncFetcher.
+"""
+
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from typing import Dict, Optional
+
+# Status codes that are retried; 429 and 503 also throttle the host
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+THROTTLE_STATUS_CODES = (429, 503)
+
+# Rate tuning
+DECREASE_FACTOR = 0.5      # Rate multiplier on a 429/503
+LATENCY_FACTOR = 2.0       # Latency above this multiple of the best seen counts as slowing down
+LATENCY_EASE_FACTOR = 0.9  # Rate multiplier while the host is slowing down
+LATENCY_SMOOTHING = 0.2    # Weight of a new sample in the latency average
+
+def parse_retry_after(value: str) -> Optional[float]:
+    """
+    Parse a Retry-After header value.
+
+    Args:
+        value: Delay in seconds or an HTTP date
+
+    Returns:
+        Seconds to wait (0 or more), or None if the value cannot be parsed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+class HostLimiter:
+    """Token bucket for one host, with a self-tuning rate."""
+
+    def __init__(self, rate: float, min_rate: float, max_rate: float, increase: float):
+        """
+        Args:
+            rate: Initial requests per second
+            min_rate: Lowest rate the host is slowed down to
+            max_rate: Highest rate the host is sped up to
+            increase: Rate added per second's worth of clean responses
+        """
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.decreased_at = float("-inf")  # time.monotonic() of the last halving
+        self.latency = None
+        self.best_latency = None
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token, going into debt if none is left.
+
+        Returns:
+            Seconds the caller must wait before sending its request
+        """
+        with self._lock:
+            now = time.monotonic()
+            # Refill, allowing a burst of up to one second's worth of requests
+            self.tokens = min(max(1.0, self.rate),
+                              self.tokens + max(0.0, now - self.updated) * self.rate)
+            self.updated = max(self.updated, now)
+            self.tokens -= 1
+            self.requests += 1
+            debt_wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(debt_wait, self.paused_until - now, 0.0)
+
+    def record(self, status_code: Optional[int], latency: float, retry_after: float = None,
+               sent_at: float = None) -> None:
+        """
+        Tune the rate from the outcome of a request.
+
+        Args:
+            status_code: HTTP status, or None if the request failed without one
+            latency: Seconds until the response headers arrived
+            retry_after: Seconds from a Retry-After header, if any
+            sent_at: time.monotonic() when the request was sent
+                (default: now minus latency)
+        """
+        now = time.monotonic()
+        if sent_at is None:
+            sent_at = now - latency
+        with self._lock:
+            if status_code in THROTTLE_STATUS_CODES:
+                self.throttled += 1
+                # A request sent before the last halving saw the old rate
+                if sent_at >= self.decreased_at:
+                    self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+                    self.decreased_at = now
+                self.tokens = min(self.tokens, 0.0)  # No burst right after a throttle
+                if retry_after is not None:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+                return
+            if status_code is None or status_code >= 500:
+                return
+
+            self.latency = latency if self.latency is None else \
+                LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * self.latency
+            if self.best_latency is None or self.latency < self.best_latency:
+                self.best_latency = self.latency
+            if self.latency > LATENCY_FACTOR * self.best_latency and self.best_latency > 0:
+                self.rate = max(self.min_rate, self.rate * LATENCY_EASE_FACTOR)
+            else:
+                # Spread the additive increase over a second's worth of requests
+                self.rate = min(self.max_rate, self.rate + self.increase / max(1.0, self.rate))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"rate": round(self.rate, 3), "requests": self.requests,
+                    "throttled": self.throttled, "retries": self.retries,
+                    "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None}
+
+class RateLimiter:
+    """
+    Per-host request scheduling with retries, shared by all workers.
+
+    Thread-safe; reserve() never blocks, so the same limiter also works on
+    an event loop (sleep for the returned delay with asyncio.sleep()).
+    """
+
+    def __init__(self,
+                 initial_rate: float = 4.0,
+                 min_rate: float = 0.2,
+                 max_rate: float = 50.0,
+                 increase: float = 1.0,
+                 max_retries: int = 4,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 60.0,
+                 max_retry_after: float = 300.0):
+        """
+        Args:
+            initial_rate: Requests per second a new host starts at
+            min_rate: Lowest requests per second per host
+            max_rate: Highest requests per second per host
+            increase: Requests per second added per second of clean responses
+            max_retries: Retries per request after the first attempt
+            backoff_base: Backoff before the first retry, doubled each time
+            backoff_max: Upper bound for the exponential backoff
+            max_retry_after: Give up instead of waiting longer than this for Retry-After
+        """
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def host(self, url: str) -> HostLimiter:
+        """Return the limiter for the host of a URL, creating it on first use."""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            limiter = self._hosts.get(host)
+            if limiter is None:
+                limiter = self._hosts[host] = HostLimiter(self.initial_rate, self.min_rate,
+                                                         self.max_rate, self.increase)
+            return limiter
+
+    def reserve(self, url: str) -> float:
+        """Return the seconds to wait before requesting url."""
+        return self.host(url).reserve()
+
+    def record(self, url: str, status_code: Optional[int], latency: float,
+               retry_after: float = None, sent_at: float = None) -> None:
+        """Report the outcome of a request to url, see HostLimiter.record()."""
+        self.host(url).record(status_code, latency, retry_after, sent_at)
+
+    def retry_delay(self, url: str, attempt: int, status_code: Optional[int] = None,
+                    retry_after: float = None) -> Optional[float]:
+        """
+        Decide whether and when to retry a failed request.
+
+        Args:
+            url: URL of the request
+            attempt: Number of attempts made so far (1 after the first)
+            status_code: HTTP status of the response, or None for a connection error
+            retry_after: Seconds from a Retry-After header, if any
+
+        Returns:
+            Seconds to wait before the next attempt, or None to give up
+        """
+        if attempt > self.max_retries:
+            return None
+        if status_code is not None and status_code not in RETRY_STATUS_CODES:
+            return None
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            delay = retry_after
+        else:
+            # Exponential backoff with full jitter
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        host = self.host(url)
+        with host._lock:
+            host.retries += 1
+        return delay
+
+    def get(self, http, url: str, **kwargs) -> "requests.Response":
+        """
+        Send a GET request through the limiter, retrying when worthwhile.
+
+        Args:
+            http: requests session (or the requests module)
+            url: URL to request
+            **kwargs: Keyword arguments for http.get()
+
+        Returns:
+            The last response; throttled or failed responses are returned
+            once the retries are used up
+
+        Raises:
+            requests.exceptions.RequestException: If the last attempt fails
+                without a response
+        """
+        import requests
+
+        attempt = 0
+        while True:
+            wait = self.reserve(url)
+            if wait > 0:
+                time.sleep(wait)
+            attempt += 1
+            start = time.monotonic()
+            try:
+                response = http.get(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self.record(url, None, time.monotonic() - start)
+                delay = self.retry_delay(url, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+
+            retry_after = None
+            if response.status_code in RETRY_STATUS_CODES:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self.record(url, response.status_code, response.elapsed.total_seconds(), retry_after,
+                        sent_at=start)
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+            delay = self.retry_delay(url, attempt, response.status_code, retry_after)
+            if delay is None:
+                return response
+            response.close()
+            # Waits for a Retry-After pause are taken by the next reserve()
+            if retry_after is None:
+                time.sleep(delay)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Return the current rate and counters for every host."""
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {host: limiter.stats() for host, limiter in hosts.items()}
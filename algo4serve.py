@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Conversion Server
+
+This module keeps webpage conversion running in a long-lived process and
+exposes it over a local HTTP API, on a TCP port or a Unix socket, so other
+tools do not pay interpreter startup, imports and fresh connections on
+every call.
+
+- A warm pool of worker threads shares one pooled requests session.
+- Identical in-flight requests are coalesced: callers asking for a URL that
+  is already being converted wait for the same result.
+- The queue is bounded; when it is full, requests are shed at once with
+  503 and a Retry-After estimate instead of piling up.
+
+API:
+    GET  /convert?url=<url>[&selector=<css>...][&format=markdown]
+    POST /convert   {"url": ..., "content_selectors": [...], "format": "json"}
+    GET  /health    Pool, queue and counter snapshot
+
+The JSON response has the keys "url", "final_url", "status_code",
+"encoding", "markdown", "coalesced" and "elapsed_ms"; with format=markdown
+the Markdown is returned as text/markdown. Failed downloads give 502,
+conversions that exceed the request timeout 504, failed extraction 422,
+malformed requests (including invalid selectors) 400 and unexpected
+failures 500, each with an "error" key.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import socket
+import threading
+import socketserver
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import Tuple, Dict, List
+
+from algo4download import (
+    import_dependencies,
+    create_session,
+    convert_webpage,
+    compile_selectors,
+    normalize_url,
+    DEFAULT_PARSER,
+    NetworkError,
+    ContentExtractionError,
+    FileOperationError,
+    MissingDependencyError,
+)
+
+# Largest request body accepted by POST /convert
+MAX_REQUEST_BYTES = 64 * 1024
+
+class ServiceOverloadedError(Exception):
+    """Exception raised when the conversion queue is full."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class ConversionTimeoutError(NetworkError):
+    """Exception raised when a conversion does not finish within the request timeout."""
+    pass
+
+def check_selectors(content_selectors) -> List[str]:
+    """
+    Check client-supplied content selectors.
+
+    Args:
+        content_selectors: Value of the request's selectors, or None
+
+    Returns:
+        The selectors as a list (empty for the service's defaults)
+
+    Raises:
+        ValueError: If they are not a list of strings, or one does not compile
+    """
+    if content_selectors is None:
+        return []
+    if not isinstance(content_selectors, list) or \
+            not all(isinstance(selector, str) for selector in content_selectors):
+        raise ValueError("'content_selectors' must be a list of CSS selector strings")
+    if content_selectors:
+        import soupsieve
+        try:
+            compile_selectors(content_selectors)
+        except soupsieve.SelectorSyntaxError as e:
+            raise ValueError(f"Invalid CSS selector: {str(e).splitlines()[0]}") from e
+    return content_selectors
+
+class ConversionService:
+    """
+    Worker pool that converts webpages for the server.
+
+    Usable on its own from Python:
+
+        with ConversionService(workers=8) as service:
+            result, coalesced = service.convert("https://example.com")
+    """
+
+    def __init__(self,
+                 workers: int = 8,
+                 queue_size: int = 64,
+                 request_timeout: float = 120.0,
+                 content_selectors: list = None,
+                 conversion_options: dict = None,
+                 extraction_options: dict = None,
+                 download_options: dict = None,
+                 cache: "ResponseCache" = None):
+        """
+        Args:
+            workers: Number of conversion threads (and pooled connections per host)
+            queue_size: Maximum number of conversions waiting for a worker
+            request_timeout: Seconds a caller waits for a conversion
+            content_selectors: Default CSS selectors to try for finding main content
+            conversion_options: Options for HTML to Markdown conversion
+            extraction_options: Extra keyword arguments for extract_main_element()
+            download_options: Extra keyword arguments for download_webpage()
+            cache: algo4cache.ResponseCache for conditional requests (optional)
+
+        Raises:
+            MissingDependencyError: If a required package is not installed
+        """
+        import_dependencies()
+        self.workers = workers
+        self.queue_size = queue_size
+        self.request_timeout = request_timeout
+        self.content_selectors = content_selectors
+        self.conversion_options = conversion_options
+        self.extraction_options = extraction_options
+        self.download_options = download_options
+        self.cache = cache
+        self.session = create_session(pool_connections=workers, pool_maxsize=workers)
+        self.counters = {"requests": 0, "completed": 0, "failed": 0, "coalesced": 0, "shed": 0}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="web2md-serve")
+        self._in_flight = {}
+        self._pending = 0
+        self._average_seconds = None
+        self._lock = threading.Lock()
+        self._warm_up()
+
+    def _warm_up(self) -> None:
+        """Start every worker thread now rather than on the first requests."""
+        barrier = threading.Barrier(self.workers + 1)
+        for _ in range(self.workers):
+            self._executor.submit(barrier.wait)
+        barrier.wait()
+
+    def submit(self, url: str, content_selectors: list = None) -> Tuple[Future, bool]:
+        """
+        Queue a conversion, or join an identical one already in flight.
+
+        Args:
+            url: URL of the webpage to convert
+            content_selectors: CSS selectors for this request (default: the
+                service's selectors)
+
+        Returns:
+            Tuple of (future of the convert_webpage() result, whether the
+            request was coalesced with one already in flight)
+
+        Raises:
+            ServiceOverloadedError: If the queue is full
+        """
+        selectors = content_selectors if content_selectors else self.content_selectors
+        key = (normalize_url(url), tuple(selectors or ()))
+        with self._lock:
+            self.counters["requests"] += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.counters["coalesced"] += 1
+                return future, True
+            if self._pending >= self.workers + self.queue_size:
+                self.counters["shed"] += 1
+                raise ServiceOverloadedError(
+                    f"Conversion queue is full ({self._pending} pending)", self._retry_after())
+            self._pending += 1
+            future = self._executor.submit(self._convert, key, url, selectors)
+            self._in_flight[key] = future
+        return future, False
+
+    def convert(self, url: str, content_selectors: list = None) -> Tuple[Dict, bool]:
+        """
+        Convert a webpage, waiting at most request_timeout seconds.
+
+        Returns:
+            Tuple of (convert_webpage() result, whether it was coalesced)
+
+        Raises:
+            ServiceOverloadedError: If the queue is full
+            ConversionTimeoutError: If the conversion takes longer than request_timeout
+            NetworkError: If download fails
+            ContentExtractionError: If content extraction fails
+        """
+        future, coalesced = self.submit(url, content_selectors)
+        try:
+            return future.result(timeout=self.request_timeout), coalesced
+        except FutureTimeoutError:
+            raise ConversionTimeoutError(f"Conversion timed out after {self.request_timeout}s") from None
+
+    def _convert(self, key: tuple, url: str, content_selectors: list) -> Dict:
+        start = time.perf_counter()
+        outcome = "failed"
+        try:
+            result = convert_webpage(url,
+                                     content_selectors=content_selectors,
+                                     conversion_options=self.conversion_options,
+                                     session=self.session,
+                                     cache=self.cache,
+                                     download_options=self.download_options,
+                                     extraction_options=self.extraction_options)
+            outcome = "completed"
+            return result
+        finally:
+            # Release the slot before the result reaches the waiting callers,
+            # so a caller that immediately sends its next request is not shed
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._pending -= 1
+                del self._in_flight[key]
+                self.counters[outcome] += 1
+                self._average_seconds = elapsed if self._average_seconds is None else \
+                    0.2 * elapsed + 0.8 * self._average_seconds
+
+    def _retry_after(self) -> int:
+        """Estimate the seconds until the queue has drained (lock held)."""
+        average = self._average_seconds if self._average_seconds is not None else 1.0
+        return max(1, math.ceil(self._pending / self.workers * average))
+
+    def stats(self) -> Dict:
+        """Return the pool size, queue depth and request counters."""
+        with self._lock:
+            return dict(self.counters, workers=self.workers, queue_size=self.queue_size,
+                        pending=self._pending, in_flight=len(self._in_flight))
+
+    def close(self) -> None:
+        """Wait for running conversions and stop the workers."""
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self) -> "ConversionService":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler for the conversion API; the server has a .service attribute."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        if self.connection.family in (socket.AF_INET, socket.AF_INET6):
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == "/health":
+            self._send_json(200, dict(self.server.service.stats(), status="ok"))
+        elif parsed.path == "/convert":
+            params = parse_qs(parsed.query)
+            self._convert((params.get("url") or [None])[-1], params.get("selector"),
+                          (params.get("format") or ["json"])[-1])
+        else:
+            self._send_json(404, {"error": f"No such endpoint: {parsed.path}"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/convert":
+            self._send_json(404, {"error": f"No such endpoint: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if not 0 < length <= MAX_REQUEST_BYTES:
+            self._send_json(400, {"error": "Expected a JSON body of up to "
+                                           f"{MAX_REQUEST_BYTES} bytes"})
+            return
+        try:
+            request = json.loads(self.rfile.read(length))
+            if not isinstance(request, dict):
+                raise ValueError("not an object")
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid JSON body: {str(e)}"})
+            return
+        self._convert(request.get("url"), request.get("content_selectors"),
+                      request.get("format", "json"))
+
+    def _convert(self, url: str, content_selectors: List[str], output_format: str) -> None:
+        if not url or urlparse(url).scheme not in ("http", "https"):
+            self._send_json(400, {"error": "Expected an http(s) URL in 'url'"})
+            return
+        if output_format not in ("json", "markdown"):
+            self._send_json(400, {"error": "'format' must be 'json' or 'markdown'"})
+            return
+        try:
+            content_selectors = check_selectors(content_selectors)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        start = time.perf_counter()
+        try:
+            result, coalesced = self.server.service.convert(url, content_selectors)
+        except ServiceOverloadedError as e:
+            self._send_json(503, {"error": str(e)},
+                            {"Retry-After": str(e.retry_after)})
+            return
+        except ConversionTimeoutError as e:
+            self._send_json(504, {"error": str(e)})
+            return
+        except NetworkError as e:
+            self._send_json(502, {"error": str(e)})
+            return
+        except (ContentExtractionError, FileOperationError) as e:
+            self._send_json(422, {"error": str(e)})
+            return
+        except Exception as e:
+            # Answer rather than leave the client waiting on a dead handler
+            print(f"Error: conversion of {url} failed: {e!r}", file=sys.stderr)
+            self._send_json(500, {"error": f"Internal error: {type(e).__name__}"})
+            return
+
+        if output_format == "markdown":
+            self._send(200, result["markdown"].encode("utf-8"), "text/markdown; charset=utf-8")
+            return
+        response_info = result["response_info"]
+        self._send_json(200, {
+            "url": url,
+            "final_url": response_info.get("url", url),
+            "status_code": response_info.get("status_code"),
+            "encoding": response_info.get("encoding"),
+            "markdown": result["markdown"],
+            "coalesced": coalesced,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+        })
+
+    def _send_json(self, status: int, payload: Dict, headers: Dict = None) -> None:
+        self._send(status, json.dumps(payload).encode("utf-8"),
+                   "application/json; charset=utf-8", headers)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Dict = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP server on a Unix domain socket."""
+
+    daemon_threads = True
+
+def create_server(service: ConversionService,
+                  host: str = "127.0.0.1",
+                  port: int = 8080,
+                  unix_socket: str = None,
+                  verbose: bool = False) -> socketserver.BaseServer:
+    """
+    Create the HTTP server for a conversion service.
+
+    Args:
+        service: Conversion service to expose
+        host: Address to listen on
+        port: Port to listen on (0 picks a free port)
+        unix_socket: Listen on this Unix socket path instead of host and port
+        verbose: Whether to log each request to stderr
+
+    Returns:
+        Server ready for serve_forever()
+    """
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        server = ThreadingUnixHTTPServer(unix_socket, ConversionRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ConversionRequestHandler)
+        server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+def main(argv: List[str] = None):
+    """Command line interface for the conversion server."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="algo4download.py serve",
+        description="Serve webpage to Markdown conversion over a local HTTP API",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s --port 8080 --workers 16
+  %(prog)s --unix-socket /tmp/web2md.sock --queue-size 200
+  curl 'http://127.0.0.1:8080/convert?url=https://example.com&format=markdown'
+        """
+    )
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080,
+                        help="Port to listen on (default: 8080)")
+    parser.add_argument("--unix-socket", help="Listen on this Unix socket instead of a port")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Number of conversion workers (default: 8)")
+    parser.add_argument("--queue-size", type=int, default=64,
+                        help="Conversions that may wait for a worker before requests "
+                             "are shed with 503 (default: 64)")
+    parser.add_argument("--request-timeout", type=float, default=120.0,
+                        help="Seconds a request waits for its conversion (default: 120)")
+    parser.add_argument("--content-selectors", nargs="+",
+                        help="Default CSS selectors to try for finding main content")
+    parser.add_argument("--parser", choices=["html.parser", "lxml", "auto"], default=DEFAULT_PARSER,
+                        help="HTML parser backend (default: html.parser)")
+    parser.add_argument("--converter", choices=["html2text", "dom"], default="html2text",
+                        help="Markdown conversion engine (default: html2text)")
+    parser.add_argument("--cache-dir",
+                        help="Directory for the HTTP response cache (enables conditional requests)")
+    parser.add_argument("--rate-limit", type=float, metavar="RPS",
+                        help="Start each origin host at this many requests per second and adapt")
+    parser.add_argument("--quiet", action="store_true", help="Do not log requests")
+    args = parser.parse_args(argv)
+
+    cache = None
+    if args.cache_dir:
+        from algo4cache import ResponseCache
+        cache = ResponseCache(args.cache_dir)
+    download_options = None
+    if args.rate_limit:
+        from algo4ratelimit import RateLimiter
+        download_options = {"rate_limiter": RateLimiter(initial_rate=args.rate_limit)}
+
+    try:
+        service = ConversionService(
+            workers=args.workers,
+            queue_size=args.queue_size,
+            request_timeout=args.request_timeout,
+            content_selectors=args.content_selectors,
+            conversion_options={"converter": "dom"} if args.converter == "dom" else None,
+            extraction_options={"parser": args.parser},
+            download_options=download_options,
+            cache=cache
+        )
+        server = create_server(service, args.host, args.port, args.unix_socket,
+                               verbose=not args.quiet)
+    except (MissingDependencyError, OSError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    address = args.unix_socket or f"http://{args.host}:{server.server_address[1]}"
+    print(f"Serving conversions on {address} with {args.workers} workers", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.unlink(args.unix_socket)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Bulk Output Sinks
+
+Writing one Markdown file per page means millions of small files for a
+large corpus. A sink collects the pages of a batch in one place instead:
+
+- SQLiteSink: one SQLite database, with a row per page (URL, title, fetch
+  metadata, Markdown) written in batched transactions, and optionally an
+  FTS5 full-text index over the title and Markdown
+- JsonlSink: gzip-compressed JSON Lines files, one object per page, with
+  buffered writes and rotation to a new file by size
+
+Sinks take page records built by page_record() through write(), and offer
+flush() and close() and the attributes "path" and "count" (pages written).
+They are thread-safe, so the workers of a batch can share one. open_sink()
+picks the sink from a path.
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import threading
+from html import unescape
+from typing import Dict, Optional
+
+from algo4download import FileOperationError
+
+# Pages written per SQLite transaction
+DEFAULT_BATCH_SIZE = 500
+
+# Uncompressed bytes buffered before a JSON Lines write
+DEFAULT_BUFFER_BYTES = 1024 * 1024
+
+# Compressed size at which a JSON Lines file is rotated
+DEFAULT_ROTATE_BYTES = 256 * 1024 * 1024
+
+# The title is looked for in this many leading characters of the HTML
+TITLE_SCAN_CHARS = 64 * 1024
+
+TITLE_TAG = re.compile(r"<title[^>]*>(.*?)</title\s*>", re.I | re.S)
+MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+(.+?)\s*#*\s*$", re.M)
+
+# Fields of a page record, in the order of the SQLite columns
+RECORD_FIELDS = ("url", "final_url", "title", "status_code", "content_type",
+                 "encoding", "etag", "last_modified", "fetched_at", "markdown")
+
+class SinkError(FileOperationError):
+    """Exception raised when an output sink cannot be opened or written."""
+    pass
+
+def page_title(html_content: str = None, markdown_content: str = None) -> Optional[str]:
+    """
+    Find a page's title: its <title>, else the first Markdown heading.
+
+    Args:
+        html_content: Full HTML of the page (optional)
+        markdown_content: Markdown of the page (optional)
+
+    Returns:
+        Title with collapsed whitespace, or None
+    """
+    if html_content:
+        match = TITLE_TAG.search(html_content[:TITLE_SCAN_CHARS])
+        if match:
+            title = " ".join(unescape(match.group(1)).split())
+            if title:
+                return title
+    if markdown_content:
+        match = MARKDOWN_HEADING.search(markdown_content)
+        if match:
+            return match.group(1)
+    return None
+
+def page_record(url: str,
+                markdown_content: str,
+                html_content: str = None,
+                response_info: Dict = None,
+                fetched_at: str = None,
+                title: str = None) -> Dict:
+    """
+    Build the record a sink stores for one page.
+
+    Args:
+        url: URL of the page as requested
+        markdown_content: Markdown of the page
+        html_content: Full HTML, used for the title (optional)
+        response_info: Response information from download_webpage() (optional)
+        fetched_at: ISO 8601 time of the fetch (default: now)
+        title: Title of the page (default: found with page_title())
+
+    Returns:
+        Dictionary with the keys in RECORD_FIELDS
+    """
+    response_info = response_info or {}
+    headers = {name.lower(): value for name, value in (response_info.get("headers") or {}).items()}
+    return {
+        "url": url,
+        "final_url": response_info.get("url") or url,
+        "title": title or page_title(html_content, markdown_content),
+        "status_code": response_info.get("status_code"),
+        "content_type": headers.get("content-type"),
+        "encoding": response_info.get("encoding"),
+        "etag": headers.get("etag"),
+        "last_modified": headers.get("last-modified"),
+        "fetched_at": fetched_at or time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "markdown": markdown_content,
+    }
+
+class SQLiteSink:
+    """
+    Output sink storing pages as rows of an SQLite database.
+
+    Rows go into the table "pages", keyed by URL; writing a URL again
+    replaces its row. Writes are buffered and committed every batch_size
+    pages, and on flush() and close(). With fts, the table "pages_fts" is
+    an FTS5 index over the title and Markdown, kept in sync by triggers:
+
+        SELECT url FROM pages_fts WHERE pages_fts MATCH 'query' ORDER BY rank
+    """
+
+    def __init__(self, file_path: str, batch_size: int = DEFAULT_BATCH_SIZE, fts: bool = False):
+        """
+        Args:
+            file_path: Path of the database (created if missing)
+            batch_size: Pages per transaction
+            fts: Whether to maintain a full-text index
+
+        Raises:
+            SinkError: If the database cannot be opened, or FTS5 is not
+                available in this SQLite build
+        """
+        import sqlite3
+
+        self.path = file_path
+        self.batch_size = max(1, batch_size)
+        self.count = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._error = sqlite3.Error
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+            self._connection = sqlite3.connect(file_path, check_same_thread=False)
+            self._connection.executescript("""
+                PRAGMA journal_mode = WAL;
+                PRAGMA synchronous = NORMAL;
+                PRAGMA recursive_triggers = ON;
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    final_url TEXT,
+                    title TEXT,
+                    status_code INTEGER,
+                    content_type TEXT,
+                    encoding TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at TEXT,
+                    markdown TEXT NOT NULL
+                );
+            """)
+            if fts:
+                # Replacing a row deletes it first; the delete trigger only
+                # fires for that with recursive triggers on (set above)
+                self._connection.executescript("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+                        title, markdown, url UNINDEXED, content='pages', content_rowid='rowid');
+                    CREATE TRIGGER IF NOT EXISTS pages_fts_insert AFTER INSERT ON pages BEGIN
+                        INSERT INTO pages_fts(rowid, title, markdown, url)
+                        VALUES (new.rowid, new.title, new.markdown, new.url);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS pages_fts_delete AFTER DELETE ON pages BEGIN
+                        INSERT INTO pages_fts(pages_fts, rowid, title, markdown, url)
+                        VALUES ('delete', old.rowid, old.title, old.markdown, old.url);
+                    END;
+                """)
+        except sqlite3.Error as e:
+            raise SinkError(f"Failed to open SQLite sink {file_path}: {str(e)}") from e
+
+    def write(self, record: Dict) -> None:
+        """
+        Add a page record, see page_record().
+
+        Raises:
+            SinkError: If a batch cannot be committed
+        """
+        with self._lock:
+            self._pending.append(tuple(record.get(field) for field in RECORD_FIELDS))
+            self.count += 1
+            if len(self._pending) >= self.batch_size:
+                self._commit()
+
+    def flush(self) -> None:
+        """Commit the buffered records."""
+        with self._lock:
+            self._commit()
+
+    def _commit(self) -> None:
+        """Write the buffered records in one transaction. Caller holds the lock."""
+        if not self._pending:
+            return
+        placeholders = ", ".join("?" * len(RECORD_FIELDS))
+        try:
+            with self._connection:
+                self._connection.executemany(
+                    f"INSERT OR REPLACE INTO pages ({', '.join(RECORD_FIELDS)}) "
+                    f"VALUES ({placeholders})", self._pending)
+        except self._error as e:
+            raise SinkError(f"Failed to write to SQLite sink: {str(e)}") from e
+        self._pending = []
+
+    def close(self) -> None:
+        """Commit the buffered records and close the database."""
+        with self._lock:
+            try:
+                self._commit()
+            finally:
+                self._connection.close()
+
+    def __enter__(self) -> "SQLiteSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class JsonlSink:
+    """
+    Output sink writing pages as gzip-compressed JSON Lines.
+
+    Files are named '<prefix>-00001.jsonl.gz', '<prefix>-00002.jsonl.gz' and
+    so on in the output directory, numbered on from any already there. A
+    file is written as '<name>.part' and renamed when it is complete, that
+    is once its compressed size reaches rotate_bytes or on close(), so
+    readers never see a partial file.
+    """
+
+    def __init__(self, output_dir: str, prefix: str = "pages",
+                 rotate_bytes: int = DEFAULT_ROTATE_BYTES,
+                 buffer_bytes: int = DEFAULT_BUFFER_BYTES,
+                 compresslevel: int = 6):
+        """
+        Args:
+            output_dir: Directory for the files (created if missing)
+            prefix: File name prefix
+            rotate_bytes: Compressed size at which to start a new file
+            buffer_bytes: Uncompressed bytes to collect before compressing
+            compresslevel: gzip compression level
+
+        Raises:
+            SinkError: If the output directory cannot be created
+        """
+        self.path = output_dir
+        self.prefix = prefix
+        self.rotate_bytes = rotate_bytes
+        self.buffer_bytes = buffer_bytes
+        self.compresslevel = compresslevel
+        self.count = 0
+        self.files = []  # Paths of the completed files
+        self._buffer = []
+        self._buffered = 0
+        self._raw = None
+        self._gzip = None
+        self._lock = threading.Lock()
+
+        pattern = re.compile(re.escape(prefix) + r"-(\d+)\.jsonl\.gz(\.part)?$")
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            numbers = [int(match.group(1)) for match in map(pattern.match, os.listdir(output_dir))
+                       if match]
+        except OSError as e:
+            raise SinkError(f"Failed to open JSON Lines sink {output_dir}: {str(e)}") from e
+        self._number = max(numbers, default=0)
+
+    def write(self, record: Dict) -> None:
+        """
+        Add a page record, see page_record().
+
+        Raises:
+            SinkError: If the file cannot be written
+        """
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            self._buffer.append(line)
+            self._buffered += len(line)
+            self.count += 1
+            if self._buffered >= self.buffer_bytes:
+                self._flush()
+
+    def flush(self) -> None:
+        """Compress and write the buffered records."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Write the buffer, rotating the file if it is full. Caller holds the lock."""
+        if not self._buffer:
+            return
+        try:
+            if self._gzip is None:
+                self._number += 1
+                self._raw = open(self._path() + ".part", "wb")
+                self._gzip = gzip.GzipFile(fileobj=self._raw, mode="wb",
+                                           compresslevel=self.compresslevel)
+            self._gzip.write(b"".join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+            if self._raw.tell() >= self.rotate_bytes:
+                self._finish()
+        except OSError as e:
+            raise SinkError(f"Failed to write to JSON Lines sink: {str(e)}") from e
+
+    def _path(self) -> str:
+        return os.path.join(self.path, f"{self.prefix}-{self._number:05d}.jsonl.gz")
+
+    def _finish(self) -> None:
+        """Complete the current file and move it into place. Caller holds the lock."""
+        self._gzip.close()
+        self._raw.close()
+        os.replace(self._path() + ".part", self._path())
+        self.files.append(self._path())
+        self._gzip = self._raw = None
+
+    def close(self) -> None:
+        """Write the buffered records and complete the current file."""
+        with self._lock:
+            self._flush()
+            if self._gzip is not None:
+                try:
+                    self._finish()
+                except OSError as e:
+                    raise SinkError(f"Failed to write to JSON Lines sink: {str(e)}") from e
+
+    def __enter__(self) -> "JsonlSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def open_sink(path: str, fts: bool = False, rotate_bytes: int = DEFAULT_ROTATE_BYTES):
+    """
+    Open the sink that fits a path.
+
+    Args:
+        path: '*.db', '*.sqlite' or '*.sqlite3' for an SQLiteSink; anything
+            else is a directory for a JsonlSink
+        fts: Maintain a full-text index (SQLite only)
+        rotate_bytes: File size at which to rotate (JSON Lines only)
+
+    Returns:
+        SQLiteSink or JsonlSink
+
+    Raises:
+        SinkError: If the sink cannot be opened
+    """
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return SQLiteSink(path, fts=fts)
+    if fts:
+        raise SinkError("A full-text index needs an SQLite sink (*.db, *.sqlite, *.sqlite3)")
+    return JsonlSink(path, rotate_bytes=rotate_bytes)
@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+"""
+Offline Input Sources
+
+This module converts archived pages without touching the network. It
+reads WARC files (plain or gzip-compressed, one gzip member per record or
+not), directories of saved HTML and file:// URLs, and feeds the raw bytes
+of each page to the existing decode/extract/convert stages of
+algo4download.py in a process pool.
+
+Everything is streamed: a WARC archive is read record by record through
+the gzip decompressor, a directory is walked lazily, and the number of
+pages between being read and being written is capped, so memory stays flat
+however large the input is. Results are written in input order.
+"""
+
+import os
+import sys
+import gzip
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from algo4download import (
+    DEFAULT_MAX_BYTES,
+    DEFAULT_PARSER,
+    HTML_CONTENT_TYPES,
+    decode_body,
+    convert_html,
+    save_file,
+    unique_file_name,
+    ContentExtractionError,
+    FileOperationError,
+)
+from algo4sinks import open_sink, page_record, page_title
+
+# File name extensions read from HTML directories
+HTML_EXTENSIONS = (".html", ".htm", ".xhtml")
+
+# WARC record types that can hold a page
+WARC_PAGE_TYPES = ("response", "resource")
+
+# Size of the blocks read when skipping an oversize record
+SKIP_CHUNK_SIZE = 1024 * 1024
+
+# Bytes kept from an oversize record, enough for its HTTP headers
+HEAD_BYTES = 16 * 1024
+
+class SourceError(Exception):
+    """Exception raised when an input source cannot be read."""
+    pass
+
+def open_archive(file_path: str):
+    """Open a WARC file for binary reading, decompressing it if it is gzip."""
+    try:
+        with open(file_path, "rb") as f:
+            magic = f.read(2)
+        if magic == b"\x1f\x8b":
+            # GzipFile reads member after member, so both per-record and
+            # whole-file compression stream the same way
+            return gzip.open(file_path, "rb")
+        return open(file_path, "rb")
+    except OSError as e:
+        raise SourceError(f"Failed to open archive: {str(e)}") from e
+
+def iter_warc_records(stream, max_bytes: int = DEFAULT_MAX_BYTES,
+                      record_types: Tuple[str, ...] = WARC_PAGE_TYPES) -> Iterator[Tuple[Dict, bytes, bool]]:
+    """
+    Read WARC records one at a time.
+
+    Args:
+        stream: Binary file object positioned at the start of a record
+        max_bytes: Records with a larger block are skipped without being
+            held in memory; only their first HEAD_BYTES are returned
+        record_types: Read the block of these WARC-Type values only; other
+            records are skipped and not yielded
+
+    Yields:
+        Tuple of (headers with lower-cased names, block bytes, whether the
+        block is complete)
+
+    Raises:
+        SourceError: If the archive is malformed or truncated
+    """
+    while True:
+        line = stream.readline()
+        if not line:
+            return
+        if not line.strip():
+            continue  # Separator between records
+        if not line.startswith(b"WARC/"):
+            raise SourceError(f"Expected a WARC record, found: {line[:40]!r}")
+
+        headers = {}
+        while True:
+            line = stream.readline()
+            if not line:
+                raise SourceError("Truncated WARC record header")
+            if not line.strip():
+                break
+            name, _, value = line.decode("utf-8", errors="replace").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", ""))
+        except ValueError:
+            raise SourceError("WARC record without a valid Content-Length") from None
+
+        wanted = headers.get("warc-type", "").lower() in record_types
+        if not wanted or length > max_bytes:
+            head = stream.read(min(HEAD_BYTES, length)) if wanted else b""
+            remaining = length - len(head)
+            while remaining > 0:
+                chunk = stream.read(min(SKIP_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise SourceError("Truncated WARC record")
+                remaining -= len(chunk)
+            if wanted:
+                yield headers, head, False
+            continue
+
+        block = stream.read(length)
+        if len(block) < length:
+            raise SourceError("Truncated WARC record")
+        yield headers, block, True
+
+def parse_http_head(block: bytes) -> Tuple[int, Dict[str, str], bytes]:
+    """
+    Split an archived HTTP response into status, headers and raw body.
+
+    Args:
+        block: Block (or the start of the block) of a WARC response record
+
+    Returns:
+        Tuple of (status code, headers with lower-cased names, body as stored)
+
+    Raises:
+        SourceError: If the status line is invalid
+    """
+    head, separator, body = block.partition(b"\r\n\r\n")
+    if not separator:
+        head, separator, body = block.partition(b"\n\n")
+    lines = head.decode("iso-8859-1").splitlines()
+    try:
+        status_code = int(lines[0].split()[1])
+    except (IndexError, ValueError):
+        raise SourceError(f"Invalid HTTP status line: {lines[0][:40] if lines else ''!r}") from None
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status_code, headers, body
+
+def parse_http_response(block: bytes) -> Tuple[int, Dict[str, str], bytes]:
+    """
+    Split an archived HTTP response into status, headers and decoded body.
+
+    Chunked transfer coding and gzip/deflate content coding are undone.
+
+    Args:
+        block: Block of a WARC response record
+
+    Returns:
+        Tuple of (status code, headers with lower-cased names, body)
+
+    Raises:
+        SourceError: If the response cannot be parsed
+    """
+    status_code, headers, body = parse_http_head(block)
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        body = dechunk(body)
+    encoding = headers.get("content-encoding", "").strip().lower()
+    if encoding in ("gzip", "x-gzip") and not body.startswith(b"\x1f\x8b"):
+        pass  # Some archivers store the decoded body but keep the header
+    elif encoding in ("gzip", "x-gzip", "deflate"):
+        try:
+            # wbits 47 accepts gzip and zlib headers; raw deflate needs -15
+            wbits = 47 if encoding != "deflate" or body[:1] == b"\x78" else -15
+            body = zlib.decompress(body, wbits)
+        except zlib.error as e:
+            raise SourceError(f"Failed to decompress archived body: {str(e)}") from e
+    elif encoding not in ("", "identity"):
+        raise SourceError(f"Unsupported Content-Encoding: {encoding}")
+    return status_code, headers, body
+
+def dechunk(body: bytes) -> bytes:
+    """
+    Undo HTTP chunked transfer coding.
+
+    A body that does not start with a chunk size was stored already
+    decoded and is returned as is; a truncated body keeps what was read.
+    """
+    pieces = []
+    position = 0
+    while position < len(body):
+        line_end = body.find(b"\n", position)
+        if line_end < 0:
+            break
+        try:
+            size = int(body[position:line_end].split(b";")[0].strip(), 16)
+        except ValueError:
+            if position == 0:
+                return body
+            break
+        if size == 0:
+            break
+        pieces.append(body[line_end + 1:line_end + 1 + size])
+        position = line_end + 1 + size + 2  # Skip the chunk's trailing CRLF
+    return b"".join(pieces)
+
+def is_html(content_type: str) -> bool:
+    """Check whether a Content-Type is one of HTML_CONTENT_TYPES."""
+    return content_type.split(";")[0].strip().lower() in HTML_CONTENT_TYPES
+
+def iter_warc(file_path: str, max_bytes: int = DEFAULT_MAX_BYTES) -> Iterator[Dict]:
+    """
+    Read the HTML pages archived in a WARC file.
+
+    Response records with a 2xx HTML response and resource records with an
+    HTML Content-Type are pages; everything else (requests, metadata,
+    revisits, redirects, images) is skipped.
+
+    Args:
+        file_path: Path of the .warc or .warc.gz file
+        max_bytes: Maximum size of a record's block
+
+    Yields:
+        Page dictionaries with the keys "url", "body" (raw bytes, None
+        with an "error" for pages that cannot be read), "content_type",
+        "status_code" (None for resource records), "headers" (of the
+        archived response) and "date" (ISO 8601 time of the capture)
+
+    Raises:
+        SourceError: If the archive cannot be opened or is malformed
+    """
+    with open_archive(file_path) as stream:
+        try:
+            for headers, block, complete in iter_warc_records(stream, max_bytes):
+                page = {"url": headers.get("warc-target-uri", "").strip("<>"), "body": None,
+                        "content_type": "", "status_code": None, "headers": {},
+                        "date": headers.get("warc-date")}
+                if headers["warc-type"].lower() == "resource":
+                    page["content_type"] = headers.get("content-type", "")
+                    page["headers"] = {"content-type": page["content_type"]}
+                    body = block
+                else:
+                    if "msgtype=request" in headers.get("content-type", ""):
+                        continue
+                    try:
+                        status_code, http_headers, _ = parse_http_head(block)
+                        page["content_type"] = http_headers.get("content-type", "")
+                        if not 200 <= status_code < 300 or not is_html(page["content_type"]):
+                            continue
+                        page["status_code"] = status_code
+                        page["headers"] = http_headers
+                        if complete:
+                            _, _, body = parse_http_response(block)
+                    except SourceError as e:
+                        yield dict(page, error=str(e))
+                        continue
+                if not is_html(page["content_type"]):
+                    continue
+                if complete:
+                    page["body"] = body
+                else:
+                    page["error"] = f"Record larger than {max_bytes} bytes"
+                yield page
+        except (OSError, EOFError, zlib.error) as e:
+            raise SourceError(f"Failed to read archive {file_path}: {str(e)}") from e
+
+def iter_directory(root: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                   extensions: Tuple[str, ...] = HTML_EXTENSIONS) -> Iterator[Dict]:
+    """
+    Read the HTML files in a directory tree, in sorted order.
+
+    Args:
+        root: Directory to walk
+        max_bytes: Files larger than this are reported as failed
+        extensions: File name extensions to read
+
+    Yields:
+        Page dictionaries, see iter_warc(); "url" is the file:// URL and
+        "date" the modification time
+    """
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if name.lower().endswith(extensions):
+                yield read_file_page(os.path.join(directory, name), max_bytes)
+
+def read_file_page(file_path: str, max_bytes: int = DEFAULT_MAX_BYTES) -> Dict:
+    """Read one HTML file as a page dictionary, see iter_warc()."""
+    page = {"url": Path(file_path).resolve().as_uri(), "body": None,
+            "content_type": "", "status_code": None, "headers": {}, "date": None}
+    try:
+        stat = os.stat(file_path)
+        page["date"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(stat.st_mtime))
+        if stat.st_size > max_bytes:
+            page["error"] = f"File larger than {max_bytes} bytes"
+            return page
+        with open(file_path, "rb") as f:
+            page["body"] = f.read()
+    except OSError as e:
+        page["error"] = f"Failed to read file: {str(e)}"
+    return page
+
+def iter_source(source: str, max_bytes: int = DEFAULT_MAX_BYTES) -> Iterator[Dict]:
+    """
+    Read the pages of an input source.
+
+    Args:
+        source: Path of a WARC file (.warc, .warc.gz), an HTML file or a
+            directory, or a file:// URL of one of these
+        max_bytes: Maximum size of one page
+
+    Yields:
+        Page dictionaries, see iter_warc()
+
+    Raises:
+        SourceError: If the source does not exist or cannot be read
+    """
+    path = source
+    if source.startswith("file:"):
+        path = url2pathname(urlparse(source).path)
+    if os.path.isdir(path):
+        yield from iter_directory(path, max_bytes)
+    elif path.endswith((".warc", ".warc.gz")):
+        yield from iter_warc(path, max_bytes)
+    elif os.path.isfile(path):
+        yield read_file_page(path, max_bytes)
+    else:
+        raise SourceError(f"No such file or directory: {source}")
+
+def _convert_page(body: bytes,
+                  content_type: str,
+                  content_selectors: list,
+                  conversion_options: dict,
+                  extraction_options: dict,
+                  with_title: bool) -> Tuple[str, str, str]:
+    """Process-pool entry point: decode, extract and convert one page."""
+    html_content, encoding, _ = decode_body(body, content_type)
+    markdown_content = convert_html(html_content, content_selectors, conversion_options,
+                                    extraction_options)
+    title = page_title(html_content, markdown_content) if with_title else None
+    return markdown_content, title, encoding
+
+def convert_pages(pages: Iterator[Dict],
+                  output_dir: str = ".",
+                  cpu_workers: int = None,
+                  max_in_flight: int = None,
+                  content_selectors: list = None,
+                  conversion_options: dict = None,
+                  extraction_options: dict = None,
+                  overwrite: bool = False,
+                  verbose: bool = True,
+                  sink: "SQLiteSink" = None) -> Dict:
+    """
+    Convert pages from an input source to Markdown files in parallel.
+
+    Args:
+        pages: Page dictionaries, e.g. from iter_source(); a dictionary with
+            "source_error" reports an input source that broke off
+        output_dir: Directory to save the Markdown files in
+        cpu_workers: Number of conversion processes (default: CPU count)
+        max_in_flight: Maximum number of pages read but not yet written
+            (default: 4 * cpu_workers)
+        content_selectors: List of CSS selectors to try for finding main content
+        conversion_options: Options for HTML to Markdown conversion
+        extraction_options: Extra keyword arguments for extract_main_element()
+        overwrite: Whether to overwrite existing files
+        verbose: Whether to print progress information
+        sink: Output sink from algo4sinks.py to write the pages to instead
+            of one Markdown file each (optional)
+
+    Returns:
+        Summary dictionary with the counts "pages", "converted" and
+        "failed", "errors", a list of (url, error) for failed pages, and
+        "failed_sources", a list of (source, error)
+
+    Raises:
+        SourceError: If pages raises it; the pages read before are still
+            written
+    """
+    cpu_workers = max(1, cpu_workers or os.cpu_count() or 1)
+    max_in_flight = max_in_flight or 4 * cpu_workers
+    summary = {"pages": 0, "converted": 0, "failed": 0, "errors": [], "failed_sources": []}
+    used_names = set()
+
+    def fail(url: str, error: str) -> None:
+        summary["failed"] += 1
+        summary["errors"].append((url, error))
+        if verbose:
+            print(f"[failed] {url}: {error}")
+
+    def write(page: Dict, future) -> None:
+        url = page["url"]
+        try:
+            markdown_content, title, encoding = future.result()
+        except ContentExtractionError as e:
+            fail(url, str(e))
+            return
+        except Exception as e:
+            fail(url, f"Unexpected error: {str(e)}")
+            return
+        try:
+            if sink is not None:
+                target = sink.path
+                response_info = {"status_code": page["status_code"], "headers": page["headers"],
+                                 "encoding": encoding}
+                sink.write(page_record(url, markdown_content, response_info=response_info,
+                                       fetched_at=page["date"], title=title))
+            else:
+                target = os.path.join(output_dir, unique_file_name(url, used_names) + ".md")
+                save_file(markdown_content, target, overwrite)
+        except FileOperationError as e:
+            fail(url, str(e))
+            return
+        summary["converted"] += 1
+        if verbose:
+            print(f"[ok] {url} -> {target}")
+
+    # Futures in input order; the oldest is written before more pages are read
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=cpu_workers) as cpu_pool:
+        try:
+            for page in pages:
+                if page.get("source_error"):
+                    summary["failed_sources"].append((page["url"], page["error"]))
+                    if verbose:
+                        print(f"[failed] {page['url']}: {page['error']}")
+                    continue
+                summary["pages"] += 1
+                if page.get("error"):
+                    fail(page["url"], page["error"])
+                    continue
+                future = cpu_pool.submit(_convert_page, page.pop("body"), page["content_type"],
+                                         content_selectors, conversion_options,
+                                         extraction_options, sink is not None)
+                in_flight.append((page, future))
+                if len(in_flight) >= max_in_flight:
+                    write(*in_flight.popleft())
+        finally:
+            # Write the pages read before an error too
+            while in_flight:
+                write(*in_flight.popleft())
+    return summary
+
+def convert_sources(sources: List[str], max_bytes: int = DEFAULT_MAX_BYTES, **kwargs) -> Dict:
+    """
+    Convert the pages of several input sources, see convert_pages().
+
+    A source that cannot be read, or breaks off (e.g. a truncated archive),
+    is listed in the summary's "failed_sources"; the pages read from it
+    before the error are kept, and the next source is read.
+
+    Args:
+        sources: WARC files, HTML files, directories or file:// URLs
+        max_bytes: Maximum size of one page
+        **kwargs: Keyword arguments for convert_pages()
+
+    Returns:
+        Summary dictionary, see convert_pages()
+    """
+    def pages() -> Iterator[Dict]:
+        for source in sources:
+            try:
+                yield from iter_source(source, max_bytes)
+            except SourceError as e:
+                yield {"url": source, "error": str(e), "source_error": True}
+    return convert_pages(pages(), **kwargs)
+
+def main(argv: List[str] = None):
+    """Command line interface for offline conversion."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="algo4download.py offline",
+        description="Convert archived webpages (WARC files, HTML directories) to Markdown",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s crawl.warc.gz --output-dir pages
+  %(prog)s dump/ file:///srv/mirror/index.html --cpu-workers 16
+  %(prog)s crawl.warc.gz --sink pages.db --sink-fts
+        """
+    )
+    parser.add_argument("sources", nargs="+",
+                        help="WARC files (.warc, .warc.gz), HTML files, directories or file:// URLs")
+    parser.add_argument("--output-dir", default=".",
+                        help="Directory for the Markdown files (default: current directory)")
+    parser.add_argument("--cpu-workers", type=int,
+                        help="Number of conversion processes (default: CPU count)")
+    parser.add_argument("--max-in-flight", type=int,
+                        help="Maximum pages read but not yet written (default: 4 per process)")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                        help="Skip pages larger than this many MB (default: 20)")
+    parser.add_argument("--content-selectors", nargs="+",
+                        help="CSS selectors to try for finding main content")
+    parser.add_argument("--parser", choices=["html.parser", "lxml", "auto"], default=DEFAULT_PARSER,
+                        help="HTML parser backend (default: html.parser)")
+    parser.add_argument("--converter", choices=["html2text", "dom"], default="html2text",
+                        help="Markdown conversion engine (default: html2text)")
+    parser.add_argument("--sink", metavar="PATH",
+                        help="Write the pages to an SQLite database (*.db, *.sqlite) or to "
+                             "gzip-compressed JSON Lines files in a directory instead of "
+                             "one Markdown file each")
+    parser.add_argument("--sink-fts", action="store_true",
+                        help="With an SQLite --sink, also build a full-text index")
+    parser.add_argument("--sink-rotate-mb", type=int, default=256,
+                        help="With a JSON Lines --sink, start a new file at this size in MB "
+                             "(default: 256)")
+    parser.add_argument("--overwrite", action="store_true", help="Overwrite existing files")
+    parser.add_argument("--quiet", action="store_true", help="Suppress progress information")
+    args = parser.parse_args(argv)
+
+    sink = None
+    try:
+        if args.sink:
+            sink = open_sink(args.sink, fts=args.sink_fts,
+                             rotate_bytes=args.sink_rotate_mb * 1024 * 1024)
+    except FileOperationError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        summary = convert_sources(
+            args.sources,
+            max_bytes=int(args.max_mb * 1024 * 1024),
+            output_dir=args.output_dir,
+            cpu_workers=args.cpu_workers,
+            max_in_flight=args.max_in_flight,
+            content_selectors=args.content_selectors,
+            conversion_options={"converter": "dom"} if args.converter == "dom" else None,
+            extraction_options={"parser": args.parser},
+            overwrite=args.overwrite,
+            verbose=not args.quiet,
+            sink=sink
+        )
+    finally:
+        if sink is not None:
+            try:
+                sink.close()
+            except FileOperationError as e:
+                print(f"Error: {str(e)}", file=sys.stderr)
+                sys.exit(1)
+
+    if not args.quiet:
+        if sink is not None:
+            print(f"Wrote {sink.count} pages to {sink.path}")
+        print(f"Converted {summary['converted']} of {summary['pages']} pages")
+        if summary["failed_sources"]:
+            print(f"Failed to read {len(summary['failed_sources'])} of "
+                  f"{len(args.sources)} sources")
+    if summary["failed"] or summary["failed_sources"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Append-Only Output Store
+
+This module keeps the combined output file (output01.md and onward) as an
+append-only store with a sidecar index. Every appended page adds one line
+to '<output file>.idx' recording its URL, byte offset, length and SHA-256
+hash, so a single page can be listed, extracted (via seek or mmap) or
+replaced without reading the whole output file. Replacing a page appends
+the new version and supersedes the old entry; compact() rewrites the file
+with only the current entries, in a way that survives a crash at any point.
+"""
+
+import os
+import sys
+import json
+import mmap
+import hashlib
+import argparse
+import threading
+from typing import Dict, List
+
+# Separator written between pages in the output file
+PAGE_SEPARATOR = b"\n\n"
+
+# Size of the blocks copied during compaction
+COPY_CHUNK_SIZE = 1024 * 1024
+
+class StoreError(Exception):
+    """Exception raised when the output store cannot be read or written."""
+    pass
+
+def index_path_for(file_path: str) -> str:
+    """Return the path of the sidecar index for an output file."""
+    return file_path + ".idx"
+
+class OutputStore:
+    """
+    Append-only output file with a sidecar index of its pages.
+
+    Index entries are JSON lines with the keys "url", "offset", "length"
+    and "hash"; offsets and lengths are in bytes of the UTF-8 output. When
+    a URL is appended more than once, the last entry is the current one.
+    """
+
+    def __init__(self, file_path: str, index_path: str = None):
+        """
+        Args:
+            file_path: Path of the output file (created on first append if missing)
+            index_path: Path of the index (default: '<file_path>.idx')
+
+        Raises:
+            StoreError: If the index cannot be read
+        """
+        self.file_path = file_path
+        self.index_path = index_path or index_path_for(file_path)
+        self.entries = []   # Every index entry, in append order
+        self.current = {}   # URL -> position of its current entry in self.entries
+        self._lock = threading.Lock()
+        self._recover()
+        self._load_index()
+
+    def _recover(self) -> None:
+        """
+        Finish a compaction that was interrupted after it committed.
+
+        compact() renames the complete new index to '<index>.pending' before
+        it moves either file into place. If that file exists, the new output
+        file is complete too, so both renames are redone.
+
+        Raises:
+            StoreError: If the files cannot be moved into place
+        """
+        pending_index = self.index_path + ".pending"
+        if not os.path.exists(pending_index):
+            return
+        try:
+            if os.path.exists(self.file_path + ".tmp"):
+                os.replace(self.file_path + ".tmp", self.file_path)
+            os.replace(pending_index, self.index_path)
+        except OSError as e:
+            raise StoreError(f"Failed to finish compacting {self.file_path}: {str(e)}") from e
+
+    def _load_index(self) -> None:
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            data_size = os.path.getsize(self.file_path)
+        except OSError:
+            data_size = 0
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Partial line from an interrupted append
+                    # Entries past the end of the data were never fully written
+                    if entry["offset"] + entry["length"] <= data_size:
+                        self._add(entry)
+        except IOError as e:
+            raise StoreError(f"Failed to read index {self.index_path}: {str(e)}") from e
+
+    def _add(self, entry: Dict) -> None:
+        self.current[entry["url"]] = len(self.entries)
+        self.entries.append(entry)
+
+    def append(self, url: str, content: str) -> Dict:
+        """
+        Append a page to the output file and record it in the index.
+
+        Args:
+            url: URL identifying the page; a repeated URL supersedes its earlier entry
+            content: Markdown content of the page
+
+        Returns:
+            The new index entry
+
+        Raises:
+            StoreError: If the output file or index cannot be written
+        """
+        data = content.encode("utf-8")
+        with self._lock:
+            try:
+                with open(self.file_path, "ab") as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    if offset > 0:
+                        f.write(PAGE_SEPARATOR)
+                        offset += len(PAGE_SEPARATOR)
+                    f.write(data)
+                # The index line goes last, so it never points at missing data
+                entry = {
+                    "url": url,
+                    "offset": offset,
+                    "length": len(data),
+                    "hash": hashlib.sha256(data).hexdigest(),
+                }
+                with open(self.index_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except IOError as e:
+                raise StoreError(f"Failed to append to {self.file_path}: {str(e)}") from e
+            self._add(entry)
+            return entry
+
+    def pages(self) -> List[Dict]:
+        """
+        List the current page entries.
+
+        Returns:
+            Index entries of the current version of every page, in file order
+        """
+        with self._lock:
+            return [self.entries[position] for position in sorted(self.current.values())]
+
+    def superseded(self) -> int:
+        """Return the number of index entries replaced by a later append."""
+        with self._lock:
+            return len(self.entries) - len(self.current)
+
+    def _entry(self, url: str) -> Dict:
+        with self._lock:
+            position = self.current.get(url)
+            if position is None:
+                raise KeyError(url)
+            return self.entries[position]
+
+    def read(self, url: str, use_mmap: bool = False, verify: bool = True) -> str:
+        """
+        Read the current version of one page.
+
+        Args:
+            url: URL of the page
+            use_mmap: Map the output file instead of seeking and reading
+            verify: Check the page against the hash in the index
+
+        Returns:
+            Markdown content of the page
+
+        Raises:
+            KeyError: If the URL is not in the store
+            StoreError: If the page cannot be read or fails verification
+        """
+        entry = self._entry(url)
+        offset, length = entry["offset"], entry["length"]
+        try:
+            with open(self.file_path, "rb") as f:
+                if use_mmap and length > 0:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        data = mapped[offset:offset + length]
+                else:
+                    f.seek(offset)
+                    data = f.read(length)
+        except (IOError, ValueError) as e:
+            raise StoreError(f"Failed to read {url} from {self.file_path}: {str(e)}") from e
+
+        if verify and hashlib.sha256(data).hexdigest() != entry["hash"]:
+            raise StoreError(f"Hash mismatch for {url} in {self.file_path}")
+        return data.decode("utf-8")
+
+    def compact(self) -> Dict:
+        """
+        Rewrite the output file and index with only the current entries.
+
+        Only the current pages are read, block by block. The new file and
+        index are written and synced under temporary names, and the index is
+        then renamed to '<index>.pending', which commits the compaction:
+        until then a crash leaves the old files in place, and after it a new
+        OutputStore completes the swap (see _recover()).
+
+        Returns:
+            Dictionary with the keys "pages", "dropped" and "bytes_reclaimed"
+
+        Raises:
+            StoreError: If the new file or index cannot be written
+        """
+        with self._lock:
+            live = [self.entries[position] for position in sorted(self.current.values())]
+            dropped = len(self.entries) - len(live)
+            tmp_path = self.file_path + ".tmp"
+            tmp_index = self.index_path + ".tmp"
+            new_entries = []
+            try:
+                old_size = os.path.getsize(self.file_path) if os.path.exists(self.file_path) else 0
+                with open(tmp_path, "wb") as out, open(tmp_index, "w", encoding="utf-8") as index:
+                    source = open(self.file_path, "rb") if live else None
+                    try:
+                        for entry in live:
+                            if out.tell() > 0:
+                                out.write(PAGE_SEPARATOR)
+                            new_entry = {**entry, "offset": out.tell()}
+                            source.seek(entry["offset"])
+                            remaining = entry["length"]
+                            while remaining > 0:
+                                block = source.read(min(COPY_CHUNK_SIZE, remaining))
+                                if not block:
+                                    raise StoreError(f"Output file ends inside {entry['url']}")
+                                out.write(block)
+                                remaining -= len(block)
+                            index.write(json.dumps(new_entry) + "\n")
+                            new_entries.append(new_entry)
+                    finally:
+                        if source is not None:
+                            source.close()
+                    new_size = out.tell()
+                    for f in (out, index):
+                        f.flush()
+                        os.fsync(f.fileno())
+                os.replace(tmp_index, self.index_path + ".pending")
+                os.replace(tmp_path, self.file_path)
+                os.replace(self.index_path + ".pending", self.index_path)
+            except IOError as e:
+                raise StoreError(f"Failed to compact {self.file_path}: {str(e)}") from e
+
+            self.entries = []
+            self.current = {}
+            for entry in new_entries:
+                self._add(entry)
+
+        return {"pages": len(new_entries), "dropped": dropped,
+                "bytes_reclaimed": old_size - new_size}
+
+def main():
+    """Command line interface for the output store."""
+    parser = argparse.ArgumentParser(
+        description="List, extract and compact pages in an indexed output file",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s list output01.md
+  %(prog)s extract output01.md https://example.com/page -o page.md
+  %(prog)s compact output01.md
+        """
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="List the current pages")
+    list_parser.add_argument("file", help="Output file")
+
+    extract_parser = subparsers.add_parser("extract", help="Extract one page")
+    extract_parser.add_argument("file", help="Output file")
+    extract_parser.add_argument("url", help="URL of the page")
+    extract_parser.add_argument("-o", "--output", help="Write the page here instead of stdout")
+    extract_parser.add_argument("--mmap", action="store_true",
+                                help="Read through a memory map instead of seek/read")
+
+    compact_parser = subparsers.add_parser("compact", help="Drop superseded pages")
+    compact_parser.add_argument("file", help="Output file")
+
+    args = parser.parse_args()
+
+    try:
+        store = OutputStore(args.file)
+        if args.command == "list":
+            for entry in store.pages():
+                print(f"{entry['offset']:>12} {entry['length']:>10} {entry['hash'][:12]} {entry['url']}")
+            superseded = store.superseded()
+            if superseded:
+                print(f"({superseded} superseded entries; run 'compact' to reclaim them)",
+                      file=sys.stderr)
+        elif args.command == "extract":
+            content = store.read(args.url, use_mmap=args.mmap)
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    f.write(content)
+            else:
+                sys.stdout.write(content + "\n")
+        elif args.command == "compact":
+            summary = store.compact()
+            print(f"Kept {summary['pages']} pages, dropped {summary['dropped']} superseded "
+                  f"entries, reclaimed {summary['bytes_reclaimed']} bytes")
+    except KeyError as e:
+        print(f"Error: no page for {e.args[0]} in {args.file}", file=sys.stderr)
+        sys.exit(1)
+    except (StoreError, IOError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+Streaming Markdown Conversion
+
+This module converts very large pages with bounded memory. The default
+path in algo4download.py holds the raw HTML, the BeautifulSoup tree, the
+extracted HTML string and the Markdown string at once; here the Markdown
+is written to its sink as html2text produces it, and the main content is
+fed to html2text in chunks:
+
+- When a simple content selector (tag, .class, #id, [attr=value]) decides
+  the match, the content is located with a scan of the raw HTML and fed
+  as slices of it, so no tree is built at all. This converts the page's
+  own markup rather than BeautifulSoup's re-serialization of it, which can
+  differ in minor whitespace details.
+- Otherwise the page is parsed as usual, the content element is detached
+  from the rest of the tree and serialized chunk by chunk.
+
+The html2text post-processing (table padding) and clean_markdown() run as
+a streaming filter, MarkdownStreamWriter, that only buffers the current
+line, the current table and a run of trailing whitespace. MathML blocks
+are swapped for placeholders on the way in and restored on the way out,
+as html_to_markdown() does, holding back only an unfinished block.
+"""
+
+import os
+import re
+import time
+from html import escape
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+from html2text import config as html2text_config
+from html2text.utils import reformat_table
+
+from algo4download import (
+    DEFAULT_CONTENT_SELECTORS,
+    MATH_PLACEHOLDER,
+    RE_MATH_WHITESPACE,
+    STREAM_CHUNK_SIZE,
+    SelectorSet,
+    html2text_converter,
+    element_to_markdown,
+    extract_main_element,
+    FileOperationError,
+)
+
+TABLE_PAD_MARKER = html2text_config.TABLE_MARKER_FOR_PAD
+
+# The two ends of algo4download.MATHML_BLOCK, searched for separately so a
+# block split across chunks is not rescanned from its start
+MATHML_OPEN = re.compile(r"<(?:\w+:)?math\b[^>]*>", re.I)
+MATHML_CLOSE = re.compile(r"</(?:\w+:)?math\s*>", re.I)
+
+def protect_math(html_chunks: Iterable[str], math_blocks: Dict[int, str]) -> Iterator[str]:
+    """
+    Replace the MathML blocks in HTML fed in chunks with placeholders.
+
+    Streaming counterpart of the protection in html_to_markdown(): block n
+    becomes W2MMATH{n}X and is stored, whitespace collapsed, in
+    math_blocks[n]. Only an unfinished block (or a tag cut at a chunk
+    boundary) is held back, and the search for a block's end resumes in
+    the newly fed text.
+
+    Args:
+        html_chunks: Consecutive pieces of the HTML
+        math_blocks: Dictionary that receives the blocks
+
+    Returns:
+        Iterator over the HTML with the blocks replaced
+    """
+    carry = ""
+    block = None  # Pieces of an unfinished block
+    count = 0  # The writer drops restored blocks, so not len(math_blocks)
+    for chunk in html_chunks:
+        text = carry + chunk
+        carry = ""
+        position = 0
+        search_from = 0
+        output = []
+        while True:
+            if block is None:
+                opening = MATHML_OPEN.search(text, position)
+                if opening is None:
+                    # Hold back a tag that is cut off; it may be a <math>
+                    last_open = text.rfind("<", position)
+                    if last_open != -1 and ">" not in text[last_open:]:
+                        carry = text[last_open:]
+                        text = text[:last_open]
+                    output.append(text[position:])
+                    break
+                output.append(text[position:opening.start()])
+                position = opening.start()
+                search_from = opening.end()
+                block = []
+            closing = MATHML_CLOSE.search(text, search_from)
+            if closing is None:
+                # Keep a closing tag that may be cut off for the next chunk
+                last_open = text.rfind("<", search_from)
+                cut = last_open if last_open != -1 and ">" not in text[last_open:] else len(text)
+                block.append(text[position:cut])
+                carry = text[cut:]
+                break
+            block.append(text[position:closing.end()])
+            math_blocks[count] = RE_MATH_WHITESPACE.sub(" ", "".join(block))
+            output.append(f"W2MMATH{count}X")
+            count += 1
+            block = None
+            position = search_from = closing.end()
+        text = "".join(output)
+        if text:
+            yield text
+    # An unfinished block is left as it is, as MATHML_BLOCK does
+    if block is not None:
+        carry = "".join(block) + carry
+    if carry:
+        yield carry
+
+class MarkdownStreamWriter:
+    """
+    Streaming counterpart of the html2text post-processing and clean_markdown().
+
+    Text written to it in arbitrary pieces is padded table by table, has
+    runs of three or more newlines collapsed to one blank line and is
+    stripped at both ends, then passed on to write().
+    """
+
+    def __init__(self, write: Callable[[str], None], pad_tables: bool = True,
+                 nbsp: str = " ", math_blocks: Dict[int, str] = None):
+        """
+        Args:
+            write: Callable receiving the cleaned Markdown piece by piece
+            pad_tables: Whether to pad the tables marked by html2text
+            nbsp: Replacement for html2text's non-breaking space placeholder
+            math_blocks: MathML blocks to put back for their placeholders
+                (see protect_math()); each is dropped once written
+        """
+        self._write = write
+        self.pad_tables = pad_tables
+        self.nbsp = nbsp
+        self.math_blocks = math_blocks
+        self.chars_written = 0
+        self._partial_line = ""
+        self._table = None
+        self._held = ""
+        self._started = False
+
+    def write(self, text: str) -> None:
+        """Accept the next piece of raw converter output."""
+        text = self._partial_line + text
+        end = text.rfind("\n") + 1
+        self._partial_line = text[end:]
+        if end:
+            self._write_lines(text[:end])
+
+    def close(self) -> None:
+        """Flush the buffered text; trailing whitespace is dropped."""
+        if self._partial_line:
+            # The added newline is trailing whitespace and gets stripped
+            self._write_lines(self._partial_line + "\n")
+            self._partial_line = ""
+        if self._table is not None:
+            # Unterminated table: pad_tables_in_text() would drop it
+            self._emit("\n".join(self._table))
+            self._table = None
+
+    def _write_lines(self, text: str) -> None:
+        """Handle complete lines (text ends with a newline)."""
+        text = text.replace("&nbsp_place_holder;", self.nbsp)
+        if not self.pad_tables or (self._table is None and TABLE_PAD_MARKER not in text):
+            self._emit(text)
+            return
+
+        lines = text.split("\n")
+        lines.pop()
+        plain = []
+        for line in lines:
+            if TABLE_PAD_MARKER in line:
+                if self._table is None:
+                    self._table = []
+                else:
+                    plain.extend(reformat_table(self._table, 1))
+                    plain.append("")
+                    self._table = None
+                continue
+            if self._table is not None:
+                self._table.append(line)
+            else:
+                plain.append(line)
+        if plain:
+            self._emit("".join(line + "\n" for line in plain))
+
+    def _emit(self, text: str) -> None:
+        """Collapse blank lines and strip the ends across piece boundaries."""
+        body = text.rstrip()
+        if not body:
+            if self._started:
+                self._held += text
+            return
+        if self._started:
+            body = self._held + body
+        else:
+            body = body.lstrip()
+            self._started = True
+        self._held = text[len(text.rstrip()):]
+        body = re.sub(r'\n{3,}', '\n\n', body)
+        if self.math_blocks:
+            body = MATH_PLACEHOLDER.sub(
+                lambda match: self.math_blocks.pop(int(match.group(1)), match.group(0)), body)
+        self.chars_written += len(body)
+        self._write(body)
+
+class _LocatorDone(Exception):
+    """Internal: the highest-priority selector has matched and closed."""
+
+class ContentLocator(HTMLParser):
+    """
+    Find the main content's character span with a scan of the raw HTML.
+
+    Only simple selectors can be checked without a tree. A selector that is
+    not simple ends the usable part of the priority list: a lower-priority
+    match cannot be trusted, since the complex selector might have matched.
+    """
+
+    def __init__(self, content_selectors: list):
+        """
+        Args:
+            content_selectors: CSS selectors in priority order
+        """
+        super().__init__(convert_charrefs=True)
+        self.selectors = []
+        self._matchers = []
+        for selector in content_selectors:
+            simple = SelectorSet.parse_simple(selector)
+            if simple is None:
+                break
+            self.selectors.append(selector)
+            self._matchers.append(simple)
+        self.spans = {}  # selector index -> [start, end or None]
+        self._open = []  # [selector index, tag name, depth] of unclosed matches
+        self._html = ""
+        self._line_starts = []
+
+    def locate(self, html_content: str) -> Optional[Tuple[int, int, str]]:
+        """
+        Scan a document for the highest-priority selector match.
+
+        Args:
+            html_content: HTML content to scan
+
+        Returns:
+            Tuple of (start offset, end offset, selector) of the first element
+            matching the highest-priority selector, or None if no usable
+            selector matched
+        """
+        if not self._matchers:
+            return None
+        self._html = html_content
+        self._line_starts = [0] + [m.end() for m in re.finditer("\n", html_content)]
+        try:
+            self.feed(html_content)
+            self.close()
+        except _LocatorDone:
+            pass
+        finally:
+            self._html = ""
+            self._line_starts = []
+        if not self.spans:
+            return None
+        index = min(self.spans)
+        start, end = self.spans[index]
+        # An element left open runs to the end of the document
+        return start, end if end is not None else len(html_content), self.selectors[index]
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self._line_starts[line - 1] + column
+
+    def _matches(self, matcher: tuple, tag: str, attrs: Dict) -> bool:
+        name, selector_attrs = matcher
+        if name is not None and tag != name:
+            return False
+        for attr, value in selector_attrs.items():
+            if attr == "class":
+                element_classes = (attrs.get("class") or "").split()
+                if any(class_name not in element_classes for class_name in value):
+                    return False
+            elif value is True:
+                if attr not in attrs:
+                    return False
+            elif attr not in attrs or (attrs[attr] or "") != value:
+                # HTMLParser reports a valueless attribute as None
+                return False
+        return True
+
+    def handle_starttag(self, tag, attrs):
+        for candidate in self._open:
+            if candidate[1] == tag:
+                candidate[2] += 1
+        best = min(self.spans) if self.spans else len(self._matchers)
+        attrs = dict(attrs)
+        for index in range(best):
+            if self._matches(self._matchers[index], tag, attrs):
+                self.spans[index] = [self._offset(), None]
+                self._open.append([index, tag, 1])
+                break
+
+    def handle_endtag(self, tag):
+        for candidate in list(self._open):
+            if candidate[1] != tag:
+                continue
+            candidate[2] -= 1
+            if candidate[2] == 0:
+                self._open.remove(candidate)
+                index = candidate[0]
+                if index in self.spans:
+                    self.spans[index][1] = self._html.find(">", self._offset()) + 1
+                    if index == 0:
+                        raise _LocatorDone()
+
+def locate_content(html_content: str, content_selectors: list = None) -> Optional[Tuple[int, int, str]]:
+    """
+    Find the main content in raw HTML without parsing it into a tree.
+
+    Args:
+        html_content: HTML content to scan
+        content_selectors: List of CSS selectors to try for finding main content
+
+    Returns:
+        Tuple of (start offset, end offset, selector), or None when the
+        content cannot be located this way
+    """
+    if content_selectors is None:
+        content_selectors = DEFAULT_CONTENT_SELECTORS
+    return ContentLocator(content_selectors).locate(html_content)
+
+def iter_element_html(element: Tag, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Serialize an element to HTML in chunks instead of one string.
+
+    Args:
+        element: BeautifulSoup element (or document) to serialize
+        chunk_size: Approximate number of characters per chunk
+
+    Yields:
+        Consecutive pieces of the element's HTML
+    """
+    pieces = []
+    size = 0
+    stack = [(iter((element,)), "")]
+    while stack:
+        children, closing_tag = stack[-1]
+        node = next(children, None)
+        if node is None:
+            stack.pop()
+            piece = closing_tag
+        elif isinstance(node, NavigableString):
+            piece = node.output_ready("minimal")
+        elif isinstance(node, BeautifulSoup):
+            stack.append((iter(node.contents), ""))
+            continue
+        else:
+            attributes = "".join(
+                f' {name}="{escape(" ".join(value) if isinstance(value, list) else value)}"'
+                for name, value in node.attrs.items())
+            if node.is_empty_element:
+                piece = f"<{node.name}{attributes}/>"
+            else:
+                piece = f"<{node.name}{attributes}>"
+                stack.append((iter(node.contents), f"</{node.name}>"))
+        pieces.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(pieces)
+            pieces = []
+            size = 0
+    if pieces:
+        yield "".join(pieces)
+
+def stream_markdown(html_chunks: Iterable[str], write: Callable[[str], None],
+                    options: dict = None) -> int:
+    """
+    Convert HTML fed in chunks to Markdown, writing it as it is produced.
+
+    The output is the same as html_to_markdown() gives for the joined
+    chunks, MathML included, except that a table left open at the end is
+    kept (unpadded) instead of dropped.
+
+    Args:
+        html_chunks: Consecutive pieces of the HTML to convert
+        write: Callable receiving the Markdown piece by piece, e.g. file.write
+        options: Conversion options
+
+    Returns:
+        Number of characters written
+    """
+    writer = None
+
+    def out(text: str) -> None:
+        # Keep the bookkeeping html2text's own output callback does
+        if text:
+            h.lastWasNL = text[-1] == "\n"
+        writer.write(text)
+
+    h = html2text_converter(options, out=out)
+    math_blocks = {}
+    writer = MarkdownStreamWriter(write, pad_tables=h.pad_tables,
+                                  nbsp="\xa0" if h.unicode_snob else " ",
+                                  math_blocks=math_blocks)
+    for chunk in protect_math(html_chunks, math_blocks):
+        h.feed(chunk)
+    h.feed("")
+    h.finish()
+    writer.close()
+    return writer.chars_written
+
+def stream_element_markdown(element: Tag, write: Callable[[str], None],
+                            options: dict = None) -> int:
+    """
+    Convert an extracted content element to Markdown incrementally.
+
+    The "dom" converter has no incremental mode; its result is written in
+    one piece.
+
+    Args:
+        element: BeautifulSoup element holding the main content
+        write: Callable receiving the Markdown piece by piece
+        options: Conversion options
+
+    Returns:
+        Number of characters written
+    """
+    if options is not None and options.get("converter") == "dom":
+        markdown_content = element_to_markdown(element, options)
+        write(markdown_content)
+        return len(markdown_content)
+    return stream_markdown(iter_element_html(element), write, options)
+
+def stream_html_to_file(html_content: str,
+                        file_path: str,
+                        content_selectors: list = None,
+                        conversion_options: dict = None,
+                        extraction_options: dict = None,
+                        overwrite: bool = False,
+                        metrics: Dict = None) -> int:
+    """
+    Extract the main content from HTML and stream its Markdown to a file.
+
+    Args:
+        html_content: Full HTML of the webpage
+        file_path: Path of the Markdown file
+        content_selectors: List of CSS selectors to try for finding main content
+        conversion_options: Options for HTML to Markdown conversion
+        extraction_options: Extra keyword arguments for extract_main_element()
+        overwrite: Whether to overwrite an existing file
+        metrics: Dictionary that receives "parse_ms", "extract_ms",
+            "convert_ms" (including the writes), "selector", "fallback" and
+            "hint" (optional)
+
+    Returns:
+        Number of bytes written
+
+    Raises:
+        ContentExtractionError: If main content cannot be found
+        FileOperationError: If file operation fails
+    """
+    if metrics is None:
+        metrics = {}
+    use_dom = bool(conversion_options) and conversion_options.get("converter") == "dom"
+
+    hint_selector = (extraction_options or {}).get("hint_selector")
+    span = None
+    scan_ms = 0.0
+    if not use_dom:
+        start = time.perf_counter()
+        selectors = content_selectors if content_selectors is not None else DEFAULT_CONTENT_SELECTORS
+        if hint_selector:
+            selectors = [hint_selector] + [s for s in selectors if s != hint_selector]
+        span = locate_content(html_content, selectors)
+        scan_ms = (time.perf_counter() - start) * 1000
+
+    if span is not None:
+        begin, end, metrics["selector"] = span
+        metrics["fallback"] = False
+        metrics["hint"] = None
+        if hint_selector:
+            metrics["hint"] = "hit" if metrics["selector"] == hint_selector else "miss"
+        metrics["parse_ms"] = scan_ms
+        metrics["extract_ms"] = 0.0
+        convert = lambda write: stream_markdown(
+            (html_content[offset:min(offset + STREAM_CHUNK_SIZE, end)]
+             for offset in range(begin, end, STREAM_CHUNK_SIZE)),
+            write, conversion_options)
+    else:
+        element = extract_main_element(html_content, content_selectors, metrics=metrics,
+                                       **(extraction_options or {}))
+        metrics["parse_ms"] += scan_ms
+        if element.parent is not None:
+            # Detach the content so the rest of the parsed page can be freed
+            element.extract()
+        convert = lambda write: stream_element_markdown(element, write, conversion_options)
+
+    if os.path.exists(file_path) and not overwrite:
+        raise FileOperationError(f"File already exists: {file_path}")
+
+    start = time.perf_counter()
+    try:
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            try:
+                convert(f.write)
+            except BaseException:
+                f.close()
+                os.remove(file_path)  # Do not leave a truncated page behind
+                raise
+            written = f.tell()
+    except IOError as e:
+        raise FileOperationError(f"Failed to save file: {str(e)}") from e
+    finally:
+        metrics["convert_ms"] = (time.perf_counter() - start) * 1000
+    return written
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Fallback Content Detector Benchmark
+
+Times the fallback main-content detection on synthetic pages with deeply
+nested layouts, comparing the previous approach (get_text() on every
+div/section/article, which re-walks the same text once per ancestor) with
+the single-pass find_content_block(). Doubling the depth should roughly
+quadruple the legacy time and only double the single-pass time.
+
+Usage:
+    python benchmarks/bench_fallback.py [--depths 100 200 400 800] [--repeat 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from algo4download import find_content_block
+
+def nested_page(depth: int) -> str:
+    """Build a page with depth nested divs, each holding one paragraph."""
+    opening = "".join(f'<div class="level-{i}"><p>Paragraph at level {i} with some filler text.</p>'
+                      for i in range(depth))
+    return f"<html><body>{opening}{'</div>' * depth}</body></html>"
+
+def legacy_detect(soup: BeautifulSoup):
+    """The previous fallback: pick the div/section/article with the most text."""
+    max_text = 0
+    best_element = None
+    for element in soup.find_all(["div", "section", "article"]):
+        text_length = len(element.get_text(strip=True))
+        if text_length > max_text:
+            max_text = text_length
+            best_element = element
+    return best_element
+
+def time_detector(detector, soup: BeautifulSoup, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        detector(soup)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fallback content detector")
+    parser.add_argument("--depths", type=int, nargs="+", default=[100, 200, 400, 800],
+                        help="Nesting depths to test (default: 100 200 400 800)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Repetitions per measurement; the best time is reported")
+    args = parser.parse_args()
+
+    print(f"{'depth':>6} {'legacy':>12} {'single-pass':>12} {'speed-up':>9}")
+    for depth in args.depths:
+        soup = BeautifulSoup(nested_page(depth), "html.parser")
+        legacy = time_detector(legacy_detect, soup, args.repeat)
+        single_pass = time_detector(find_content_block, soup, args.repeat)
+        print(f"{depth:>6} {legacy * 1000:>10.2f}ms {single_pass * 1000:>10.2f}ms {legacy / single_pass:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
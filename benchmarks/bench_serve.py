@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Conversion Server Load Check
+
+Starts the conversion server (algo4serve.py) in-process in front of the
+local fixture server and drives it with concurrent clients, in three
+phases:
+
+- "distinct":  every request asks for a different URL, with no more clients
+               than the server accepts; reports requests/sec and p50/p99
+               latency through the warm pool
+- "coalesce":  bursts of identical requests for a slow page; all but one
+               per burst should be coalesced onto the same conversion
+- "overload":  more concurrent slow requests than workers plus queue; the
+               excess should be shed at once with 503 and Retry-After
+
+The script exits with status 1 if coalescing or load shedding did not
+happen as expected.
+
+Usage:
+    python benchmarks/bench_serve.py [--workers 4] [--queue-size 8] [--clients 32]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from typing import Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fixture_server import FixtureServer
+from algo4serve import ConversionService, create_server
+
+_local = threading.local()
+
+def request(port: int, url: str) -> Tuple[int, Dict, float]:
+    """Convert url through the server on a kept-alive per-thread connection."""
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        connection = _local.connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    start = time.perf_counter()
+    connection.request("GET", "/convert?url=" + quote(url, safe=""))
+    response = connection.getresponse()
+    payload = json.loads(response.read())
+    if response.status == 503:
+        payload["retry_after"] = response.getheader("Retry-After")
+    return response.status, payload, (time.perf_counter() - start) * 1000
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run_phase(port: int, urls: List[str], clients: int) -> Dict:
+    """Send all URLs with a fixed number of concurrent clients."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        responses = list(pool.map(lambda url: request(port, url), urls))
+    elapsed = time.perf_counter() - start
+    latencies = [ms for status, _, ms in responses if status == 200]
+    return {
+        "requests": len(urls),
+        "ok": len(latencies),
+        "shed": sum(1 for status, _, _ in responses if status == 503),
+        "coalesced": sum(1 for status, payload, _ in responses
+                         if status == 200 and payload["coalesced"]),
+        "retry_after": sorted({payload["retry_after"] for status, payload, _ in responses
+                               if status == 503}),
+        "rps": len(urls) / elapsed,
+        "p50_ms": percentile(latencies, 0.5) if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) if latencies else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-check the conversion server")
+    parser.add_argument("--workers", type=int, default=4, help="Server workers (default: 4)")
+    parser.add_argument("--queue-size", type=int, default=8, help="Server queue size (default: 8)")
+    parser.add_argument("--clients", type=int, default=32,
+                        help="Concurrent clients (default: 32)")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="Requests in the distinct phase (default: 200)")
+    parser.add_argument("--slow-ms", type=float, default=300.0,
+                        help="Origin latency for the coalesce and overload phases (default: 300)")
+    args = parser.parse_args()
+
+    origin = FixtureServer().start()
+    service = ConversionService(workers=args.workers, queue_size=args.queue_size)
+    server = create_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    try:
+        # Stay within capacity here so nothing is shed
+        distinct = run_phase(port, [origin.url("small", n=i) for i in range(args.requests)],
+                             min(args.clients, args.workers + args.queue_size))
+        bursts = 5
+        coalesce = {"requests": 0, "coalesced": 0, "ok": 0}
+        for burst in range(bursts):
+            url = origin.url("small", latency=args.slow_ms, burst=burst)
+            result = run_phase(port, [url] * args.clients, args.clients)
+            for key in coalesce:
+                coalesce[key] += result[key]
+        overload_count = (args.workers + args.queue_size) * 3
+        overload = run_phase(port, [origin.url("small", latency=args.slow_ms, n=i)
+                                    for i in range(overload_count)], overload_count)
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+        origin.stop()
+
+    print(f"distinct: {distinct['ok']}/{distinct['requests']} ok, {distinct['rps']:.0f} req/s, "
+          f"p50 {distinct['p50_ms']:.1f} ms, p99 {distinct['p99_ms']:.1f} ms")
+    print(f"coalesce: {coalesce['coalesced']}/{coalesce['requests']} coalesced "
+          f"(expected {coalesce['requests'] - bursts}), {coalesce['ok']} ok")
+    print(f"overload: {overload['ok']} ok, {overload['shed']} shed "
+          f"(capacity {args.workers + args.queue_size}), Retry-After {overload['retry_after']}")
+    print(f"server:   {service.stats()}")
+
+    failures = []
+    # A client that connects after its burst's conversion finished starts a new one
+    if coalesce["coalesced"] < 0.9 * (coalesce["requests"] - bursts):
+        failures.append("identical in-flight requests were not coalesced")
+    if overload["shed"] == 0:
+        failures.append("no requests were shed under overload")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Startup Time Check
+
+Measures the import cost of the entry-point modules with
+'python -X importtime' and checks it against a budget. It also checks that
+importing them does not pull in the heavy dependencies (requests, bs4,
+html2text, ...), which are meant to be imported on first use. The script
+exits with status 1 when a module is over budget or imports a heavy
+dependency, so it can run as a regression check.
+
+Each module is imported in a fresh interpreter, after one warm-up run so
+byte-code compilation is not counted; the median of the runs is reported.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 7] [--budget-ms 40]
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+from statistics import median
+from typing import Dict, List, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["algo4download", "algo4process", "web2md"]
+
+# Packages that must only be imported on first use
+HEAVY_MODULES = {"requests", "urllib3", "bs4", "html2text", "lxml", "aiohttp", "soupsieve"}
+
+def import_profile(module: str) -> Tuple[float, List[str]]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module: Name of the module to import
+
+    Returns:
+        Tuple of (cumulative import time of the module in ms, names of all
+        modules imported on the way)
+    """
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # Let the warm-up run cache byte code
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=ROOT_DIR, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {completed.stderr.strip().splitlines()[-1]}")
+
+    cumulative_us = None
+    imported = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if not fields[1].strip().isdigit():
+            continue  # Header line
+        name = fields[2].strip()
+        imported.append(name)
+        if name == module:
+            cumulative_us = int(fields[1])
+    return cumulative_us / 1000, imported
+
+def check_module(module: str, repeat: int) -> Dict:
+    """Measure one module and collect the heavy dependencies it imports."""
+    import_profile(module)  # Warm-up
+    timings = []
+    heavy = set()
+    for _ in range(repeat):
+        cumulative_ms, imported = import_profile(module)
+        timings.append(cumulative_ms)
+        heavy.update(name for name in imported if name.split(".")[0] in HEAVY_MODULES)
+    return {"module": module, "median_ms": median(timings), "min_ms": min(timings),
+            "heavy": sorted({name.split(".")[0] for name in heavy})}
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of the entry-point modules")
+    parser.add_argument("modules", nargs="*", default=MODULES,
+                        help="Modules to check (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=7,
+                        help="Imports per module; the median is compared (default: 7)")
+    parser.add_argument("--budget-ms", type=float, default=40.0,
+                        help="Maximum median cumulative import time per module (default: 40)")
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'module':16} {'median':>9} {'min':>9} {'budget':>9}  result")
+    for module in args.modules:
+        result = check_module(module, args.repeat)
+        problems = []
+        if result["median_ms"] > args.budget_ms:
+            problems.append("over budget")
+        if result["heavy"]:
+            problems.append("imports " + ", ".join(result["heavy"]))
+        failures += bool(problems)
+        print(f"{module:16} {result['median_ms']:7.1f}ms {result['min_ms']:7.1f}ms "
+              f"{args.budget_ms:7.1f}ms  {'; '.join(problems) or 'ok'}")
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Download and Conversion Benchmark Suite
+
+Serves the fixture corpus from a local stand-in server (see
+fixture_server.py) and measures three modes, each in a fresh process so
+peak RSS is reported per mode:
+
+- "single":     one page at a time through download_webpage(),
+                extract_main_content(), html_to_markdown() and the
+                algo4process post-processors, timing every stage
+- "batch":      webpages_to_markdown() on its thread pool, with per-stage
+                timings taken from its metrics hook
+- "concurrent": the asyncio backend (algo4async), if aiohttp is installed
+
+The report gives pages/sec for every mode, p50/p99 latency per stage and
+fixture for the single and batch modes, and peak RSS. Use --json to save the results
+and --compare to check a run against a saved baseline; the script exits
+with status 1 when a metric regresses by more than --tolerance.
+
+Usage:
+    python benchmarks/bench_suite.py [--modes single batch concurrent] [--json out.json]
+    python benchmarks/bench_suite.py --quick --compare baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from urllib.parse import urlparse
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from fixture_server import FixtureServer
+
+MODES = ["single", "batch", "concurrent"]
+
+# Fixtures cycled through by the batch and concurrent modes; the 5 MB
+# table is left out so a batch finishes in reasonable time
+BATCH_FIXTURES = ["small", "nested", "mathml", "corpus/docs_article",
+                  "corpus/mixed_elements", "corpus/nested_lists", "corpus/reference_table"]
+
+STAGES = ["download", "extract", "convert", "process"]
+
+# Stages reported by the batch mode, from the webpage_to_markdown() metrics
+BATCH_STAGES = ["download", "parse", "extract", "convert", "write"]
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(fraction * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def summarize(timings: Dict[str, Dict[str, List[float]]]) -> Dict:
+    """Reduce {fixture: {stage: [ms, ...]}} to p50/p99 per stage and fixture."""
+    return {
+        fixture: {stage: {"p50_ms": percentile(values, 0.50), "p99_ms": percentile(values, 0.99)}
+                  for stage, values in per_stage.items()}
+        for fixture, per_stage in timings.items()
+    }
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process and its children, in MB."""
+    if resource is None:
+        return None
+    peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_single(base_url: str, fixtures: List[str], repeat: int) -> Dict:
+    """Time every stage for every fixture, one page at a time."""
+    from algo4download import (create_session, download_webpage, extract_main_content,
+                               html_to_markdown, NetworkError)
+    from algo4process import run_processors
+
+    session = create_session()
+    timings = {fixture: {stage: [] for stage in STAGES} for fixture in fixtures}
+    pages = failed = 0
+    start = time.perf_counter()
+    for fixture in fixtures:
+        for n in range(repeat):
+            url = f"{base_url}/{fixture}?n={n}"
+            t0 = time.perf_counter()
+            try:
+                html_content, _ = download_webpage(url, session=session)
+            except NetworkError:
+                failed += 1
+                continue
+            t1 = time.perf_counter()
+            content = extract_main_content(html_content)
+            t2 = time.perf_counter()
+            markdown_content = html_to_markdown(content)
+            t3 = time.perf_counter()
+            "".join(run_processors([markdown_content]))
+            t4 = time.perf_counter()
+            for stage, duration in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+                timings[fixture][stage].append(duration * 1000)
+            pages += 1
+    elapsed = time.perf_counter() - start
+
+    return {"pages": pages + failed, "failed": failed, "elapsed_s": elapsed,
+            "pages_per_sec": pages / elapsed, "stages": summarize(timings)}
+
+def run_batch(base_url: str, pages: int, workers: int, concurrent: bool) -> Dict:
+    """Convert a batch of fixture URLs with the thread-pool or asyncio backend."""
+    urls = [f"{base_url}/{BATCH_FIXTURES[i % len(BATCH_FIXTURES)]}?n={i}" for i in range(pages)]
+    records = []
+    output_dir = tempfile.mkdtemp(prefix="web2md-bench-")
+    try:
+        start = time.perf_counter()
+        if concurrent:
+            from algo4async import webpages_to_markdown_async
+            results = webpages_to_markdown_async(urls, output_dir=output_dir, max_concurrency=workers,
+                                                 per_host_limit=workers, overwrite=True, verbose=False)
+        else:
+            from algo4download import webpages_to_markdown
+            results = webpages_to_markdown(urls, output_dir=output_dir, workers=workers,
+                                           overwrite=True, verbose=False,
+                                           metrics_hook=records.append)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    failed = sum(1 for result in results if result["error"])
+    result = {"pages": pages, "failed": failed, "elapsed_s": elapsed,
+              "pages_per_sec": (pages - failed) / elapsed}
+    if records:
+        timings = {}
+        for record in records:
+            if record["error"] is None:
+                per_stage = timings.setdefault(urlparse(record["url"]).path.lstrip("/"),
+                                               {stage: [] for stage in BATCH_STAGES})
+                for stage in BATCH_STAGES:
+                    per_stage[stage].append(record[stage + "_ms"])
+        result["stages"] = summarize(timings)
+    return result
+
+def run_mode(args: argparse.Namespace) -> None:
+    """Child-process entry point: run one mode and print its JSON result."""
+    if args.run_mode == "single":
+        result = run_single(args.base_url, args.fixtures, args.repeat)
+    else:
+        result = run_batch(args.base_url, args.pages, args.workers, args.run_mode == "concurrent")
+    result["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(result))
+
+def spawn_mode(mode: str, base_url: str, args: argparse.Namespace) -> Dict:
+    """Run one mode in a fresh interpreter so its peak RSS is its own."""
+    command = [sys.executable, os.path.abspath(__file__), "--run-mode", mode, "--base-url", base_url,
+               "--repeat", str(args.repeat), "--pages", str(args.pages),
+               "--workers", str(args.workers), "--fixtures", *args.fixtures]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr else "failed"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Compare a run against a baseline.
+
+    Args:
+        results: The "modes" section of this run
+        baseline: The "modes" section of the baseline run
+        tolerance: Allowed relative slowdown (0.25 = 25%)
+
+    Returns:
+        Descriptions of the metrics that regressed beyond the tolerance
+    """
+    regressions = []
+    for mode, result in results.items():
+        previous = baseline.get(mode)
+        if not previous or "error" in result or "error" in previous:
+            continue
+        if result["pages_per_sec"] < previous["pages_per_sec"] * (1 - tolerance):
+            regressions.append(f"{mode}: pages/sec {previous['pages_per_sec']:.1f} -> "
+                               f"{result['pages_per_sec']:.1f}")
+        for fixture, stages in result.get("stages", {}).items():
+            for stage, values in stages.items():
+                before = previous.get("stages", {}).get(fixture, {}).get(stage)
+                if before and values["p50_ms"] > before["p50_ms"] * (1 + tolerance) \
+                        and values["p50_ms"] - before["p50_ms"] > 1.0:
+                    regressions.append(f"{mode}: {fixture} {stage} p50 {before['p50_ms']:.1f}ms -> "
+                                       f"{values['p50_ms']:.1f}ms")
+    return regressions
+
+def print_report(report: Dict) -> None:
+    for mode, result in report["modes"].items():
+        if "error" in result:
+            print(f"{mode}: skipped ({result['error']})")
+            continue
+        rss = f"{result['peak_rss_mb']:.0f} MB" if result.get("peak_rss_mb") is not None else "n/a"
+        print(f"{mode}: {result['pages']} pages ({result['failed']} failed) in {result['elapsed_s']:.2f}s, "
+              f"{result['pages_per_sec']:.1f} pages/sec, peak RSS {rss}")
+        if result.get("stages"):
+            stage_names = list(next(iter(result["stages"].values())))
+            print(f"  {'fixture':26} " + " ".join(f"{stage + ' p50/p99':>22}" for stage in stage_names))
+            for fixture, stages in result["stages"].items():
+                cells = " ".join(f"{stages[stage]['p50_ms']:>10.2f}/{stages[stage]['p99_ms']:<9.2f}ms"
+                                 for stage in stage_names)
+                print(f"  {fixture:26} {cells}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark downloading, extraction and conversion")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES,
+                        help="Modes to run (default: all)")
+    parser.add_argument("--fixtures", nargs="+",
+                        help="Fixtures for the single mode (default: all)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Downloads per fixture in the single mode (default: 3)")
+    parser.add_argument("--pages", type=int, default=70,
+                        help="Pages per batch/concurrent run (default: 70)")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Workers for the batch/concurrent modes (default: 8)")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Server delay before each response (default: 0)")
+    parser.add_argument("--status", type=int, default=200,
+                        help="HTTP status the server answers with (default: 200)")
+    parser.add_argument("--size", type=float, default=1.0,
+                        help="Size factor applied to every fixture (default: 1.0)")
+    parser.add_argument("--table-mb", type=float, default=5.0,
+                        help="Size of the table fixture in MB (default: 5)")
+    parser.add_argument("--quick", action="store_true",
+                        help="Smaller run for quick checks (0.5 MB table, 1 repeat, 21 pages)")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative regression for --compare (default: 0.25)")
+    parser.add_argument("--run-mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        run_mode(args)
+        return
+
+    if args.quick:
+        args.table_mb, args.repeat, args.pages = 0.5, 1, 21
+
+    server = FixtureServer(latency_ms=args.latency_ms, status=args.status,
+                           size=args.size, table_mb=args.table_mb).start()
+    args.fixtures = args.fixtures or list(server.fixtures)
+    unknown = set(args.fixtures) - set(server.fixtures)
+    if unknown:
+        parser.error(f"unknown fixtures: {', '.join(sorted(unknown))}")
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {key: getattr(args, key) for key in
+                     ("repeat", "pages", "workers", "latency_ms", "status", "size", "table_mb")},
+        "modes": {},
+    }
+    try:
+        for mode in args.modes:
+            report["modes"][mode] = spawn_mode(mode, server.base_url, args)
+    finally:
+        server.stop()
+
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != report["settings"]:
+            print("Warning: the baseline was run with different settings", file=sys.stderr)
+        regressions = compare(report["modes"], baseline.get("modes", {}), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+MathML End-to-End Check
+
+Runs the MathML corpus page through the same path as a real download,
+extract_main_element() -> converter -> post-processors -> output file,
+with both conversion engines, and checks that the formulas arrive in the
+output file as LaTeX rather than as the bare text of the MathML.
+
+Usage:
+    python benchmarks/check_mathml.py
+"""
+
+import os
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from algo4download import convert_html
+from algo4process import process_content
+
+CORPUS_FILE = os.path.join(BENCH_DIR, "corpus", "mathml.html")
+
+# Fragments the LaTeX output must contain
+EXPECTED = [
+    "$a x^2 + b x + c = 0$",
+    "$$x = \\frac{- b \\pm \\sqrt{b^2 - 4 a c}}{2 a}$$",
+    "$a \\neq 0$",
+]
+
+def main():
+    with open(CORPUS_FILE, "r", encoding="utf-8") as f:
+        html_content = f.read()
+
+    failures = []
+    for converter in ("html2text", "dom"):
+        markdown_content = convert_html(html_content, conversion_options={"converter": converter})
+        with tempfile.TemporaryDirectory() as directory:
+            output_file = os.path.join(directory, "output01.md")
+            process_content(output_file, markdown_content)
+            with open(output_file, "r", encoding="utf-8") as f:
+                output = f.read()
+        missing = [fragment for fragment in EXPECTED if fragment not in output]
+        leftover = "<math" in output
+        print(f"{converter:10} {'ok' if not missing and not leftover else 'FAIL'}")
+        if missing or leftover:
+            failures.append(converter)
+            print(output)
+            for fragment in missing:
+                print(f"  missing: {fragment}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Selector Engine Check
+
+Checks that SelectorSet, which matches simple selectors itself and hands
+the rest to soupsieve, finds the same element as soup.select_one() for
+every entry in DEFAULT_CONTENT_SELECTORS and a set of [attr=value] cases,
+on every corpus file and on SELECTOR_FIXTURE. It also checks that the
+whole default list picks the element of its first matching selector, and
+that extract_main_element() does not fall back for a selector that matches.
+
+Usage:
+    python benchmarks/check_selectors.py [corpus_dir]
+"""
+
+import os
+import sys
+import glob
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from algo4download import DEFAULT_CONTENT_SELECTORS, SelectorSet, extract_main_element
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+ATTRIBUTE_SELECTORS = [
+    "div[class='content']",
+    "div[class=content]",
+    "[class='content wide']",
+    "div[class]",
+    "a[rel=nofollow]",
+    "a[rel='nofollow noopener']",
+    "td[headers=h1]",
+    "[role=main]",
+    "section[ROLE='region']",
+    "div[id=content]",
+    "#content[data-kind=doc]",
+    "div.content[data-kind=doc]",
+    "[data-empty='']",
+    "[hidden]",
+    "[data-kind=doc][data-kind=other]",
+]
+
+SELECTOR_FIXTURE = """<!DOCTYPE html>
+<html><body>
+<nav><a href="/" rel="nofollow noopener">Home</a> <a href="/x" rel="nofollow">X</a></nav>
+<div hidden>Hidden</div>
+<div class="content wide">Wide content</div>
+<div class="content" data-kind="doc" data-empty="">Plain content</div>
+<div id="content" data-kind="doc">By id</div>
+<section role="region">Region</section>
+<main role="main"><table><tr><th id="h1">H</th></tr><tr><td headers="h1">Cell</td></tr></table></main>
+</body></html>"""
+
+def check_document(name: str, html_content: str) -> list:
+    """Return the (selector, problem) pairs where the engines disagree."""
+    soup = BeautifulSoup(html_content, "html.parser")
+    problems = []
+    for selector in DEFAULT_CONTENT_SELECTORS + ATTRIBUTE_SELECTORS:
+        expected = soup.select_one(selector)
+        if SelectorSet([selector]).match(soup) is not expected:
+            problems.append((selector, "SelectorSet and select_one() differ"))
+        if expected is not None:
+            metrics = {}
+            extract_main_element(html_content, [selector], metrics=metrics)
+            if metrics.get("fallback"):
+                problems.append((selector, "extract_main_element() fell back"))
+
+    expected = next((element for element in map(soup.select_one, DEFAULT_CONTENT_SELECTORS)
+                     if element is not None), None)
+    if SelectorSet(DEFAULT_CONTENT_SELECTORS).match(soup) is not expected:
+        problems.append(("DEFAULT_CONTENT_SELECTORS", "priority order differs"))
+    return [(name, selector, problem) for selector, problem in problems]
+
+def main():
+    corpus_dir = sys.argv[1] if len(sys.argv) > 1 else CORPUS_DIR
+    documents = [("fixture", SELECTOR_FIXTURE)]
+    for file_path in sorted(glob.glob(os.path.join(corpus_dir, "*.html"))):
+        with open(file_path, "r", encoding="utf-8") as f:
+            documents.append((os.path.basename(file_path), f.read()))
+
+    problems = []
+    for name, html_content in documents:
+        problems.extend(check_document(name, html_content))
+    for name, selector, problem in problems:
+        print(f"{name:<24} {selector:<32} {problem}")
+    checked = len(documents) * (len(DEFAULT_CONTENT_SELECTORS) + len(ATTRIBUTE_SELECTORS))
+    print(f"{checked} selector checks on {len(documents)} documents, {len(problems)} problems")
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
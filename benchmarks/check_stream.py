@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Streaming Conversion Check
+
+Converts every benchmark fixture (see fixture_server.py), the MathML one
+included, with the default path, convert_html(), and with both streaming
+paths of algo4stream.py:
+
+- "span":    stream_html_to_file(), which feeds slices of the raw HTML
+             when a simple selector locates the content
+- "element": stream_element_markdown() on the extracted element
+
+and checks that the Markdown matches. Both sides go through mathml2latex
+first; the span path converts the page's own markup rather than
+BeautifulSoup's re-serialization, so it is compared with whitespace runs
+collapsed.
+
+Usage:
+    python benchmarks/check_stream.py [--table-mb 0.5]
+"""
+
+import os
+import re
+import sys
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from algo4download import convert_html, extract_main_element
+from algo4process import mathml2latex
+from algo4stream import stream_element_markdown, stream_html_to_file
+from fixture_server import build_fixtures
+
+def latex(markdown_content: str) -> str:
+    """Apply the mathml2latex post-processor."""
+    return "".join(mathml2latex([markdown_content]))
+
+def collapse(markdown_content: str) -> str:
+    """Collapse whitespace runs to one space."""
+    return re.sub(r"\s+", " ", markdown_content).strip()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the streaming and default conversion paths")
+    parser.add_argument("--table-mb", type=float, default=0.5,
+                        help="Size of the table fixture in megabytes (default: 0.5)")
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'fixture':28} {'default':>9} {'span':>9} {'element':>9}  result")
+    for name, build in sorted(build_fixtures(table_mb=args.table_mb).items()):
+        html_content = build(1.0)
+        expected = latex(convert_html(html_content))
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "page.md")
+            stream_html_to_file(html_content, file_path)
+            with open(file_path, "r", encoding="utf-8") as f:
+                span = latex(f.read())
+
+        pieces = []
+        stream_element_markdown(extract_main_element(html_content), pieces.append)
+        element = latex("".join(pieces))
+
+        ok = element == expected and collapse(span) == collapse(expected)
+        failures += not ok
+        print(f"{name:28} {len(expected):9} {len(span):9} {len(element):9}  {'ok' if ok else 'MISMATCH'}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Converter Regression Check
+
+Runs every HTML file in the corpus through both conversion paths:
+
+- "html2text": extract_main_content() -> str -> html_to_markdown()
+- "dom":       extract_main_element() -> element_to_markdown()
+
+and reports whether the Markdown matches, together with the time each path
+took. Outputs are compared after normalizing whitespace-only lines and
+blank-line runs; exact matches are reported separately.
+
+Usage:
+    python benchmarks/compare_converters.py [corpus_dir] [--diff]
+"""
+
+import os
+import re
+import sys
+import time
+import difflib
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algo4download import (
+    extract_main_content,
+    extract_main_element,
+    html_to_markdown,
+    element_to_markdown,
+)
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+def normalize(markdown_content: str) -> str:
+    """Strip trailing whitespace from lines and collapse blank-line runs."""
+    lines = [line.rstrip() for line in markdown_content.split("\n")]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+def compare_file(file_path: str, repeat: int = 5) -> dict:
+    """Convert one corpus file with both paths and compare the results."""
+    with open(file_path, "r", encoding="utf-8") as f:
+        html_content = f.read()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        expected = html_to_markdown(extract_main_content(html_content))
+    html2text_time = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        actual = element_to_markdown(extract_main_element(html_content))
+    dom_time = (time.perf_counter() - start) / repeat
+
+    return {
+        "file": os.path.basename(file_path),
+        "exact": expected == actual,
+        "equivalent": normalize(expected) == normalize(actual),
+        "html2text_ms": html2text_time * 1000,
+        "dom_ms": dom_time * 1000,
+        "expected": expected,
+        "actual": actual,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the html2text and DOM conversion paths")
+    parser.add_argument("corpus_dir", nargs="?", default=CORPUS_DIR,
+                        help="Directory of .html files (default: benchmarks/corpus)")
+    parser.add_argument("--diff", action="store_true",
+                        help="Show a diff for files that do not match")
+    args = parser.parse_args()
+
+    files = sorted(os.path.join(args.corpus_dir, name)
+                   for name in os.listdir(args.corpus_dir) if name.endswith(".html"))
+    failures = 0
+    print(f"{'file':32} {'result':10} {'html2text':>10} {'dom':>10}")
+    for file_path in files:
+        result = compare_file(file_path)
+        if result["exact"]:
+            status = "exact"
+        elif result["equivalent"]:
+            status = "equivalent"
+        else:
+            status = "MISMATCH"
+            failures += 1
+        print(f"{result['file']:32} {status:10} {result['html2text_ms']:8.2f}ms {result['dom_ms']:8.2f}ms")
+        if args.diff and not result["equivalent"]:
+            diff = difflib.unified_diff(normalize(result["expected"]).split("\n"),
+                                        normalize(result["actual"]).split("\n"),
+                                        "html2text", "dom", lineterm="")
+            print("\n".join(diff))
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Fixture Corpus and Local HTTP Stand-In Server
+
+Generates the benchmark fixtures and serves them over HTTP so downloads can
+be measured without touching live sites:
+
+- "small":   a short article page (a few KB)
+- "table":   a page holding one large table (5 MB by default)
+- "nested":  a deeply nested div layout (the fallback detector's worst case)
+- "mathml":  an article with many MathML formulas
+- "corpus/<name>": every .html file in benchmarks/corpus
+
+Every response can be shaped with query parameters, and the server-wide
+defaults are set on the command line:
+
+- latency=<ms>   delay before the response headers are sent
+- status=<code>  HTTP status to answer with (the body is still the fixture)
+- size=<factor>  scale the fixture size (e.g. size=0.1 for a 500 KB table)
+
+Any other query parameter is ignored, so URLs can be made unique.
+
+Usage:
+    python benchmarks/fixture_server.py [--port 8000] [--latency-ms 0] [--table-mb 5]
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Callable, Dict
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+FILLER = ("Benchmark filler text keeps every paragraph a realistic length, with "
+          "enough words to exercise wrapping, escaping and whitespace handling. ")
+
+def _page(title: str, body: str) -> str:
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{title}</title></head>"
+            f"<body><header><nav><a href=\"/\">Home</a> <a href=\"/docs\">Docs</a></nav></header>"
+            f"{body}<footer><p>Footer links and copyright</p></footer></body></html>")
+
+def small_page(scale: float = 1.0) -> str:
+    """A short article with headings, a list, a link and some emphasis."""
+    sections = max(1, int(4 * scale))
+    body = "".join(
+        f"<h2>Section {i}</h2><p>{FILLER}<a href=\"/page/{i}\">More</a> and <em>emphasis</em>.</p>"
+        f"<ul><li>First point</li><li>Second <strong>point</strong></li></ul>"
+        for i in range(sections))
+    return _page("Small page", f"<main><h1>Small page</h1>{body}</main>")
+
+def table_page(scale: float = 1.0, table_mb: float = 5.0) -> str:
+    """A page holding one large data table of roughly table_mb megabytes."""
+    row = ("<tr><td>{0}</td><td>Item name {0}</td><td>Category {1}</td>"
+           "<td>{2:.2f}</td><td>Description of item {0} in plain words</td></tr>")
+    row_size = len(row.format(100000, 10, 1000.0))
+    rows = max(1, int(table_mb * scale * 1024 * 1024 / row_size))
+    body = "".join(row.format(i, i % 17, i * 1.25) for i in range(rows))
+    return _page("Table page",
+                 "<main><h1>Data table</h1><table><tr><th>ID</th><th>Name</th><th>Category</th>"
+                 f"<th>Price</th><th>Description</th></tr>{body}</table></main>")
+
+def nested_page(scale: float = 1.0, depth: int = 400) -> str:
+    """A layout of deeply nested divs with no semantic content container."""
+    depth = max(1, int(depth * scale))
+    opening = "".join(f"<div class=\"level-{i}\"><p>Paragraph at level {i}. {FILLER}</p>"
+                      for i in range(depth))
+    return _page("Nested page", opening + "</div>" * depth)
+
+def mathml_page(scale: float = 1.0) -> str:
+    """An article with many inline and display MathML formulas."""
+    formula = ("<math display=\"block\"><mi>x</mi><mo>=</mo><mfrac><mrow><mo>-</mo><mi>b</mi>"
+               "<mo>&#xB1;</mo><msqrt><msup><mi>b</mi><mn>2</mn></msup><mo>-</mo><mn>4</mn>"
+               "<mi>a</mi><mi>c</mi></msqrt></mrow><mrow><mn>2</mn><mi>a</mi></mrow></mfrac></math>")
+    inline = "<math><msub><mi>x</mi><mi>i</mi></msub><mo>+</mo><msup><mi>y</mi><mn>2</mn></msup></math>"
+    paragraphs = max(1, int(200 * scale))
+    body = "".join(f"<p>Equation {i}: {inline} holds, and {formula}</p>" for i in range(paragraphs))
+    return _page("MathML page", f"<article><h1>Formulas</h1>{body}</article>")
+
+def corpus_fixtures(corpus_dir: str = CORPUS_DIR) -> Dict[str, Callable[[float], str]]:
+    """Fixtures for every .html file in the corpus directory (size is ignored)."""
+    fixtures = {}
+    if os.path.isdir(corpus_dir):
+        for name in sorted(os.listdir(corpus_dir)):
+            if name.endswith(".html"):
+                with open(os.path.join(corpus_dir, name), "r", encoding="utf-8") as f:
+                    content = f.read()
+                fixtures["corpus/" + name[:-5]] = lambda scale, content=content: content
+    return fixtures
+
+def build_fixtures(table_mb: float = 5.0, nested_depth: int = 400) -> Dict[str, Callable[[float], str]]:
+    """
+    Build the fixture generators.
+
+    Args:
+        table_mb: Size of the table fixture in megabytes
+        nested_depth: Nesting depth of the nested fixture
+
+    Returns:
+        Dictionary mapping fixture names to functions of the size factor
+    """
+    fixtures = {
+        "small": small_page,
+        "table": lambda scale: table_page(scale, table_mb),
+        "nested": lambda scale: nested_page(scale, nested_depth),
+        "mathml": mathml_page,
+    }
+    fixtures.update(corpus_fixtures())
+    return fixtures
+
+class FixtureServer:
+    """
+    Threaded HTTP server for the fixtures, run in a background thread.
+
+    Fixtures are served at '/<name>' (e.g. '/small', '/corpus/docs_article');
+    generated bodies are cached per size factor.
+    """
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 latency_ms: float = 0.0,
+                 status: int = 200,
+                 size: float = 1.0,
+                 table_mb: float = 5.0,
+                 nested_depth: int = 400):
+        """
+        Args:
+            host: Address to listen on
+            port: Port to listen on (0 picks a free port)
+            latency_ms: Default delay before each response
+            status: Default HTTP status code
+            size: Default size factor
+            table_mb: Size of the table fixture in megabytes
+            nested_depth: Nesting depth of the nested fixture
+        """
+        self.fixtures = build_fixtures(table_mb, nested_depth)
+        self.defaults = {"latency": latency_ms, "status": status, "size": size}
+        self._bodies = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, fixture: str, **params) -> str:
+        """Return the URL of a fixture, with optional query parameters."""
+        query = "&".join(f"{key}={value}" for key, value in params.items())
+        return f"{self.base_url}/{fixture}" + (f"?{query}" if query else "")
+
+    def body(self, fixture: str, size: float) -> bytes:
+        """Return the encoded fixture body for a size factor, generating it once."""
+        key = (fixture, size)
+        with self._lock:
+            if key not in self._bodies:
+                self._bodies[key] = self.fixtures[fixture](size).encode("utf-8")
+            return self._bodies[key]
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; without this,
+                # Nagle's algorithm adds ~40 ms to keep-alive responses
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                fixture = parsed.path.lstrip("/")
+                params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+                try:
+                    latency = float(params.get("latency", server.defaults["latency"]))
+                    status = int(params.get("status", server.defaults["status"]))
+                    size = float(params.get("size", server.defaults["size"]))
+                except ValueError:
+                    self.send_error(400, "Bad query parameter")
+                    return
+                if fixture not in server.fixtures:
+                    self.send_error(404, "No such fixture")
+                    return
+                body = server.body(fixture, size)
+                if latency > 0:
+                    time.sleep(latency / 1000)
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FixtureServer":
+        """Start serving in a daemon thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve in the calling thread until stop() is called."""
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        """Stop the server and close its socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the benchmark fixtures over HTTP")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on (default: 8000)")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Default delay before each response (default: 0)")
+    parser.add_argument("--status", type=int, default=200, help="Default HTTP status (default: 200)")
+    parser.add_argument("--size", type=float, default=1.0, help="Default size factor (default: 1.0)")
+    parser.add_argument("--table-mb", type=float, default=5.0,
+                        help="Size of the table fixture in MB (default: 5)")
+    args = parser.parse_args()
+
+    server = FixtureServer(args.host, args.port, args.latency_ms, args.status, args.size, args.table_mb)
+    print(f"Serving fixtures at {server.base_url}/<name>:")
+    for name in server.fixtures:
+        print(f"  {server.url(name)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
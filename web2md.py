@@ -3,15 +3,27 @@
 The Website to Markdown Download Utility (web2md.py) v0.2.2
 
 This utility downloads webpages and converts them to Markdown format.
+Run it with --queue to keep entering URLs while earlier ones download in
+the background.
 """
 
 import os
 import sys
+import shutil
 import signal
-from algo4download import webpage_to_markdown, NetworkError, ContentExtractionError, FileOperationError
+import threading
+from algo4download import (convert_webpage, NetworkError, ContentExtractionError,
+                           FileOperationError, MissingDependencyError)
+from algo4process import next_output_filename, process_content, ProcessingError
 
 VERSION = "v0.2.2"
 
+# Output file for this session, created on the first successful download
+output_file = None
+
+# Also keep the last download in download.html and download.md
+KEEP_DOWNLOAD_FILES = False
+
 def clear_terminal():
     """Clear the terminal screen."""
     os.system('clear' if os.name == 'posix' else 'cls')
@@ -69,6 +81,19 @@ def splash03_download_error(error_message):
     print(f"\n{error_message}\n")
     print("Would you like to try again? [Y]/N (Selecting 'N' will terminate the utility.)")
 
+def splash04_process():
+    """Display the processing splash screen."""
+    clear_terminal()
+    print("""┏━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━┓
+┃                                                                          ┃
+┃       The Website to Markdown Download Utility (web2md.py) v0.2.2        ┃
+┃                                                                          ┃
+┠──────────────────────────────────────────────────────────────────────────┨
+┃                                                                          ┃
+┃                      Processing the output file...                       ┃
+┃                                                                          ┃
+┗━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━┛""")
+
 def splash90_end():
     """Display the exit splash screen."""
     clear_terminal()
@@ -123,23 +148,41 @@ def signal_handler(sig, frame):
     sys.exit(0)
 
 def download_url(url):
-    """Download a URL and convert it to markdown."""
+    """Download a URL and convert it to markdown, keeping the result in memory."""
     try:
         # Display download splash
         splash02_download()
         
-        # Call the webpage_to_markdown function from algo4download.py
-        html_file, md_file = webpage_to_markdown(
+        # Call the convert_webpage function from algo4download.py
+        result = convert_webpage(
             url=url,
-            html_file='download.html',
-            markdown_file='download.md',
+            html_file='download.html' if KEEP_DOWNLOAD_FILES else None,
+            markdown_file='download.md' if KEEP_DOWNLOAD_FILES else None,
             overwrite=True,
             verbose=False  # We handle our own UI feedback
         )
         
-        return True, "Download successful!"
+        return True, "Download successful!", result["markdown"]
+        
+    except (NetworkError, ContentExtractionError, FileOperationError, MissingDependencyError) as e:
+        return False, str(e), None
+    except Exception as e:
+        return False, f"Unexpected error: {str(e)}", None
+
+def process_download(url, markdown_content):
+    """Post-process the downloaded Markdown and append it to the output file."""
+    global output_file
+    try:
+        splash04_process()
+        
+        if output_file is None:
+            output_file = next_output_filename()
+        
+        process_content(output_file, markdown_content, url=url)
+        
+        return True, "Processing successful!"
         
-    except (NetworkError, ContentExtractionError, FileOperationError) as e:
+    except ProcessingError as e:
         return False, str(e)
     except Exception as e:
         return False, f"Unexpected error: {str(e)}"
@@ -169,7 +212,7 @@ def handle_error_response(error_message):
 def handle_success_response():
     """Handle successful download response."""
     print("\n✓ Download completed successfully!")
-    print("The webpage has been converted to Markdown and saved to 'download.md'")
+    print(f"The webpage has been converted to Markdown and added to '{output_file}'")
     
     while True:
         try:
@@ -189,8 +232,252 @@ def handle_success_response():
             splash90_end()
             return False  # Exit the program
 
+# Background workers in queued mode
+QUEUE_WORKERS = 4
+
+class DownloadQueue:
+    """
+    Background download queue for the queued interactive mode.
+    
+    URLs are fetched and converted by worker threads over one shared
+    session, and the results are appended to the output file in submission
+    order: a page that finishes early waits for the pages submitted before
+    it. A failed page does not hold up the ones after it; if it succeeds on
+    a retry, it is appended when the retry completes.
+    """
+    
+    def __init__(self, workers=QUEUE_WORKERS, on_change=None):
+        """
+        Args:
+            workers: Number of concurrent downloads
+            on_change: Callable run after every state change, with the item
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from algo4download import create_session
+        from algo4ratelimit import RateLimiter
+        
+        self.items = []
+        self.on_change = on_change
+        self._next_to_write = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._session = create_session(pool_connections=workers, pool_maxsize=workers)
+        # Pages collected from one site are paced per host; 429/503 are retried
+        self._download_options = {"rate_limiter": RateLimiter()}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="web2md-queue")
+    
+    def submit(self, url):
+        """Queue a URL and return its item."""
+        with self._lock:
+            item = {"seq": len(self.items), "url": url, "state": "queued",
+                    "error": None, "markdown": None, "attempts": 0}
+            self.items.append(item)
+        self._changed(item)
+        self._executor.submit(self._run, item)
+        return item
+    
+    def retry_failed(self):
+        """Queue every failed item again; returns the number of items queued."""
+        with self._lock:
+            failed = [item for item in self.items if item["state"] == "failed"]
+            for item in failed:
+                item["state"] = "queued"
+                item["error"] = None
+        for item in failed:
+            self._changed(item)
+            self._executor.submit(self._run, item)
+        return len(failed)
+    
+    def counts(self):
+        """Return the number of items per state."""
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        with self._lock:
+            for item in self.items:
+                counts[item["state"]] += 1
+        return counts
+    
+    def pending(self):
+        """Return the number of items still queued or running."""
+        counts = self.counts()
+        return counts["queued"] + counts["running"]
+    
+    def close(self, abandon=False):
+        """
+        Stop the workers.
+        
+        Args:
+            abandon: Drop the downloads that have not started instead of
+                waiting for them
+        """
+        self._executor.shutdown(wait=not abandon, cancel_futures=abandon)
+        if not abandon:
+            self._session.close()
+    
+    def _run(self, item):
+        with self._lock:
+            item["state"] = "running"
+            item["attempts"] += 1
+        self._changed(item)
+        try:
+            result = convert_webpage(url=item["url"], session=self._session,
+                                     download_options=self._download_options)
+            item["markdown"] = result["markdown"]
+        except (NetworkError, ContentExtractionError, FileOperationError, MissingDependencyError) as e:
+            self._fail(item, str(e))
+            return
+        except Exception as e:
+            self._fail(item, f"Unexpected error: {str(e)}")
+            return
+        self._write_ready(item)
+    
+    def _fail(self, item, message):
+        with self._lock:
+            item["state"] = "failed"
+            item["error"] = message
+        self._changed(item)
+        self._write_ready(item)  # Pages waiting behind it can be written now
+    
+    def _write_ready(self, item):
+        """Append every page that is next in submission order and converted."""
+        global output_file
+        with self._write_lock:
+            ready = []
+            with self._lock:
+                if item["markdown"] is not None and item["seq"] < self._next_to_write:
+                    ready.append(item)  # A retried page whose turn has passed
+                while self._next_to_write < len(self.items):
+                    next_item = self.items[self._next_to_write]
+                    if next_item["state"] in ("queued", "running") and next_item["markdown"] is None:
+                        break
+                    if next_item["markdown"] is not None:
+                        ready.append(next_item)
+                    self._next_to_write += 1
+            
+            for ready_item in ready:
+                try:
+                    if output_file is None:
+                        output_file = next_output_filename()
+                    process_content(output_file, ready_item["markdown"], url=ready_item["url"])
+                    state, error = "done", None
+                except ProcessingError as e:
+                    state, error = "failed", str(e)
+                with self._lock:
+                    ready_item["markdown"] = None
+                    ready_item["state"] = state
+                    ready_item["error"] = error
+                self._changed(ready_item)
+    
+    def _changed(self, item):
+        if self.on_change is not None:
+            self.on_change(item)
+
+class StatusLine:
+    """
+    Live status line kept directly above the input prompt.
+    
+    On a terminal the line is redrawn in place, without disturbing what the
+    user is typing; otherwise every finished or failed page is printed.
+    """
+    
+    def __init__(self, queue=None):
+        self.queue = queue
+        self.last_event = ""
+        self.interactive = sys.stdout.isatty()
+        self._lock = threading.Lock()
+    
+    def text(self):
+        counts = self.queue.counts()
+        text = (f"queued {counts['queued']} | running {counts['running']} | "
+                f"done {counts['done']} | failed {counts['failed']}")
+        if self.last_event:
+            text += f" | {self.last_event}"
+        return text[:shutil.get_terminal_size().columns - 1]
+    
+    def show(self):
+        """Print the status line; the prompt goes on the next line."""
+        with self._lock:
+            print(self.text())
+    
+    def update(self, item):
+        """Redraw the status line after a state change."""
+        if item["state"] == "done":
+            self.last_event = f"✓ {item['url']}"
+        elif item["state"] == "failed":
+            self.last_event = f"✗ {item['url']}: {item['error']}"
+        with self._lock:
+            if self.interactive:
+                # Save the cursor, redraw the line above the prompt, restore
+                sys.stdout.write(f"\0337\033[1A\r\033[K{self.text()}\0338")
+                sys.stdout.flush()
+            elif item["state"] in ("done", "failed"):
+                print(self.last_event)
+
+def list_queue(queue):
+    """Print every item in the queue with its state."""
+    for item in queue.items:
+        line = f"{item['seq'] + 1:>3}. [{item['state']}] {item['url']}"
+        if item["error"]:
+            line += f"\n       {item['error']}"
+        print(line)
+
+def queued_main(workers=QUEUE_WORKERS):
+    """Run the queued interactive mode: URLs download in the background."""
+    status = StatusLine()
+    queue = DownloadQueue(workers, on_change=status.update)
+    status.queue = queue
+    
+    splash01_start()
+    print("\nQueued mode: paste URLs one after another; they download in the background.")
+    print("Commands: R = retry failed, L = list, X = finish and exit\n")
+    
+    try:
+        while True:
+            status.show()
+            try:
+                user_input = input("> ").strip()
+            except EOFError:
+                user_input = 'X'
+            command = user_input.upper()
+            
+            if command == 'X':
+                if queue.pending():
+                    print(f"Waiting for {queue.pending()} downloads to finish "
+                          "(CTRL + C to abandon them)...")
+                break
+            elif command == 'R':
+                print(f"Retrying {queue.retry_failed()} failed downloads")
+            elif command == 'L':
+                list_queue(queue)
+            elif user_input:
+                queue.submit(user_input)
+        
+        queue.close()
+        if output_file is not None:
+            counts = queue.counts()
+            print(f"\n{counts['done']} pages added to '{output_file}', {counts['failed']} failed")
+            input("\nPress ENTER to exit.")
+    except (KeyboardInterrupt, EOFError):
+        queue.close(abandon=True)
+    cleanup_files()
+    splash90_end()
+
 def main():
     """Main function to run the web2md utility."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Download webpages and convert them to Markdown")
+    parser.add_argument("--queue", action="store_true",
+                        help="Queued mode: keep pasting URLs while earlier ones download "
+                             "in the background")
+    parser.add_argument("--workers", type=int, default=QUEUE_WORKERS,
+                        help=f"Concurrent downloads in queued mode (default: {QUEUE_WORKERS})")
+    args = parser.parse_args()
+    
+    if args.queue:
+        # CTRL+C raises KeyboardInterrupt so the workers can be stopped
+        queued_main(args.workers)
+        return
+    
     # Set up signal handler for CTRL+C
     signal.signal(signal.SIGINT, signal_handler)
     
@@ -210,7 +497,10 @@ def main():
             
             # Process URL if provided
             if user_input:
-                success, message = download_url(user_input)
+                success, message, markdown_content = download_url(user_input)
+                
+                if success:
+                    success, message = process_download(user_input, markdown_content)
                 
                 if success:
                     # Handle successful download